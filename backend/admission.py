@@ -0,0 +1,272 @@
+"""
+Module: admission.py
+Description: Admission control for the transaction endpoints: token buckets, priority lanes and singleflight.
+
+A request goes through three checks before it does any work.
+
+1. Token buckets. The request takes tokens from the global bucket and from
+   each sender's bucket. If any bucket is empty, the request is rejected
+   with the time until it would refill. No tokens are taken in that case.
+2. Singleflight. If an identical request is already in flight, the new
+   request awaits that one's result instead of building its own.
+3. Lanes. The request takes a slot from a bounded pool of work slots. When
+   the pool is full, waiting requests queue by lane priority, so broadcasts
+   go ahead of unsigned builds. A lane with a full queue rejects at once.
+   A request that waits longer than ``max_wait`` is rejected rather than
+   left to run into a client timeout.
+
+Rejections are cheap, since nothing has touched algod yet. The app maps
+them to 429 (rate limited) or 503 (overloaded) with ``Retry-After``.
+"""
+
+import asyncio
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+import heapq
+import itertools
+import math
+import time
+from typing import Awaitable, Callable, Collection, Dict, Hashable, Iterable, List, Optional, Tuple
+
+# Highest priority first.
+LANES = ('broadcast', 'unsigned')
+
+
+class AdmissionError(Exception):
+    """Base class for requests turned away before doing any work."""
+
+    def __init__(self, message: str, retry_after: float):
+        super().__init__(message)
+        self.retry_after = retry_after
+
+    @property
+    def retry_after_header(self) -> str:
+        return str(max(1, math.ceil(self.retry_after)))
+
+
+class RateLimitedError(AdmissionError):
+    """Raised when the global or a per-sender token bucket is empty."""
+
+
+class OverloadedError(AdmissionError):
+    """Raised when a lane's queue is full or a request waited too long for a slot."""
+
+
+class TooManySendersError(Exception):
+    """Raised when one request names more distinct senders than it may be charged for."""
+
+
+class TokenBucket:
+    """Classic token bucket: ``rate`` tokens per second, holding at most ``burst``."""
+
+    def __init__(self, rate: float, burst: float, clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.tokens = burst
+        self._clock = clock
+        self._updated = clock()
+
+    def _refill(self) -> None:
+        now = self._clock()
+        self.tokens = min(self.burst, self.tokens + (now - self._updated) * self.rate)
+        self._updated = now
+
+    def wait_time(self, cost: float = 1) -> float:
+        """Seconds until ``cost`` tokens are available; 0 when they are now."""
+        self._refill()
+        if self.tokens >= cost:
+            return 0.0
+        return (cost - self.tokens) / self.rate
+
+    def take(self, cost: float = 1) -> None:
+        self.tokens -= cost
+
+    def is_full(self) -> bool:
+        """True once refilled to ``burst``: dropping the bucket then loses nothing."""
+        return self.wait_time(self.burst) == 0
+
+
+class SenderBuckets:
+    """One bucket per sender, at most ``max_senders`` of them.
+
+    Only buckets that have refilled completely are evicted, since a sender
+    starting over with a full bucket is then no different. When every bucket
+    near the old end of the table is still refilling, a new sender is rate
+    limited instead, so a flood of new senders cannot reset the limits of the
+    ones already tracked.
+    """
+
+    # Oldest buckets looked at for a full one before a new sender is refused.
+    EVICTION_SCAN = 8
+
+    def __init__(self, rate: float, burst: float, max_senders: int = 100_000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.rate = rate
+        self.burst = burst
+        self.max_senders = max_senders
+        self._clock = clock
+        self._buckets: 'OrderedDict[str, TokenBucket]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+    def get(self, sender: str, keep: Collection[str] = ()) -> TokenBucket:
+        """Return ``sender``'s bucket, never evicting the buckets of ``keep`` to make room."""
+        bucket = self._buckets.get(sender)
+        if bucket is not None:
+            self._buckets.move_to_end(sender)
+            return bucket
+        if len(self._buckets) >= self.max_senders:
+            self._evict_one(keep)
+        bucket = self._buckets[sender] = TokenBucket(self.rate, self.burst, self._clock)
+        return bucket
+
+    def _evict_one(self, keep: Collection[str]) -> None:
+        oldest = list(itertools.islice(self._buckets.items(), self.EVICTION_SCAN))
+        for sender, bucket in oldest:
+            if bucket.is_full() and sender not in keep:
+                del self._buckets[sender]
+                return
+        wait = min((bucket.wait_time(self.burst) for sender, bucket in oldest if sender not in keep), default=1.0)
+        raise RateLimitedError('Server is tracking too many active senders', wait)
+
+
+class PriorityLimiter:
+    """At most ``limit`` concurrent holders; waiters are served by lane priority, then arrival."""
+
+    def __init__(self, limit: int, max_waiting: int = 256, max_wait: float = 2.0,
+                 lanes: Tuple[str, ...] = LANES):
+        self.limit = limit
+        self.max_waiting = max_waiting
+        self.max_wait = max_wait
+        self.priority = {lane: index for index, lane in enumerate(lanes)}
+        self.active = 0
+        self.waiting = {lane: 0 for lane in lanes}
+        self._heap: List[Tuple[int, int, asyncio.Future]] = []
+        self._order = itertools.count()
+
+    async def acquire(self, lane: str) -> None:
+        if self.active < self.limit and not any(self.waiting.values()):
+            self.active += 1
+            return
+        if self.waiting[lane] >= self.max_waiting:
+            raise OverloadedError(f'Too many {lane} requests are queued', self.max_wait)
+        waiter = asyncio.get_running_loop().create_future()
+        heapq.heappush(self._heap, (self.priority[lane], next(self._order), waiter))
+        self.waiting[lane] += 1
+        try:
+            await asyncio.wait_for(asyncio.shield(waiter), self.max_wait)
+        except (asyncio.TimeoutError, asyncio.CancelledError) as exc:
+            if waiter.done() and not waiter.cancelled():
+                # Granted in the same tick we gave up: hand the slot on.
+                self.release()
+            else:
+                waiter.cancel()
+            if isinstance(exc, asyncio.CancelledError):
+                raise
+            raise OverloadedError(f'No {lane} slot freed up within {self.max_wait:g}s', self.max_wait) from None
+        finally:
+            self.waiting[lane] -= 1
+
+    def release(self) -> None:
+        while self._heap:
+            _, _, waiter = heapq.heappop(self._heap)
+            if not waiter.done():
+                # The slot passes straight to the waiter; ``active`` is unchanged.
+                waiter.set_result(None)
+                return
+        self.active -= 1
+
+
+class SingleFlight:
+    """Share one in-flight call among concurrent callers with the same key."""
+
+    def __init__(self):
+        self._calls: Dict[Hashable, asyncio.Future] = {}
+        self.coalesced = 0
+
+    async def run(self, key: Hashable, call: Callable[[], Awaitable]):
+        task = self._calls.get(key)
+        if task is None:
+            task = self._calls[key] = asyncio.ensure_future(call())
+            task.add_done_callback(lambda _: self._calls.pop(key, None))
+        else:
+            self.coalesced += 1
+        # Shielded so one caller disconnecting does not fail the others.
+        return await asyncio.shield(task)
+
+    def __len__(self) -> int:
+        return len(self._calls)
+
+
+class AdmissionController:
+    """Global and per-sender buckets, lane limiter and singleflight for one running app.
+
+    A ``rate`` of 0 turns that bucket off.
+    """
+
+    def __init__(self, rate: float = 500, burst: float = 1000, sender_rate: float = 20, sender_burst: float = 40,
+                 max_senders: int = 100_000, max_request_senders: int = 64, concurrency: int = 64,
+                 max_waiting: int = 256, max_wait: float = 2.0, clock: Callable[[], float] = time.monotonic):
+        self.global_bucket = TokenBucket(rate, burst, clock) if rate > 0 else None
+        self.senders = SenderBuckets(sender_rate, sender_burst, max_senders, clock) if sender_rate > 0 else None
+        self.max_request_senders = max_request_senders
+        self.limiter = PriorityLimiter(concurrency, max_waiting, max_wait)
+        self.singleflight = SingleFlight()
+        self.rejected = {'rate_limited': 0, 'overloaded': 0}
+
+    def check(self, senders: Iterable[Optional[str]] = ()) -> None:
+        """Take one token from the global bucket and from each distinct sender's, or raise ``RateLimitedError``.
+
+        A batch is one request, so it pays once per sender whatever its size, and
+        may name at most ``max_request_senders`` distinct senders. Tokens are
+        only taken when every bucket can pay, so a rejected request costs nothing.
+        """
+        distinct = [sender for sender in dict.fromkeys(senders) if sender]
+        if len(distinct) > self.max_request_senders:
+            raise TooManySendersError(f'A request may name at most {self.max_request_senders} distinct senders')
+        keep = set(distinct)
+        buckets = []
+        if self.global_bucket is not None:
+            buckets.append(('global', self.global_bucket))
+        try:
+            if self.senders is not None:
+                buckets += [(sender, self.senders.get(sender, keep)) for sender in distinct]
+            wait, name = max(((bucket.wait_time(), name) for name, bucket in buckets), default=(0.0, None))
+            if wait > 0:
+                scope = 'Server' if name == 'global' else f'Sender {name}'
+                raise RateLimitedError(f'{scope} is over its request rate', wait)
+        except RateLimitedError:
+            self.rejected['rate_limited'] += 1
+            raise
+        for _, bucket in buckets:
+            bucket.take()
+
+    @asynccontextmanager
+    async def slot(self, lane: str):
+        try:
+            await self.limiter.acquire(lane)
+        except OverloadedError:
+            self.rejected['overloaded'] += 1
+            raise
+        try:
+            yield
+        finally:
+            self.limiter.release()
+
+    async def coalesce(self, key: Hashable, lane: str, call: Callable[[], Awaitable]):
+        """Run ``call`` under a ``lane`` slot, shared with identical concurrent requests."""
+        async def leader():
+            async with self.slot(lane):
+                return await call()
+        return await self.singleflight.run(key, leader)
+
+    def stats(self) -> dict:
+        return {
+            'active': self.limiter.active,
+            **{f'waiting_{lane}': count for lane, count in self.limiter.waiting.items()},
+            'coalesced': self.singleflight.coalesced,
+            'rate_limited': self.rejected['rate_limited'],
+            'overloaded': self.rejected['overloaded'],
+            'senders': len(self.senders) if self.senders is not None else 0,
+        }
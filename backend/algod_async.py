@@ -0,0 +1,133 @@
+"""
+Module: algod_async.py
+Description: Async algod client backed by a bounded keep-alive connection pool.
+"""
+
+from typing import Any, Dict, List, Optional
+
+import httpx
+import msgpack
+from algosdk import error
+from algosdk.transaction import SuggestedParams
+
+from backend.metrics import algod_call
+
+ALGOD_AUTH_HEADER = 'X-Algo-API-Token'
+
+
+class AsyncAlgodClient:
+    """Minimal async counterpart of ``AlgodClient`` for the endpoints the backend uses.
+
+    Connections are reused across requests (HTTP keep-alive) and capped at
+    ``max_connections``. Every call accepts an optional ``timeout`` that overrides
+    the client default; cancelling the awaiting task aborts the in-flight request.
+    """
+
+    def __init__(self, algod_token: str, algod_address: str, headers: Optional[Dict[str, str]] = None,
+                 timeout: float = 10.0, max_connections: int = 20, max_keepalive: Optional[int] = None,
+                 transport: Optional[httpx.AsyncBaseTransport] = None):
+        self.algod_address = algod_address.rstrip('/')
+        self.headers = {'User-Agent': 'lucid-backend'}
+        if algod_token:
+            self.headers[ALGOD_AUTH_HEADER] = algod_token
+        if headers:
+            self.headers.update(headers)
+        self.timeout = timeout
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive if max_keepalive is not None else max_connections,
+        )
+        self._transport = transport
+        self._http: Optional[httpx.AsyncClient] = None
+
+    @property
+    def http(self) -> httpx.AsyncClient:
+        if self._http is None or self._http.is_closed:
+            self._http = httpx.AsyncClient(
+                base_url=self.algod_address + '/v2',
+                headers=self.headers,
+                timeout=self.timeout,
+                limits=self.limits,
+                transport=self._transport,
+            )
+        return self._http
+
+    async def aclose(self) -> None:
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
+    async def request(self, method: str, path: str, timeout: Optional[float] = None,
+                      raw: bool = False, **kwargs: Any) -> Any:
+        """Issue a request against ``/v2`` and return the decoded JSON body (or bytes when ``raw``)."""
+        if timeout is not None:
+            kwargs['timeout'] = timeout
+        response = await self.http.request(method, path, **kwargs)
+        if response.status_code >= 400:
+            body = {}
+            message = response.text
+            try:
+                body = response.json()
+                message = body.get('message', message)
+            except ValueError:
+                pass
+            raise error.AlgodHTTPError(message, response.status_code, body.get('data'))
+        if raw:
+            return response.content
+        if not response.content:
+            return {}
+        return response.json()
+
+    @algod_call('status')
+    async def status(self, timeout: Optional[float] = None) -> dict:
+        return await self.request('GET', '/status', timeout=timeout)
+
+    @algod_call('status_after_block')
+    async def status_after_block(self, round_number: int, timeout: Optional[float] = None) -> dict:
+        return await self.request('GET', f'/status/wait-for-block-after/{round_number}', timeout=timeout)
+
+    @algod_call('suggested_params')
+    async def suggested_params(self, timeout: Optional[float] = None) -> SuggestedParams:
+        res = await self.request('GET', '/transactions/params', timeout=timeout)
+        return SuggestedParams(
+            res['fee'],
+            res['last-round'],
+            res['last-round'] + 1000,
+            res['genesis-hash'],
+            res['genesis-id'],
+            False,
+            res['consensus-version'],
+            res['min-fee'],
+        )
+
+    @algod_call('send_raw_transactions')
+    async def send_raw_transactions(self, blobs: List[bytes], timeout: Optional[float] = None) -> str:
+        """Submit already-encoded signed transactions as one concatenated body."""
+        res = await self.request(
+            'POST',
+            '/transactions',
+            timeout=timeout,
+            content=b''.join(blobs),
+            headers={'Content-Type': 'application/x-binary'},
+        )
+        return res['txId']
+
+    @algod_call('pending_transaction_info')
+    async def pending_transaction_info(self, txid: str, timeout: Optional[float] = None) -> dict:
+        return await self.request('GET', f'/transactions/pending/{txid}', timeout=timeout,
+                                  params={'format': 'json'})
+
+    @algod_call('compile')
+    async def compile(self, source: str, timeout: Optional[float] = None) -> dict:
+        return await self.request('POST', '/teal/compile', timeout=timeout, content=source.encode())
+
+    @algod_call('block')
+    async def block(self, round_number: int, timeout: Optional[float] = None) -> dict:
+        """Fetch a block as msgpack and decode it; addresses stay raw 32-byte values."""
+        content = await self.request('GET', f'/blocks/{round_number}', timeout=timeout, raw=True,
+                                     params={'format': 'msgpack'})
+        return msgpack.unpackb(content, raw=False, strict_map_key=False, unicode_errors='surrogateescape')
+
+    @algod_call('application_info')
+    async def application_info(self, app_id: int, timeout: Optional[float] = None) -> dict:
+        return await self.request('GET', f'/applications/{app_id}', timeout=timeout)
@@ -0,0 +1,456 @@
+"""
+Module: algod_pool.py
+Description: Pool of algod endpoints with health probes, latency-aware routing and hedged reads.
+
+``AlgodPool`` has the same methods as ``AsyncAlgodClient``, so it can be
+used wherever the backend expects an async algod client.
+
+- Probes: with more than one endpoint, a background probe checks each
+  node's ``/status``. A node that fails its probe, trails the best node
+  by more than ``max_lag`` rounds, or fails ``max_failures`` requests in
+  a row, stops receiving traffic until a later probe passes. Long-poll
+  timeouts are the node waiting as asked, so they do not count.
+- Routing: requests go to the healthy node with the lowest recent latency,
+  weighted by the requests it already has in flight.
+- Hedged reads: if the chosen node has not answered within its own p95,
+  the same read is also sent to the next node, and the first success wins.
+- Round reads: a block or block-txids read only goes to nodes that have
+  reached that round, or to the most current node when none has. A 404
+  from one of them moves on to the next, since a node can be ahead of its
+  last probe; ``RoundNotReachedError`` means no node that had reached the
+  round answered, so the 404 says nothing about the route itself.
+- Submissions: they are never hedged. They go to the best node and move
+  to the next one only on connection errors or 5xx responses.
+"""
+
+import asyncio
+from collections import deque
+from dataclasses import dataclass, field
+import json
+import logging
+import re
+import time
+from typing import Awaitable, Callable, Deque, Dict, List, Mapping, Optional
+
+logger = logging.getLogger(__name__)
+
+# Paths whose answer depends on the node having reached the round in them.
+ROUND_PATH = re.compile(r'^/(?:v2/)?blocks/(\d+)(?:/|$)')
+
+
+class RoundNotReachedError(Exception):
+    """Raised when a round read found no node that had reached the round."""
+
+    def __init__(self, round_number: int):
+        super().__init__(f'No algod node has reached round {round_number}')
+        self.round_number = round_number
+
+
+def parse_header_kv(value: str) -> Dict[str, str]:
+    """Parse ``ALGOD_HEADER_KV`` (``Key=Value;Key:Value``) into headers."""
+    headers = {}
+    for kv in value.split(';'):
+        if not kv.strip():
+            continue
+        if '=' in kv:
+            key, value = kv.split('=', 1)
+        elif ':' in kv:
+            key, value = kv.split(':', 1)
+        else:
+            continue
+        headers[key.strip()] = value.strip()
+    return headers
+
+
+@dataclass(frozen=True)
+class AlgodEndpoint:
+    address: str
+    token: str = ''
+    headers: Dict[str, str] = field(default_factory=dict)
+    name: str = ''
+
+    @property
+    def label(self) -> str:
+        return self.name or self.address
+
+
+def endpoints_from_env(env: Mapping[str, str]) -> List[AlgodEndpoint]:
+    """Endpoints from ``ALGOD_ENDPOINTS`` (a JSON list), else ``ALGOD_ADDRESS``/``ALGOD_TOKEN``/``ALGOD_HEADER_KV``.
+
+    ``ALGOD_ENDPOINTS`` entries look like ``{"address": ..., "token": ..., "headers": {...}, "name": ...}``;
+    only ``address`` is required.
+    """
+    raw = env.get('ALGOD_ENDPOINTS', '').strip()
+    if raw:
+        try:
+            entries = json.loads(raw)
+            endpoints = [AlgodEndpoint(entry['address'], entry.get('token', ''), dict(entry.get('headers') or {}),
+                                       entry.get('name', '')) for entry in entries]
+        except (ValueError, TypeError, KeyError) as exc:
+            raise RuntimeError(f'ALGOD_ENDPOINTS must be a JSON list of {{"address": ...}} objects: {exc}')
+        if endpoints:
+            return endpoints
+    address = env.get('ALGOD_ADDRESS')
+    if not address:
+        return []
+    return [AlgodEndpoint(address, env.get('ALGOD_TOKEN', ''), parse_header_kv(env.get('ALGOD_HEADER_KV', '')))]
+
+
+def best_endpoint(endpoints: List[AlgodEndpoint], timeout: float = 5.0) -> AlgodEndpoint:
+    """Probe every endpoint once (in parallel) and pick the most current, then the fastest.
+
+    For one-shot tools such as the deploy scripts, which use algosdk's
+    synchronous client.
+    """
+    if len(endpoints) == 1:
+        return endpoints[0]
+    from concurrent.futures import ThreadPoolExecutor
+
+    from algosdk.v2client.algod import AlgodClient
+
+    def probe(endpoint: AlgodEndpoint):
+        client = AlgodClient(endpoint.token, endpoint.address, headers=endpoint.headers or None)
+        start = time.perf_counter()
+        try:
+            last_round = client.status(timeout=timeout)['last-round']
+        except Exception as exc:
+            logger.warning('algod %s failed its probe: %s', endpoint.label, exc)
+            return None
+        return last_round, time.perf_counter() - start
+
+    with ThreadPoolExecutor(max_workers=len(endpoints)) as executor:
+        results = list(executor.map(probe, endpoints))
+    live = [(result, endpoint) for result, endpoint in zip(results, endpoints) if result is not None]
+    if not live:
+        raise RuntimeError('No algod endpoint answered its status probe')
+    # Highest round first, then lowest latency.
+    return min(live, key=lambda item: (-item[0][0], item[0][1]))[1]
+
+
+def best_algod_client(env: Mapping[str, str], timeout: float = 5.0):
+    """Synchronous ``AlgodClient`` for the best of the configured endpoints."""
+    from algosdk.v2client.algod import AlgodClient
+
+    endpoints = endpoints_from_env(env)
+    if not endpoints:
+        raise RuntimeError('ALGOD_ADDRESS (or ALGOD_ENDPOINTS) must be set in the environment')
+    endpoint = best_endpoint(endpoints, timeout)
+    return AlgodClient(endpoint.token, endpoint.address, headers=endpoint.headers or None)
+
+
+def _retryable(exc: BaseException) -> bool:
+    """Connection problems and 5xx responses; a 4xx is the node's real answer."""
+    import httpx
+
+    code = getattr(exc, 'code', None)
+    if isinstance(code, int):
+        return code >= 500
+    return isinstance(exc, (httpx.TransportError, asyncio.TimeoutError, TimeoutError))
+
+
+def _not_found(exc: BaseException) -> bool:
+    return getattr(exc, 'code', None) == 404
+
+
+def _timeout(exc: BaseException) -> bool:
+    import httpx
+
+    return isinstance(exc, (httpx.TimeoutException, asyncio.TimeoutError, TimeoutError))
+
+
+class EndpointState:
+    """Live view of one node: health, round, latency samples and load."""
+
+    def __init__(self, endpoint: AlgodEndpoint, client, samples: int = 200):
+        self.endpoint = endpoint
+        self.client = client
+        self.healthy = True
+        self.last_round: Optional[int] = None
+        self.lag = 0
+        self.latencies: Deque[float] = deque(maxlen=samples)
+        self.ewma: Optional[float] = None
+        self.in_flight = 0
+        self.requests = 0
+        self.errors = 0
+        self.consecutive_failures = 0
+        self._p95: Optional[float] = None
+
+    def record(self, elapsed: float) -> None:
+        self.latencies.append(elapsed)
+        self.ewma = elapsed if self.ewma is None else 0.8 * self.ewma + 0.2 * elapsed
+        self._p95 = None
+
+    def p95(self) -> Optional[float]:
+        if len(self.latencies) < 20:
+            return None
+        if self._p95 is None:
+            ordered = sorted(self.latencies)
+            self._p95 = ordered[int(len(ordered) * 0.95) - 1]
+        return self._p95
+
+    def score(self, default: float) -> float:
+        return (self.ewma if self.ewma is not None else default) * (1 + self.in_flight)
+
+    def snapshot(self) -> dict:
+        p95 = self.p95()
+        return {
+            'name': self.endpoint.label,
+            'healthy': self.healthy,
+            'round': self.last_round,
+            'lag': self.lag,
+            'ewma_ms': round(self.ewma * 1000, 3) if self.ewma is not None else None,
+            'p95_ms': round(p95 * 1000, 3) if p95 is not None else None,
+            'in_flight': self.in_flight,
+            'requests': self.requests,
+            'errors': self.errors,
+        }
+
+
+class AlgodPool:
+    """Routes algod calls across several nodes; see the module docstring."""
+
+    def __init__(self, endpoints: List[AlgodEndpoint], timeout: float = 10.0, max_connections: int = 20,
+                 max_lag: int = 2, probe_interval: float = 2.0, hedge_min: float = 0.005,
+                 hedge_default: float = 0.05, max_failures: int = 3,
+                 client_factory: Optional[Callable[[AlgodEndpoint], object]] = None):
+        if not endpoints:
+            raise ValueError('AlgodPool needs at least one endpoint')
+        if client_factory is None:
+            from backend.algod_async import AsyncAlgodClient
+
+            def client_factory(endpoint):
+                return AsyncAlgodClient(endpoint.token, endpoint.address, headers=endpoint.headers,
+                                        timeout=timeout, max_connections=max_connections)
+        self.states = [EndpointState(endpoint, client_factory(endpoint)) for endpoint in endpoints]
+        self.timeout = timeout
+        self.max_lag = max_lag
+        self.max_failures = max_failures
+        self.probe_interval = probe_interval
+        self.hedge_min = hedge_min
+        self.hedge_default = hedge_default
+        self.hedges = 0
+        self.hedge_wins = 0
+        self.failovers = 0
+        self._probe_task: Optional[asyncio.Task] = None
+
+    # -- health ---------------------------------------------------------
+
+    async def probe_once(self) -> None:
+        """Check every node's status and mark laggards and failures unhealthy."""
+        async def probe(state: EndpointState):
+            start = time.perf_counter()
+            try:
+                status = await state.client.status(timeout=min(self.timeout, max(self.probe_interval, 1.0)))
+            except Exception as exc:
+                if state.healthy:
+                    logger.warning('algod %s failed its health probe: %s', state.endpoint.label, exc)
+                state.healthy = False
+                return
+            state.record(time.perf_counter() - start)
+            state.last_round = status['last-round']
+            state.consecutive_failures = 0
+
+        await asyncio.gather(*(probe(state) for state in self.states))
+        rounds = [state.last_round for state in self.states if state.last_round is not None]
+        best = max(rounds, default=None)
+        for state in self.states:
+            if state.last_round is None or best is None:
+                continue
+            state.lag = best - state.last_round
+            healthy = state.lag <= self.max_lag
+            if healthy != state.healthy:
+                logger.info('algod %s is now %s (lag %d)', state.endpoint.label,
+                            'healthy' if healthy else 'unhealthy', state.lag)
+            state.healthy = healthy
+
+    async def _probe_loop(self) -> None:
+        while True:
+            try:
+                await self.probe_once()
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning('algod health probe failed: %s', exc)
+            await asyncio.sleep(self.probe_interval)
+
+    def _ensure_probing(self) -> None:
+        # A single node has nothing to be compared with, so it is never probed.
+        if len(self.states) > 1 and (self._probe_task is None or self._probe_task.done()):
+            self._probe_task = asyncio.get_running_loop().create_task(self._probe_loop())
+
+    def ranked(self) -> List[EndpointState]:
+        """Healthy nodes by score, then the unhealthy ones as a last resort."""
+        return sorted(self.states, key=lambda state: (not state.healthy, state.score(self.hedge_default)))
+
+    def reached(self, round_number: int) -> List[EndpointState]:
+        """Nodes at or past ``round_number`` (or not probed yet) by rank; else all, most current first."""
+        candidates = [state for state in self.ranked()
+                      if state.last_round is None or state.last_round >= round_number]
+        return candidates or sorted(self.ranked(), key=lambda state: (not state.healthy, -(state.last_round or 0)))
+
+    def hedge_delay(self, state: EndpointState) -> float:
+        p95 = state.p95()
+        return max(self.hedge_min, p95 if p95 is not None else self.hedge_default)
+
+    # -- dispatch -------------------------------------------------------
+
+    async def _attempt(self, state: EndpointState, call: Callable[[object], Awaitable], long_poll: bool = False):
+        state.in_flight += 1
+        state.requests += 1
+        start = time.perf_counter()
+        try:
+            result = await call(state.client)
+        except asyncio.CancelledError:
+            raise
+        except Exception as exc:
+            if long_poll and _timeout(exc):
+                raise
+            state.errors += 1
+            if _retryable(exc):
+                self._record_failure(state, exc)
+            raise
+        finally:
+            state.in_flight -= 1
+        state.consecutive_failures = 0
+        # A long poll's duration is the wait for the next block, not the node's latency.
+        if not long_poll:
+            state.record(time.perf_counter() - start)
+        return result
+
+    def _record_failure(self, state: EndpointState, exc: BaseException) -> None:
+        state.consecutive_failures += 1
+        # One blip is not an outage; a single node has nowhere else to send traffic.
+        if state.consecutive_failures >= self.max_failures and len(self.states) > 1 and state.healthy:
+            logger.warning('algod %s failed %d requests in a row, last: %s', state.endpoint.label,
+                           state.consecutive_failures, exc)
+            # Out of rotation until the next probe says otherwise.
+            state.healthy = False
+
+    async def _hedged(self, call: Callable[[object], Awaitable], min_round: Optional[int] = None):
+        """Run ``call`` on the best node, adding one hedge when it exceeds its p95 budget.
+
+        With ``min_round``, only nodes that have reached it are asked, and a 404
+        fails over to the next one like a 5xx would.
+        """
+        self._ensure_probing()
+        candidates = self.ranked() if min_round is None else self.reached(min_round)
+        primary = candidates[0]
+        tasks: Dict[asyncio.Task, EndpointState] = {}
+        errors: List[BaseException] = []
+        answered_404: List[EndpointState] = []
+        next_index = 0
+        hedged = False
+
+        def launch():
+            nonlocal next_index
+            state = candidates[next_index]
+            next_index += 1
+            tasks[asyncio.ensure_future(self._attempt(state, call))] = state
+
+        launch()
+        try:
+            while True:
+                pending = [task for task in tasks if not task.done()]
+                can_hedge = not hedged and next_index < len(candidates)
+                if pending:
+                    done, _ = await asyncio.wait(pending, timeout=self.hedge_delay(primary) if can_hedge else None,
+                                                 return_when=asyncio.FIRST_COMPLETED)
+                    if not done:
+                        hedged = True
+                        self.hedges += 1
+                        launch()
+                        continue
+                    for task in done:
+                        if task.exception() is None:
+                            if tasks[task] is not primary:
+                                self.hedge_wins += 1
+                            return task.result()
+                        errors.append(task.exception())
+                        if min_round is not None and _not_found(task.exception()):
+                            answered_404.append(tasks[task])
+                if any(not task.done() for task in tasks):
+                    continue
+                if next_index < len(candidates) and errors and (
+                        _retryable(errors[-1]) or (min_round is not None and _not_found(errors[-1]))):
+                    self.failovers += 1
+                    launch()
+                    continue
+                if answered_404 and not any(state.last_round is None or state.last_round >= min_round
+                                            for state in answered_404):
+                    raise RoundNotReachedError(min_round) from errors[0]
+                raise errors[0]
+        finally:
+            losers = [task for task in tasks if not task.done()]
+            for task in losers:
+                task.cancel()
+            # Cancelling aborts the HTTP request; wait so in-flight counts are settled on return.
+            await asyncio.gather(*losers, return_exceptions=True)
+
+    async def _failover(self, call: Callable[[object], Awaitable], candidates: Optional[List[EndpointState]] = None,
+                        long_poll: bool = False):
+        """Run ``call`` on one node at a time, moving on only after retryable errors."""
+        self._ensure_probing()
+        errors = []
+        for state in candidates or self.ranked():
+            try:
+                return await self._attempt(state, call, long_poll)
+            except Exception as exc:
+                errors.append(exc)
+                if not _retryable(exc):
+                    raise
+                self.failovers += 1
+        raise errors[0]
+
+    # -- AsyncAlgodClient interface -------------------------------------
+
+    async def request(self, method: str, path: str, timeout: Optional[float] = None, raw: bool = False,
+                      **kwargs):
+        def call(client):
+            return client.request(method, path, timeout=timeout, raw=raw, **kwargs)
+
+        if method.upper() == 'GET':
+            match = ROUND_PATH.match(path)
+            return await self._hedged(call, int(match.group(1)) if match else None)
+        return await self._failover(call)
+
+    async def status(self, timeout: Optional[float] = None) -> dict:
+        return await self._hedged(lambda client: client.status(timeout=timeout))
+
+    async def status_after_block(self, round_number: int, timeout: Optional[float] = None) -> dict:
+        # A long poll: ask the most current node, and never hedge it.
+        self._ensure_probing()
+        candidates = sorted(self.ranked(), key=lambda state: (not state.healthy, -(state.last_round or 0)))
+        return await self._failover(lambda client: client.status_after_block(round_number, timeout=timeout),
+                                    candidates, long_poll=True)
+
+    async def suggested_params(self, timeout: Optional[float] = None):
+        return await self._hedged(lambda client: client.suggested_params(timeout=timeout))
+
+    async def send_raw_transactions(self, blobs: List[bytes], timeout: Optional[float] = None) -> str:
+        # Resubmitting the same signed bytes elsewhere is safe: algod dedupes by txid.
+        return await self._failover(lambda client: client.send_raw_transactions(blobs, timeout=timeout))
+
+    async def pending_transaction_info(self, txid: str, timeout: Optional[float] = None) -> dict:
+        return await self._hedged(lambda client: client.pending_transaction_info(txid, timeout=timeout))
+
+    async def compile(self, source: str, timeout: Optional[float] = None) -> dict:
+        return await self._hedged(lambda client: client.compile(source, timeout=timeout))
+
+    async def block(self, round_number: int, timeout: Optional[float] = None) -> dict:
+        return await self._hedged(lambda client: client.block(round_number, timeout=timeout), round_number)
+
+    async def application_info(self, app_id: int, timeout: Optional[float] = None) -> dict:
+        return await self._hedged(lambda client: client.application_info(app_id, timeout=timeout))
+
+    def stats(self) -> dict:
+        return {'hedges': self.hedges, 'hedge_wins': self.hedge_wins, 'failovers': self.failovers,
+                'healthy': sum(state.healthy for state in self.states),
+                'endpoints': [state.snapshot() for state in self.states]}
+
+    async def aclose(self) -> None:
+        task, self._probe_task = self._probe_task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
+        for state in self.states:
+            await state.client.aclose()
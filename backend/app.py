@@ -1,108 +1,323 @@
 """
 Module: app.py
-Description: Implementation of app.py for Lucid project.
+Description: FastAPI application factory for the Lucid backend.
+
+Importing this module has no side effects and stays cheap. ``create_app``'s
+lifespan loads ``backend/.env``, validates settings and mounts the static
+directories. Algod/indexer clients and background workers are built on first
+use, and algosdk is imported only by the code paths that need it.
+
+Run with ``uvicorn backend.app:app`` or ``uvicorn --factory backend.app:create_app``.
 """
 
+import asyncio
 from base64 import b64decode, b64encode
+from contextlib import asynccontextmanager
+from functools import cached_property
 import json
+import logging
 import os
 from pathlib import Path
-from typing import List, Optional
+from typing import Dict, List, Mapping, Optional, Tuple
 
-from algosdk.transaction import ApplicationCallTxn, OnComplete
-from algosdk.v2client.algod import AlgodClient
-from dotenv import load_dotenv
-from fastapi import FastAPI, HTTPException
+from fastapi import APIRouter, Depends, FastAPI, Header, HTTPException, Query, Request, Response
+from fastapi.exceptions import RequestValidationError
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.staticfiles import StaticFiles
-from pydantic import BaseModel
-
-env_path = Path(__file__).resolve().parent / '.env'
-load_dotenv(dotenv_path=os.environ.get('DOTENV_PATH', str(env_path)))
-
-APP_CONFIG_PATH = Path(__file__).resolve().parent / 'app_config.json'
-
-
-def read_app_config() -> Optional[int]:
-    if not APP_CONFIG_PATH.exists():
-        return None
-    try:
-        data = json.loads(APP_CONFIG_PATH.read_text())
-    except (json.JSONDecodeError, OSError):
-        return None
-    app_id = data.get('app_id')
-    if isinstance(app_id, int):
-        return app_id
-    if isinstance(app_id, str) and app_id.isdigit():
-        return int(app_id)
-    return None
-
-
-def get_current_app_id() -> int:
-    configured = read_app_config()
-    if configured is not None:
-        return configured
-    fallback = os.environ.get('APP_ID', '0')
-    try:
-        return int(fallback)
-    except ValueError:
-        return 0
+from fastapi.responses import JSONResponse, StreamingResponse
+from pydantic import BaseModel, ValidationError
+
+from backend.admission import OverloadedError, RateLimitedError, TooManySendersError
+from backend.algod_pool import endpoints_from_env
+from backend.broadcast import (
+    PreflightError,
+    QueueClosedError,
+    QueueFullError,
+    TransactionRejectedError,
+    first_sender,
+    preflight,
+)
+from backend.ipfs_cid import cid_stream
+from backend.metrics import CONTENT_TYPE as METRICS_CONTENT_TYPE, REGISTRY, MetricsMiddleware, phase
+from backend.static_assets import CompressedStaticFiles, accepted_encodings
+from backend.uploads import UploadTooLargeError, hash_stream
+
+logger = logging.getLogger(__name__)
+
+BACKEND_DIR = Path(__file__).resolve().parent
+REPO_ROOT = BACKEND_DIR.parent
+ENV_PATH = BACKEND_DIR / '.env'
+APP_CONFIG_PATH = BACKEND_DIR / 'app_config.json'
+
+# (mount path, directory under the repo root, route name, html mode). The catch-all
+# frontend mount comes last so it does not shadow anything mounted after the API.
+STATIC_MOUNTS = (
+    ('/modules/lute-connect', 'node_modules/lute-connect/dist', 'lute', False),
+    ('/modules/algosdk', 'node_modules/algosdk/dist', 'algosdk', False),
+    ('/modules/walletconnect-client', 'node_modules/@walletconnect/client/dist/esm', 'wc_client', False),
+    ('/modules/walletconnect-qrcode-modal', 'node_modules/@walletconnect/qrcode-modal/dist/umd', 'wc_qrcode', False),
+    ('/', 'frontend', 'frontend', True),
+)
 
-ALGOD_ADDRESS = os.environ.get('ALGOD_ADDRESS')
-ALGOD_TOKEN = os.environ.get('ALGOD_TOKEN', '')
+# Algorand caps atomic groups at 16 transactions.
+MAX_GROUP_SIZE = 16
+WEIGHT_PAGE_MAX = 1000
+BROADCAST_WAIT_MODES = ('queued', 'submitted', 'confirmed')
+MSGPACK = 'application/msgpack'
+
+
+class Services:
+    """Settings, clients and background workers for one running app.
+
+    Settings are read eagerly so a misconfigured worker fails at startup; every
+    client and worker is a ``cached_property`` built the first time it is used.
+    """
+
+    def __init__(self, env: Mapping[str, str], base_env: Optional[Mapping[str, str]] = None):
+        self.env = env
+        # ``env`` without ``.env`` merged in; the config store re-reads the file over it on every change.
+        self.base_env = env if base_env is None else base_env
+        self.algod_endpoints = endpoints_from_env(env)
+        if not self.algod_endpoints:
+            raise RuntimeError(
+                'ALGOD_ADDRESS (or ALGOD_ENDPOINTS) must be set in backend/.env before starting the backend')
+        # The first endpoint backs the synchronous client; async traffic goes through the pool.
+        primary = self.algod_endpoints[0]
+        self.algod_address = primary.address
+        self.algod_token = primary.token
+        self.algod_headers = primary.headers
+        self.algod_timeout = float(env.get('ALGOD_TIMEOUT', '10'))
+        self.broadcast_confirm_rounds = int(env.get('BROADCAST_CONFIRM_ROUNDS', '10'))
+        self.sse_keepalive_seconds = float(env.get('SSE_KEEPALIVE_SECONDS', '15'))
+        self.max_batch_items = int(env.get('MAX_BATCH_ITEMS', '4096'))
+        self.stats_max_apps = int(env.get('STATS_MAX_APPS', '4'))
+        self.max_upload_bytes = int(env.get('MAX_UPLOAD_BYTES', str(16 << 30)))
+        # Waiting uploads are not read, so TCP backpressure holds their senders.
+        self.upload_slots = asyncio.Semaphore(int(env.get('MAX_CONCURRENT_UPLOADS', '32')))
+        self.stats_views: Dict[int, object] = {}
+        self.stats_lock = asyncio.Lock()
+        self.weight_indexer = None
+        self.media_indexer = None
+
+    @cached_property
+    def config_store(self):
+        from backend.config import ConfigStore
+
+        return ConfigStore(
+            Path(self.env.get('DOTENV_PATH', str(ENV_PATH))),
+            APP_CONFIG_PATH,
+            poll_interval=float(self.env.get('CONFIG_POLL_INTERVAL', '1')),
+            env=self.base_env,
+        )
+
+    @cached_property
+    def algod_client(self):
+        from algosdk.v2client.algod import AlgodClient
+
+        return AlgodClient(self.algod_token, self.algod_address, headers=self.algod_headers or None)
+
+    @cached_property
+    def async_algod_client(self):
+        from backend.algod_pool import AlgodPool
+
+        return AlgodPool(
+            self.algod_endpoints,
+            timeout=self.algod_timeout,
+            max_connections=int(self.env.get('ALGOD_POOL_SIZE', '20')),
+            max_lag=int(self.env.get('ALGOD_MAX_LAG', '2')),
+            max_failures=int(self.env.get('ALGOD_MAX_FAILURES', '3')),
+            probe_interval=float(self.env.get('ALGOD_PROBE_INTERVAL', '2')),
+            hedge_min=float(self.env.get('ALGOD_HEDGE_MIN_MS', '5')) / 1000,
+        )
+
+    @cached_property
+    def params_cache(self):
+        from backend.params_cache import SuggestedParamsCache
+
+        return SuggestedParamsCache(
+            lambda: self.algod_client.suggested_params(),
+            ttl=float(self.env.get('SUGGESTED_PARAMS_TTL', '5')),
+            afetch=lambda: self.async_algod_client.suggested_params(),
+        )
+
+    @cached_property
+    def broadcast_queue(self):
+        from backend.broadcast import BroadcastQueue
+
+        return BroadcastQueue(
+            lambda blobs: self.async_algod_client.send_raw_transactions(blobs),
+            max_queue=int(self.env.get('BROADCAST_QUEUE_SIZE', '256')),
+            concurrency=int(self.env.get('BROADCAST_CONCURRENCY', '4')),
+            recent_ttl=float(self.env.get('BROADCAST_DEDUPE_TTL', '300')),
+            recent_max=int(self.env.get('BROADCAST_DEDUPE_MAX', '10000')),
+        )
+
+    @cached_property
+    def admission(self):
+        from backend.admission import AdmissionController
+
+        return AdmissionController(
+            rate=float(self.env.get('ADMISSION_RATE', '500')),
+            burst=float(self.env.get('ADMISSION_BURST', '1000')),
+            sender_rate=float(self.env.get('ADMISSION_SENDER_RATE', '20')),
+            sender_burst=float(self.env.get('ADMISSION_SENDER_BURST', '40')),
+            max_senders=int(self.env.get('ADMISSION_MAX_SENDERS', '100000')),
+            max_request_senders=int(self.env.get('ADMISSION_MAX_REQUEST_SENDERS', '64')),
+            concurrency=int(self.env.get('ADMISSION_CONCURRENCY', '64')),
+            max_waiting=int(self.env.get('ADMISSION_MAX_QUEUED', '256')),
+            max_wait=float(self.env.get('ADMISSION_MAX_WAIT', '2')),
+        )
+
+    @cached_property
+    def tracker(self):
+        from backend.tracker import ConfirmationTracker
+
+        tracker = ConfirmationTracker(self.async_algod_client)
+        tracker.on_round(lambda round_number: self.params_cache.observe_round(round_number))
+        return tracker
+
+    @cached_property
+    def indexer_http(self):
+        address = self.env.get('INDEXER_ADDRESS', '')
+        if not address:
+            return None
+        import httpx
+
+        return httpx.AsyncClient(
+            base_url=address.rstrip('/'),
+            headers={'X-Indexer-API-Token': self.env.get('INDEXER_TOKEN', '')},
+            timeout=self.algod_timeout,
+        )
+
+    def build_weight_indexer(self):
+        database = self.env.get('WEIGHT_INDEX_DB', '')
+        if not database:
+            return None
+        app_id = int(self.env.get('WEIGHT_INDEX_APP_ID') or self.config_store.current().app_id)
+        if not app_id:
+            return None
+        from backend.weight_index import WeightIndex, WeightIndexer
+
+        start_round = self.env.get('WEIGHT_INDEX_START_ROUND')
+        return WeightIndexer(
+            WeightIndex(database, app_id),
+            self.async_algod_client,
+            start_round=int(start_round) if start_round else None,
+            window=int(self.env.get('WEIGHT_INDEX_WINDOW', '8')),
+        )
+
+    def build_media_indexer(self):
+        database = self.env.get('MEDIA_INDEX_DB', '')
+        if not database:
+            return None
+        app_id = int(self.env.get('MEDIA_INDEX_APP_ID') or self.config_store.current().app_id)
+        if not app_id:
+            return None
+        from backend.media_index import MediaIndex, MediaIndexer
+
+        start_round = self.env.get('MEDIA_INDEX_START_ROUND')
+        index = MediaIndex(
+            database,
+            app_id,
+            bloom_capacity=int(self.env.get('MEDIA_INDEX_BLOOM_CAPACITY', '1000000')),
+            bloom_error_rate=float(self.env.get('MEDIA_INDEX_BLOOM_ERROR_RATE', '0.01')),
+        )
+        return MediaIndexer(
+            index,
+            self.async_algod_client,
+            start_round=int(start_round) if start_round else None,
+            window=int(self.env.get('MEDIA_INDEX_WINDOW', '8')),
+        )
+
+    def created(self, name: str) -> bool:
+        return name in self.__dict__
+
+    def collect_metrics(self):
+        """Scrape-time gauges for components that keep their own counters."""
+        if self.created('params_cache'):
+            for key, value in self.params_cache.stats().items():
+                if value is not None:
+                    yield f'lucid_params_cache_{key}', f'Suggested-params cache {key}.', value
+        if self.created('broadcast_queue'):
+            for key, value in self.broadcast_queue.stats().items():
+                yield f'lucid_broadcast_{key}', f'Broadcast queue {key}.', value
+        if self.created('admission'):
+            for key, value in self.admission.stats().items():
+                yield f'lucid_admission_{key}', f'Admission control {key}.', value
+        if self.created('async_algod_client'):
+            for key, value in self.async_algod_client.stats().items():
+                if key != 'endpoints':
+                    yield f'lucid_algod_pool_{key}', f'Algod pool {key}.', value
+
+    async def start(self) -> None:
+        REGISTRY.add_collector(self.collect_metrics)
+        self.config_store.start()
+        await self.broadcast_queue.start()
+        self.weight_indexer = self.build_weight_indexer()
+        if self.weight_indexer is not None:
+            self.weight_indexer.start()
+        self.media_indexer = self.build_media_indexer()
+        if self.media_indexer is not None:
+            self.media_indexer.start()
+
+    async def stop(self) -> None:
+        REGISTRY.remove_collector(self.collect_metrics)
+        # Only tear down what was actually created; shutdown must not build clients.
+        if self.weight_indexer is not None:
+            await self.weight_indexer.stop()
+            self.weight_indexer.index.close()
+            self.weight_indexer = None
+        if self.media_indexer is not None:
+            await self.media_indexer.stop()
+            self.media_indexer.index.close()
+            self.media_indexer = None
+        if self.created('tracker'):
+            await self.tracker.stop()
+        if self.created('broadcast_queue'):
+            await self.broadcast_queue.stop()
+        if self.created('config_store'):
+            self.config_store.stop()
+        if self.created('async_algod_client'):
+            await self.async_algod_client.aclose()
+        if self.created('indexer_http') and self.indexer_http is not None:
+            await self.indexer_http.aclose()
+
+
+def get_services(request: Request) -> Services:
+    return request.app.state.services
+
+
+def mount_static(app: FastAPI, root: Path = REPO_ROOT) -> None:
+    """Mount the static directories that exist; missing bundles are logged, not fatal."""
+    if getattr(app.state, 'static_mounted', False):
+        return
+    for path, directory, name, html in STATIC_MOUNTS:
+        full = root / directory
+        if not full.is_dir():
+            logger.warning('Static directory %s is missing; %s will not be served', full, path)
+            continue
+        app.mount(path, CompressedStaticFiles(directory=full, html=html), name=name)
+    app.state.static_mounted = True
 
-if not ALGOD_ADDRESS:
-    raise RuntimeError('ALGOD_ADDRESS must be set in backend/.env before starting the backend')
 
-algod_headers = {}
-ALGOD_HEADER_KV = os.environ.get('ALGOD_HEADER_KV', '')
-if ALGOD_HEADER_KV:
-    for kv in ALGOD_HEADER_KV.split(';'):
-        if not kv.strip():
-            continue
-        if '=' in kv:
-            key, value = kv.split('=', 1)
-        elif ':' in kv:
-            key, value = kv.split(':', 1)
-        else:
-            continue
-        algod_headers[key.strip()] = value.strip()
+router = APIRouter()
 
-algod_client = AlgodClient(ALGOD_TOKEN, ALGOD_ADDRESS, headers=algod_headers or None)
 
-app = FastAPI(title='DropPay API')
-app.add_middleware(
-    CORSMiddleware,
-    allow_origins=['*'],
-    allow_methods=['*'],
-    allow_headers=['*'],
-)
+@router.get('/api/config')
+def get_config(if_none_match: Optional[str] = Header(default=None), services: Services = Depends(get_services)):
+    from backend.config import etag_matches
 
-app.mount('/modules/lute-connect', StaticFiles(directory=os.path.join(os.path.dirname(__file__), '..', 'node_modules', 'lute-connect', 'dist')), name='lute')
-app.mount('/modules/algosdk', StaticFiles(directory=os.path.join(os.path.dirname(__file__), '..', 'node_modules', 'algosdk', 'dist')), name='algosdk')
-app.mount('/modules/walletconnect-client', StaticFiles(directory=os.path.join(os.path.dirname(__file__), '..', 'node_modules', '@walletconnect', 'client', 'dist', 'esm')), name='wc_client')
-app.mount('/modules/walletconnect-qrcode-modal', StaticFiles(directory=os.path.join(os.path.dirname(__file__), '..', 'node_modules', '@walletconnect', 'qrcode-modal', 'dist', 'umd')), name='wc_qrcode')
-
-@app.get('/api/config')
-def get_config():
-    # Force reload .env to pick up manual changes without restart
-    load_dotenv(dotenv_path=os.environ.get('DOTENV_PATH', str(env_path)), override=True)
-    
-    config = {
-        'app_id': get_current_app_id(),
-        'algod_url': os.environ.get('ALGOD_ADDRESS'), # Read directly from env after reload
-        'algod_token': os.environ.get('ALGOD_TOKEN', ''),
-        'walletconnect_project_id': os.environ.get('WALLETCONNECT_PROJECT_ID', ''),
-        'genesis_hash': 'SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=',
-        'genesis_id': 'testnet-v1.0'
-    }
-    return config
-
-app.mount('/', StaticFiles(directory=os.path.join(os.path.dirname(__file__), '..', 'frontend'), html=True), name='frontend')
+    snapshot = services.config_store.current()
+    headers = {'ETag': snapshot.etag, 'Cache-Control': 'no-cache'}
+    if etag_matches(if_none_match, snapshot.etag):
+        return Response(status_code=304, headers=headers)
+    return Response(content=snapshot.body, media_type='application/json', headers=headers)
 
 
 class SignedPayload(BaseModel):
     signed: List[str]
+    # 'queued' returns once accepted by the queue, 'submitted' once algod accepts
+    # the group and 'confirmed' once it lands in a block.
+    wait: str = 'submitted'
 
 
 class MediaTxRequest(BaseModel):
@@ -120,6 +335,16 @@ class VerifyTxRequest(BaseModel):
     ipfs_cid: str
 
 
+class MediaBatchRequest(BaseModel):
+    items: List[MediaTxRequest]
+    group_size: Optional[int] = None
+
+
+class VerifyBatchRequest(BaseModel):
+    items: List[VerifyTxRequest]
+    group_size: Optional[int] = None
+
+
 def decode_arg(value: str) -> bytes:
     try:
         return b64decode(value)
@@ -127,8 +352,75 @@ def decode_arg(value: str) -> bytes:
         raise HTTPException(status_code=400, detail=f'Invalid base64 payload: {exc}')
 
 
-def build_app_call(sender: str, app_id: int, app_args: List[bytes]) -> ApplicationCallTxn:
-    params = algod_client.suggested_params()
+def is_msgpack(content_type: Optional[str]) -> bool:
+    return (content_type or '').partition(';')[0].strip().lower() == MSGPACK
+
+
+def accepts_msgpack(accept: Optional[str]) -> bool:
+    """True when ``Accept`` lists msgpack with a q-value above 0 and at least JSON's."""
+    accepted = accepted_encodings(accept)
+    quality = accepted.get(MSGPACK, 0.0)
+    json_quality = accepted.get('application/json', accepted.get('application/*', accepted.get('*/*', 0.0)))
+    return quality > 0 and quality >= json_quality
+
+
+def canonical(fields: dict) -> dict:
+    # algosdk's canonical form: keys sorted, zero values dropped, nested maps sorted the same way.
+    return {key: canonical(value) if isinstance(value, dict) else value
+            for key, value in sorted(fields.items()) if isinstance(value, dict) or value}
+
+
+def encode_txn(txn) -> bytes:
+    """Raw canonical msgpack of ``txn``: the bytes ``msgpack_encode`` base64-encodes."""
+    import msgpack
+
+    return msgpack.packb(canonical(txn.dictify()), use_bin_type=True)
+
+
+def respond(request: Request, body: dict, status_code: int = 200) -> Response:
+    """Encode a transaction endpoint's ``body`` as the client asked.
+
+    With ``Accept: application/msgpack`` the body is sent as msgpack and
+    ``unsigned`` transactions stay raw bytes. Otherwise it is JSON with
+    transactions as base64 strings.
+    """
+    if accepts_msgpack(request.headers.get('accept')):
+        import msgpack
+
+        return Response(msgpack.packb(body, use_bin_type=True), status_code=status_code, media_type=MSGPACK)
+    if 'unsigned' in body:
+        body = {**body, 'unsigned': [b64encode(txn).decode() for txn in body['unsigned']]}
+    return JSONResponse(body, status_code=status_code)
+
+
+async def read_signed_payload(request: Request) -> Tuple[List[bytes], str]:
+    """Signed blobs and wait mode from a JSON ``SignedPayload`` or its msgpack form.
+
+    The msgpack body is a map like the JSON one, with ``signed`` holding raw
+    ``bin`` values, so no base64 is involved on either side.
+    """
+    body = await request.body()
+    if is_msgpack(request.headers.get('content-type')):
+        import msgpack
+
+        try:
+            payload = msgpack.unpackb(body, raw=False)
+        except Exception as exc:
+            raise HTTPException(status_code=400, detail=f'Invalid msgpack body: {exc}')
+        signed = payload.get('signed') if isinstance(payload, dict) else None
+        if not isinstance(signed, list) or not all(isinstance(blob, bytes) for blob in signed):
+            raise HTTPException(status_code=400, detail="msgpack body must be a map with 'signed': [bin, ...]")
+        return signed, payload.get('wait', 'submitted')
+    try:
+        payload = SignedPayload.model_validate_json(body)
+    except ValidationError as exc:
+        raise RequestValidationError(exc.errors(include_url=False), body=body)
+    return [decode_arg(txn) for txn in payload.signed], payload.wait
+
+
+def build_app_call(sender: str, app_id: int, app_args: List[bytes], params):
+    from algosdk.transaction import ApplicationCallTxn, OnComplete
+
     return ApplicationCallTxn(
         sender,
         params,
@@ -138,30 +430,455 @@ def build_app_call(sender: str, app_id: int, app_args: List[bytes]) -> Applicati
     )
 
 
-@app.post('/api/unsigned/media/register')
-def create_register_payload(payload: MediaTxRequest):
+def register_args(payload: MediaTxRequest) -> List[bytes]:
     args = [b'register', decode_arg(payload.media_hash), decode_arg(payload.metadata)]
     if payload.nonce:
         args.append(decode_arg(payload.nonce))
-    txn = build_app_call(payload.sender, payload.app_id, args)
-    return {'unsigned': [b64encode(txn.serialize()).decode()]}
+    return args
+
+
+def verify_args(payload: VerifyTxRequest) -> List[bytes]:
+    return [b'verify', decode_arg(payload.content_hash), decode_arg(payload.ipfs_cid)]
+
+
+def parse_media_hash(value: str) -> bytes:
+    """Read a hash from a URL: hex, or base64 in either alphabet with optional padding."""
+    from base64 import urlsafe_b64decode
+
+    try:
+        if len(value) == 64:
+            return bytes.fromhex(value)
+        return urlsafe_b64decode(value.replace('+', '-').replace('/', '_') + '=' * (-len(value) % 4))
+    except ValueError as exc:
+        raise HTTPException(status_code=400, detail=f'Invalid media hash: {exc}')
+
+
+async def check_not_registered(services: Services, app_id: int, media_hash: bytes) -> None:
+    """409 if the media index has already seen ``media_hash`` registered with ``app_id``."""
+    indexer = services.media_indexer
+    if indexer is None or indexer.index.app_id != app_id or media_hash not in indexer.index.bloom:
+        return
+    existing = await asyncio.to_thread(indexer.index.registration, media_hash)
+    if existing is not None:
+        raise HTTPException(status_code=409, detail={'message': 'Media hash is already registered',
+                                                     'registration': existing})
+
+
+def admit(services: Services, senders: List[str]) -> None:
+    """Charge the request to the admission token buckets; 400 for a bad sender, 429 when a bucket is empty.
+
+    Senders are validated first, so made-up strings never get a bucket of their
+    own, and a request naming too many distinct senders is refused outright.
+    """
+    from algosdk import encoding
+
+    for sender in senders:
+        if not encoding.is_valid_address(sender):
+            raise HTTPException(status_code=400, detail=f'Invalid sender address {sender}')
+    try:
+        services.admission.check(senders)
+    except TooManySendersError as exc:
+        raise HTTPException(status_code=400, detail=str(exc))
+    except RateLimitedError as exc:
+        raise HTTPException(status_code=429, detail=str(exc), headers={'Retry-After': exc.retry_after_header})
 
 
-@app.post('/api/unsigned/media/verify')
-def create_verify_payload(payload: VerifyTxRequest):
-    args = [b'verify', decode_arg(payload.content_hash), decode_arg(payload.ipfs_cid)]
-    txn = build_app_call(payload.sender, payload.app_id, args)
-    return {'unsigned': [b64encode(txn.serialize()).decode()]}
+async def run_admitted(services: Services, lane: str, call, key=None):
+    """Run ``call`` under a ``lane`` slot, coalesced with identical in-flight requests when ``key`` is given."""
+    try:
+        if key is not None:
+            return await services.admission.coalesce(key, lane, call)
+        async with services.admission.slot(lane):
+            return await call()
+    except OverloadedError as exc:
+        raise HTTPException(status_code=503, detail=str(exc), headers={'Retry-After': exc.retry_after_header})
+
+
+async def build_batch(services: Services, items: list, group_size: Optional[int], args_for) -> dict:
+    """Build one app call per item against a single params fetch, optionally grouped."""
+    from algosdk.transaction import assign_group_id
+
+    if not items:
+        raise HTTPException(status_code=400, detail='Provide at least one item')
+    if len(items) > services.max_batch_items:
+        raise HTTPException(status_code=400, detail=f'Batch exceeds {services.max_batch_items} items')
+    if group_size is not None and not 1 <= group_size <= MAX_GROUP_SIZE:
+        raise HTTPException(status_code=400, detail=f'group_size must be between 1 and {MAX_GROUP_SIZE}')
+
+    with phase('suggested_params'):
+        params = await services.params_cache.aget()
+    with phase('build_app_call'):
+        txns = [build_app_call(item.sender, item.app_id, args_for(item), params) for item in items]
+    groups = []
+    if group_size:
+        for start in range(0, len(txns), group_size):
+            chunk = txns[start:start + group_size]
+            assign_group_id(chunk)
+            groups.append({
+                'group_id': b64encode(chunk[0].group).decode(),
+                'indexes': list(range(start, start + len(chunk))),
+            })
+    with phase('encode'):
+        unsigned = [encode_txn(txn) for txn in txns]
+    return {'unsigned': unsigned, 'groups': groups}
+
+
+async def build_single(services: Services, payload, args: List[bytes]) -> dict:
+    with phase('suggested_params'):
+        params = await services.params_cache.aget()
+    with phase('build_app_call'):
+        txn = build_app_call(payload.sender, payload.app_id, args, params)
+    with phase('encode'):
+        unsigned = encode_txn(txn)
+    return {'unsigned': [unsigned]}
+
+
+@router.post('/api/unsigned/media/register')
+async def create_register_payload(payload: MediaTxRequest, request: Request,
+                                  services: Services = Depends(get_services)):
+    admit(services, [payload.sender])
+    args = register_args(payload)
+
+    async def build():
+        await check_not_registered(services, payload.app_id, args[1])
+        return await build_single(services, payload, args)
+    return respond(request, await run_admitted(services, 'unsigned', build,
+                                               key=('register', payload.model_dump_json())))
+
+
+@router.post('/api/unsigned/media/verify')
+async def create_verify_payload(payload: VerifyTxRequest, request: Request,
+                                services: Services = Depends(get_services)):
+    admit(services, [payload.sender])
+    args = verify_args(payload)
+    return respond(request, await run_admitted(services, 'unsigned', lambda: build_single(services, payload, args),
+                                               key=('verify', payload.model_dump_json())))
+
+
+def check_upload(request: Request, services: Services) -> None:
+    """Reject oversized bodies before reading a possibly multi-GB body; ``admit`` has checked the sender."""
+    declared = request.headers.get('content-length')
+    if declared and declared.isdigit() and int(declared) > services.max_upload_bytes:
+        raise HTTPException(status_code=413, detail=f'Upload exceeds {services.max_upload_bytes} bytes')
+
+
+@router.post('/api/unsigned/media/register/upload')
+async def create_register_upload(request: Request, app_id: int, sender: str, metadata: str,
+                                 nonce: Optional[str] = None, services: Services = Depends(get_services)):
+    """Hash the raw request body as it streams in and return the unsigned ``register`` call.
+
+    The file is sent as the body itself (``fetch(url, {method: 'POST', body: file})``),
+    so neither the browser nor the server holds it in memory.
+    """
+    admit(services, [sender])
+    metadata_bytes = decode_arg(metadata)
+    if nonce:
+        decode_arg(nonce)
+    check_upload(request, services)
+
+    async with services.upload_slots:
+        try:
+            digest, size = await hash_stream(request.stream(), max_bytes=services.max_upload_bytes)
+        except UploadTooLargeError as exc:
+            raise HTTPException(status_code=413, detail=str(exc))
+    if not size:
+        raise HTTPException(status_code=400, detail='Upload body is empty')
+
+    payload = MediaTxRequest(app_id=app_id, sender=sender, media_hash=b64encode(digest).decode(),
+                             metadata=b64encode(metadata_bytes).decode(), nonce=nonce)
+
+    async def build():
+        await check_not_registered(services, app_id, digest)
+        return await build_single(services, payload, register_args(payload))
+    response = await run_admitted(services, 'unsigned', build)
+    return respond(request, {**response, 'media_hash': payload.media_hash, 'size': size})
+
+
+@router.post('/api/unsigned/media/verify/upload')
+async def create_verify_upload(request: Request, app_id: int, sender: str, cid_version: int = Query(0, ge=0, le=1),
+                               services: Services = Depends(get_services)):
+    """Derive ``content_hash`` and ``ipfs_cid`` from one pass over the streamed body.
+
+    The CID is what ``ipfs add`` (or ``ipfs add --cid-version=1``) reports for
+    the same file, computed locally; no IPFS node is involved. It is passed to
+    the contract as the ASCII bytes of its string form.
+    """
+    admit(services, [sender])
+    check_upload(request, services)
+
+    async with services.upload_slots:
+        try:
+            cid, digest, size = await cid_stream(request.stream(), cid_version,
+                                                 max_bytes=services.max_upload_bytes)
+        except UploadTooLargeError as exc:
+            raise HTTPException(status_code=413, detail=str(exc))
+    if not size:
+        raise HTTPException(status_code=400, detail='Upload body is empty')
+
+    payload = VerifyTxRequest(app_id=app_id, sender=sender, content_hash=b64encode(digest).decode(),
+                              ipfs_cid=b64encode(cid.encode()).decode())
+    response = await run_admitted(services, 'unsigned', lambda: build_single(services, payload, verify_args(payload)))
+    return respond(request, {**response, 'content_hash': payload.content_hash, 'ipfs_cid': cid, 'size': size})
+
+
+@router.post('/api/unsigned/media/register/batch')
+async def create_register_batch(payload: MediaBatchRequest, request: Request,
+                                services: Services = Depends(get_services)):
+    admit(services, [item.sender for item in payload.items])
+
+    async def build():
+        for item in payload.items:
+            await check_not_registered(services, item.app_id, decode_arg(item.media_hash))
+        return await build_batch(services, payload.items, payload.group_size, register_args)
+    return respond(request, await run_admitted(services, 'unsigned', build,
+                                               key=('register_batch', payload.model_dump_json())))
+
+
+@router.post('/api/unsigned/media/verify/batch')
+async def create_verify_batch(payload: VerifyBatchRequest, request: Request,
+                              services: Services = Depends(get_services)):
+    admit(services, [item.sender for item in payload.items])
+    return respond(request, await run_admitted(
+        services, 'unsigned', lambda: build_batch(services, payload.items, payload.group_size, verify_args),
+        key=('verify_batch', payload.model_dump_json())))
+
+
+def known_round(services: Services) -> Optional[int]:
+    """Latest round seen by the tracker or the params cache, without asking algod."""
+    if services.created('tracker') and services.tracker.last_round is not None:
+        return services.tracker.last_round
+    if services.created('params_cache'):
+        return services.params_cache.stats()['round']
+    return None
 
 
-@app.post('/api/broadcast')
-def broadcast_transactions(payload: SignedPayload):
-    if not payload.signed:
+@router.post('/api/broadcast')
+async def broadcast_transactions(request: Request, services: Services = Depends(get_services)):
+    """Submit a signed group, sent as a JSON ``SignedPayload`` or as ``application/msgpack``.
+
+    The blobs go to algod exactly as received; pre-flight reads them without re-encoding.
+    """
+    decoded, wait = await read_signed_payload(request)
+    if not decoded:
         raise HTTPException(status_code=400, detail='Provide at least one signed transaction blob')
+    if wait not in BROADCAST_WAIT_MODES:
+        raise HTTPException(status_code=400, detail=f'wait must be one of {", ".join(BROADCAST_WAIT_MODES)}')
+
+    sender = first_sender(decoded[0])
+    if sender is None:
+        raise HTTPException(status_code=400, detail='Invalid signed transaction')
+    admit(services, [sender])
+
+    async def submit():
+        try:
+            with phase('preflight'):
+                txid = preflight(decoded, known_round(services))[0]
+        except PreflightError as exc:
+            raise HTTPException(status_code=400, detail=str(exc))
+        try:
+            # The first txid commits to the whole group, so it keys retries of the same group;
+            # the queue coalesces those, so no singleflight key is needed here.
+            return txid, services.broadcast_queue.enqueue(decoded, key=txid)
+        except QueueFullError as exc:
+            raise HTTPException(status_code=429, detail=str(exc), headers={'Retry-After': '1'})
+        except QueueClosedError as exc:
+            raise HTTPException(status_code=503, detail=str(exc))
+    # The slot covers only the edge work; the queue bounds the submissions themselves.
+    txid, pending = await run_admitted(services, 'broadcast', submit)
+
+    if wait == 'queued':
+        return respond(request, {'txid': txid, 'status': 'queued'}, status_code=202)
 
     try:
-        decoded = [b64decode(txn) for txn in payload.signed]
-        txid = algod_client.send_transactions(decoded)
-        return {'txid': txid}
+        # Shielded so one client disconnecting does not cancel a submission others share.
+        txid = await asyncio.shield(pending)
+    except QueueClosedError as exc:
+        raise HTTPException(status_code=503, detail=str(exc))
     except Exception as exc:
-        raise HTTPException(status_code=500, detail=str(exc))
\ No newline at end of file
+        raise HTTPException(status_code=500, detail=str(exc))
+    if wait == 'submitted':
+        return respond(request, {'txid': txid})
+
+    try:
+        confirmed_round = await asyncio.shield(services.tracker.watch(txid, services.broadcast_confirm_rounds))
+    except TransactionRejectedError as exc:
+        raise HTTPException(status_code=409, detail=str(exc))
+    except TimeoutError as exc:
+        raise HTTPException(status_code=504, detail=str(exc))
+    return respond(request, {'txid': txid, 'confirmed_round': confirmed_round})
+
+
+async def get_stats_view(services: Services, app_id: int):
+    view = services.stats_views.get(app_id)
+    if view is not None:
+        return view
+    from algosdk import error
+    import httpx
+
+    from backend.stats import UmisStatsView, seed_view
+
+    async with services.stats_lock:
+        if app_id in services.stats_views:
+            return services.stats_views[app_id]
+        if len(services.stats_views) >= services.stats_max_apps:
+            raise HTTPException(status_code=400,
+                                detail=f'Stats are tracked for at most {services.stats_max_apps} apps')
+        tracker = services.tracker
+        view = UmisStatsView(app_id, on_change=lambda changed: tracker.publish('stats', {'app_id': changed.app_id}))
+        try:
+            await seed_view(view, services.async_algod_client, services.indexer_http)
+        except error.AlgodHTTPError as exc:
+            raise HTTPException(status_code=404 if exc.code == 404 else 502, detail=str(exc))
+        except httpx.HTTPError as exc:
+            raise HTTPException(status_code=502, detail=str(exc))
+        tracker.on_block(view.on_block, from_round=view.tracked_since_round + 1)
+        services.stats_views[app_id] = view
+        return view
+
+
+@router.get('/api/stats/{app_id}')
+async def get_stats(app_id: int, services: Services = Depends(get_services)):
+    view = await get_stats_view(services, app_id)
+    return Response(content=view.body(), media_type='application/json')
+
+
+def get_weight_index(services: Services, app_id: int):
+    indexer = services.weight_indexer
+    if indexer is None or indexer.index.app_id != app_id:
+        raise HTTPException(status_code=404, detail=f'No weight index for app {app_id}')
+    return indexer.index
+
+
+def check_limit(limit: int) -> int:
+    if not 1 <= limit <= WEIGHT_PAGE_MAX:
+        raise HTTPException(status_code=400, detail=f'limit must be between 1 and {WEIGHT_PAGE_MAX}')
+    return limit
+
+
+@router.get('/api/weights/{app_id}')
+def get_weight_summary(app_id: int, services: Services = Depends(get_services)):
+    return get_weight_index(services, app_id).summary()
+
+
+@router.get('/api/weights/{app_id}/top')
+def get_top_weights(app_id: int, limit: int = 100, services: Services = Depends(get_services)):
+    return {'accounts': get_weight_index(services, app_id).top(check_limit(limit))}
+
+
+@router.get('/api/weights/{app_id}/accounts')
+def list_weights(app_id: int, limit: int = 100, cursor: Optional[str] = None,
+                 services: Services = Depends(get_services)):
+    after = None
+    if cursor:
+        weight, _, address = cursor.partition(':')
+        if not weight.isdigit() or not address:
+            raise HTTPException(status_code=400, detail='cursor must look like <weight>:<address>')
+        after = (int(weight), address)
+    accounts = get_weight_index(services, app_id).page(check_limit(limit), after)
+    next_cursor = f"{accounts[-1]['weight']}:{accounts[-1]['address']}" if len(accounts) == limit else None
+    return {'accounts': accounts, 'next_cursor': next_cursor}
+
+
+@router.get('/api/weights/{app_id}/accounts/{address}')
+def get_account_weight(app_id: int, address: str, services: Services = Depends(get_services)):
+    account = get_weight_index(services, app_id).get(address)
+    if account is None:
+        raise HTTPException(status_code=404, detail=f'{address} is not opted in to app {app_id}')
+    return account
+
+
+def get_media_index(services: Services):
+    indexer = services.media_indexer
+    if indexer is None:
+        raise HTTPException(status_code=404, detail='No media index is configured')
+    return indexer.index
+
+
+@router.get('/api/media')
+def get_media_summary(services: Services = Depends(get_services)):
+    return get_media_index(services).summary()
+
+
+@router.get('/api/media/{media_hash}')
+def get_media(media_hash: str, services: Services = Depends(get_services)):
+    """Indexed ``register``/``verify`` calls for a hash given as hex or base64url."""
+    index = get_media_index(services)
+    digest = parse_media_hash(media_hash)
+    calls = index.get(digest)
+    if calls is None:
+        raise HTTPException(status_code=404, detail=f'{media_hash} is not indexed for app {index.app_id}')
+    return {'app_id': index.app_id, 'media_hash': b64encode(digest).decode(), **calls}
+
+
+@router.get('/metrics', include_in_schema=False)
+def get_metrics():
+    return Response(content=REGISTRY.render(), media_type=METRICS_CONTENT_TYPE)
+
+
+def format_sse(event: str, data: dict) -> str:
+    return f'event: {event}\ndata: {json.dumps(data, separators=(",", ":"))}\n\n'
+
+
+@router.get('/api/events')
+async def stream_events(request: Request, txid: List[str] = Query(default=[]),
+                        services: Services = Depends(get_services)):
+    """Server-Sent Events stream of new rounds and transaction confirmations."""
+    tracker = services.tracker
+    queue = tracker.subscribe()
+    for pending in txid:
+        tracker.watch(pending, services.broadcast_confirm_rounds)
+
+    async def events():
+        try:
+            yield format_sse('hello', {'round': tracker.last_round})
+            while not await request.is_disconnected():
+                try:
+                    event, data = await asyncio.wait_for(queue.get(), services.sse_keepalive_seconds)
+                except asyncio.TimeoutError:
+                    yield ': keepalive\n\n'
+                    continue
+                yield format_sse(event, data)
+        finally:
+            tracker.unsubscribe(queue)
+
+    return StreamingResponse(events(), media_type='text/event-stream',
+                             headers={'Cache-Control': 'no-cache', 'X-Accel-Buffering': 'no'})
+
+
+def create_app(env: Optional[Mapping[str, str]] = None, static_root: Path = REPO_ROOT) -> FastAPI:
+    """Build the API app. With ``env`` omitted, settings come from ``backend/.env`` and the process environment."""
+
+    @asynccontextmanager
+    async def lifespan(app: FastAPI):
+        if env is None:
+            from dotenv import dotenv_values
+
+            # Merged into a copy, so a key later deleted from .env does not linger in os.environ.
+            dotenv = dotenv_values(os.environ.get('DOTENV_PATH', str(ENV_PATH)))
+            settings = {**os.environ, **{key: value for key, value in dotenv.items() if value is not None}}
+            services = Services(settings, base_env=os.environ)
+        else:
+            services = Services(env)
+        app.state.services = services
+        # Mounted after the API routes so the catch-all frontend route cannot shadow them.
+        mount_static(app, static_root)
+        await services.start()
+        try:
+            yield
+        finally:
+            await services.stop()
+
+    app = FastAPI(title='DropPay API', lifespan=lifespan)
+    app.add_middleware(
+        CORSMiddleware,
+        allow_origins=['*'],
+        allow_methods=['*'],
+        allow_headers=['*'],
+    )
+    app.include_router(router)
+    # Outermost, so the timing includes CORS and FastAPI's own request handling.
+    app.add_middleware(MetricsMiddleware)
+    return app
+
+
+app = create_app()
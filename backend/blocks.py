@@ -0,0 +1,129 @@
+"""
+Module: blocks.py
+Description: Decoding helpers that turn msgpack blocks into per-app call effects.
+"""
+
+from base64 import b32encode, b64decode
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple, Union
+
+import msgpack
+from algosdk import encoding
+
+StateValue = Union[int, bytes, None]
+
+# OnCompletion codes as they appear in the "apan" field.
+NOOP, OPT_IN, CLOSE_OUT, CLEAR_STATE, UPDATE_APPLICATION, DELETE_APPLICATION = range(6)
+
+# EvalDelta action codes ("at").
+_SET_BYTES, _SET_UINT, _DELETE = 1, 2, 3
+
+
+@dataclass
+class AppCall:
+    """Effects of a single application call against the app being followed."""
+
+    round: int
+    intra: int
+    txid: Optional[str]
+    sender: str
+    on_complete: int
+    args: List[bytes]
+    accounts: List[str]
+    group: Optional[bytes]
+    global_delta: Dict[str, StateValue] = field(default_factory=dict)
+    local_deltas: Dict[str, Dict[str, StateValue]] = field(default_factory=dict)
+    inner_payments: List[Tuple[str, int]] = field(default_factory=list)
+
+
+def _delta_value(entry: dict) -> StateValue:
+    action = entry.get('at')
+    if action == _SET_UINT:
+        return entry.get('ui', 0)
+    if action == _SET_BYTES:
+        value = entry.get('bs', b'')
+        return value.encode('utf-8', 'surrogateescape') if isinstance(value, str) else value
+    return None
+
+
+def _decode_delta(delta: Optional[dict]) -> Dict[str, StateValue]:
+    return {key: _delta_value(entry) for key, entry in (delta or {}).items()}
+
+
+def decode_state(entries: Optional[list]) -> Dict[str, Union[int, bytes]]:
+    """Decode algod/indexer REST ``global-state``/``key-value`` lists into a plain dict."""
+    state = {}
+    for entry in entries or []:
+        key = b64decode(entry['key']).decode('utf-8', 'surrogateescape')
+        value = entry['value']
+        state[key] = value.get('uint', 0) if value.get('type') == _SET_UINT else b64decode(value.get('bytes', ''))
+    return state
+
+
+def _canonical(value):
+    if isinstance(value, dict):
+        return {key: _canonical(value[key]) for key in sorted(value)}
+    if isinstance(value, list):
+        return [_canonical(item) for item in value]
+    return value
+
+
+def block_txid(block: dict, stib: dict) -> str:
+    """Recompute a top-level transaction ID, restoring the genesis fields the block strips."""
+    txn = dict(stib['txn'])
+    if stib.get('hgi') and block.get('gen'):
+        txn['gen'] = block['gen']
+    if block.get('gh'):
+        txn['gh'] = block['gh']
+    packed = msgpack.packb(_canonical(txn), use_bin_type=True, unicode_errors='surrogateescape')
+    return b32encode(encoding.checksum(b'TX' + packed)).decode().strip('=')
+
+
+def _address(raw: Optional[bytes]) -> str:
+    return encoding.encode_address(raw) if raw else ''
+
+
+def _inner_payments(delta: dict) -> List[Tuple[str, int]]:
+    payments = []
+    for inner in delta.get('itx') or []:
+        txn = inner.get('txn', {})
+        if txn.get('type') == 'pay':
+            payments.append((_address(txn.get('rcv')), txn.get('amt', 0)))
+    return payments
+
+
+def _calls_in(stib: dict, app_id: int, body: dict, intra: int, with_txids: bool,
+              top_level: bool = True) -> Iterator[AppCall]:
+    txn = stib.get('txn', {})
+    delta = stib.get('dt') or {}
+    if txn.get('type') == 'appl' and txn.get('apid') == app_id:
+        sender = _address(txn.get('snd'))
+        accounts = [_address(raw) for raw in txn.get('apat') or []]
+        slots = [sender] + accounts
+        local_deltas = {}
+        for index, entries in (delta.get('ld') or {}).items():
+            if index < len(slots):
+                local_deltas[slots[index]] = _decode_delta(entries)
+        yield AppCall(
+            round=body.get('rnd', 0),
+            intra=intra,
+            txid=block_txid(body, stib) if with_txids and top_level else None,
+            sender=sender,
+            on_complete=txn.get('apan', NOOP),
+            args=list(txn.get('apaa') or []),
+            accounts=accounts,
+            group=txn.get('grp'),
+            global_delta=_decode_delta(delta.get('gd')),
+            local_deltas=local_deltas,
+            inner_payments=_inner_payments(delta),
+        )
+    # Other apps may call ours through inner transactions.
+    for inner in delta.get('itx') or []:
+        yield from _calls_in(inner, app_id, body, intra, with_txids, top_level=False)
+
+
+def app_calls(block: dict, app_id: int, with_txids: bool = False) -> Iterator[AppCall]:
+    """Yield every call to ``app_id`` in a decoded msgpack block, in block order."""
+    body = block.get('block', block)
+    for intra, stib in enumerate(body.get('txns') or []):
+        yield from _calls_in(stib, app_id, body, intra, with_txids)
@@ -0,0 +1,320 @@
+"""
+Module: broadcast.py
+Description: Bounded, coalescing submission queue between /api/broadcast and algod.
+
+Groups pass a local pre-flight check (decode, txid, group and validity checks)
+before they are queued, and recently submitted txids are remembered so client
+retries get the original result without another algod round-trip.
+"""
+
+import asyncio
+from base64 import b32encode
+from collections import OrderedDict
+import hashlib
+import logging
+import time
+from typing import Awaitable, Callable, Dict, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+SubmitFn = Callable[[List[bytes]], Awaitable[str]]
+
+
+class QueueFullError(Exception):
+    """Raised when the broadcast queue cannot accept more work."""
+
+
+class QueueClosedError(Exception):
+    """Raised when the broadcast queue is not running."""
+
+
+class TransactionRejectedError(Exception):
+    """Raised when algod drops a submitted transaction from its pool."""
+
+
+class PreflightError(ValueError):
+    """Raised when a signed group would be rejected by algod without reaching it."""
+
+
+MAX_GROUP_SIZE = 16
+
+
+def first_sender(blob: bytes) -> Optional[str]:
+    """Sender of the first transaction in ``blob``, without decoding the rest; None if unreadable."""
+    from algosdk import encoding
+    import msgpack
+
+    unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+    unpacker.feed(blob)
+    try:
+        return encoding.encode_address(next(unpacker)['txn']['snd'])
+    except Exception:
+        return None
+
+
+SIGNATURE_KEYS = ('sig', 'msig', 'lsig')
+
+
+def split_signed(blobs: List[bytes]) -> List[bytes]:
+    """Slice the raw ``txn`` map out of every signed transaction in ``blobs``, without decoding it.
+
+    A blob may hold several concatenated signed transactions, as algod accepts.
+    """
+    import msgpack
+
+    txns = []
+    for blob in blobs:
+        unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+        unpacker.feed(blob)
+        try:
+            while unpacker.tell() < len(blob):
+                txn = None
+                keys = set()
+                for _ in range(unpacker.read_map_header()):
+                    key = unpacker.unpack()
+                    keys.add(key)
+                    start = unpacker.tell()
+                    unpacker.skip()
+                    if key == 'txn':
+                        txn = blob[start:unpacker.tell()]
+                if txn is None or keys.isdisjoint(SIGNATURE_KEYS):
+                    raise PreflightError('Invalid signed transaction: not a signed transaction object')
+                txns.append(txn)
+        except PreflightError:
+            raise
+        except Exception as exc:
+            raise PreflightError(f'Invalid signed transaction: {exc}') from None
+    if not txns:
+        raise PreflightError('Invalid signed transaction: empty blob')
+    return txns
+
+
+def _map_header(count: int) -> bytes:
+    # Canonical msgpack uses the shortest header that fits.
+    return bytes([0x80 | count]) if count < 16 else b'\xde' + count.to_bytes(2, 'big')
+
+
+def _txn_fields(txn: bytes) -> Tuple[dict, bytes]:
+    """Decode a raw ``txn`` map's fields and return them with the map's bytes minus ``grp``.
+
+    The group ID hashes each transaction as it was before the ID was assigned,
+    which is the same canonical map without its ``grp`` pair.
+    """
+    import msgpack
+
+    unpacker = msgpack.Unpacker(raw=False, strict_map_key=False)
+    unpacker.feed(txn)
+    try:
+        count = unpacker.read_map_header()
+        body = unpacker.tell()
+        fields = {}
+        group_span = None
+        for _ in range(count):
+            start = unpacker.tell()
+            key = unpacker.unpack()
+            fields[key] = unpacker.unpack()
+            if key == 'grp':
+                group_span = (start, unpacker.tell())
+    except Exception as exc:
+        raise PreflightError(f'Invalid signed transaction: {exc}') from None
+    if not isinstance(fields.get('type'), str) or not isinstance(fields.get('lv', 0), int):
+        raise PreflightError('Invalid signed transaction: not a transaction')
+    if group_span is None:
+        return fields, txn
+    return fields, _map_header(count - 1) + txn[body:group_span[0]] + txn[group_span[1]:]
+
+
+def _digest(prefix: bytes, data: bytes) -> bytes:
+    return hashlib.new('sha512_256', prefix + data).digest()
+
+
+def _txid(txn: bytes) -> str:
+    return b32encode(_digest(b'TX', txn)).decode().rstrip('=')
+
+
+def preflight(blobs: List[bytes], current_round: Optional[int] = None) -> List[str]:
+    """Check a signed group the way algod would reject it up front and return its txids.
+
+    Works on the bytes as submitted: txids and the group ID hash the raw ``txn``
+    maps instead of decoding them into algosdk objects and re-encoding. algod
+    hashes its own canonical encoding, which is what the SDKs produce, so the
+    result is the same. Expiry is only checked when ``current_round`` is known;
+    no algod call is made here.
+    """
+    import msgpack
+
+    txns = split_signed(blobs)
+    if len(txns) > MAX_GROUP_SIZE:
+        raise PreflightError(f'Groups are limited to {MAX_GROUP_SIZE} transactions, got {len(txns)}')
+    parsed = [_txn_fields(txn) for txn in txns]
+    groups = {fields.get('grp') for fields, _ in parsed}
+    if len(txns) > 1 or groups != {None}:
+        if None in groups or len(groups) > 1:
+            raise PreflightError('Transactions do not share one group ID')
+        txlist = [_digest(b'TX', ungrouped) for _, ungrouped in parsed]
+        expected = _digest(b'TG', msgpack.packb({'txlist': txlist}, use_bin_type=True))
+        if groups != {expected}:
+            raise PreflightError('Group ID does not match the submitted transactions')
+    if current_round is not None:
+        for fields, _ in parsed:
+            if fields.get('lv', 0) < current_round:
+                raise PreflightError(f'Transaction expired: last valid round {fields.get("lv", 0)} '
+                                     f'is before current round {current_round}')
+    return [_txid(txn) for txn in txns]
+
+
+class RecentResults:
+    """Bounded TTL map of submission key -> algod result, oldest entries evicted first."""
+
+    def __init__(self, ttl: float = 300.0, max_entries: int = 10_000,
+                 clock: Callable[[], float] = time.monotonic):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._clock = clock
+        self._entries: 'OrderedDict[object, Tuple[float, str]]' = OrderedDict()
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    def get(self, key) -> Optional[str]:
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= self._clock():
+            del self._entries[key]
+            return None
+        return entry[1]
+
+    def put(self, key, result: str) -> None:
+        if self.ttl <= 0 or self.max_entries <= 0:
+            # Deduplication is turned off.
+            return
+        now = self._clock()
+        self._entries.pop(key, None)
+        self._entries[key] = (now + self.ttl, result)
+        # Entries share one TTL, so insertion order is expiry order.
+        while self._entries and (len(self._entries) > self.max_entries
+                                 or next(iter(self._entries.values()))[0] <= now):
+            self._entries.popitem(last=False)
+
+
+class BroadcastQueue:
+    """Queues signed transaction groups and submits them with at most ``concurrency`` in flight.
+
+    Identical payloads that are already queued or in flight share one submission,
+    so retrying clients do not multiply the work sent to algod. Payloads submitted
+    successfully within ``recent_ttl`` seconds resolve to the original result
+    without being sent again.
+    """
+
+    def __init__(self, submit: SubmitFn, max_queue: int = 256, concurrency: int = 4,
+                 recent_ttl: float = 300.0, recent_max: int = 10_000,
+                 clock: Callable[[], float] = time.monotonic):
+        self._submit = submit
+        self.max_queue = max_queue
+        self.concurrency = concurrency
+        self.recent = RecentResults(recent_ttl, recent_max, clock)
+        self._queue: Optional[asyncio.Queue] = None
+        self._workers: List[asyncio.Task] = []
+        self._pending: Dict[object, asyncio.Future] = {}
+        self.in_flight = 0
+        self.submitted = 0
+        self.failed = 0
+        self.coalesced = 0
+        self.deduplicated = 0
+        self.rejected = 0
+
+    @property
+    def running(self) -> bool:
+        return bool(self._workers)
+
+    async def start(self) -> None:
+        if self.running:
+            return
+        self._queue = asyncio.Queue(maxsize=self.max_queue)
+        self._workers = [asyncio.create_task(self._worker()) for _ in range(self.concurrency)]
+
+    async def stop(self) -> None:
+        workers, self._workers = self._workers, []
+        for worker in workers:
+            worker.cancel()
+        await asyncio.gather(*workers, return_exceptions=True)
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(QueueClosedError('Broadcast queue stopped'))
+        self._pending.clear()
+        self._queue = None
+
+    def enqueue(self, blobs: List[bytes], key: Optional[str] = None) -> asyncio.Future:
+        """Queue ``blobs`` for submission and return a future resolving to the txid.
+
+        ``key`` identifies the group for coalescing and deduplication (the first
+        txid, which commits to the whole group); it defaults to a payload hash.
+        """
+        if not self.running:
+            raise QueueClosedError('Broadcast queue is not running')
+        key = key or hashlib.sha256(b''.join(blobs)).digest()
+        result = self.recent.get(key)
+        if result is not None:
+            self.deduplicated += 1
+            future = asyncio.get_running_loop().create_future()
+            future.set_result(result)
+            return future
+        existing = self._pending.get(key)
+        if existing is not None:
+            self.coalesced += 1
+            return existing
+        future = asyncio.get_running_loop().create_future()
+        try:
+            self._queue.put_nowait((key, blobs, future))
+        except asyncio.QueueFull:
+            self.rejected += 1
+            raise QueueFullError(f'Broadcast queue is full ({self.max_queue} pending)')
+        future.add_done_callback(_log_failure)
+        self._pending[key] = future
+        return future
+
+    async def _worker(self) -> None:
+        while True:
+            key, blobs, future = await self._queue.get()
+            self.in_flight += 1
+            try:
+                txid = await self._submit(blobs)
+            except Exception as exc:
+                self.failed += 1
+                if not future.done():
+                    future.set_exception(exc)
+            else:
+                self.submitted += 1
+                self.recent.put(key, txid)
+                if not future.done():
+                    future.set_result(txid)
+            finally:
+                self.in_flight -= 1
+                self._pending.pop(key, None)
+                self._queue.task_done()
+
+    def stats(self) -> Dict[str, int]:
+        return {
+            'queued': self._queue.qsize() if self._queue is not None else 0,
+            'max_queue': self.max_queue,
+            'in_flight': self.in_flight,
+            'concurrency': self.concurrency,
+            'submitted': self.submitted,
+            'failed': self.failed,
+            'coalesced': self.coalesced,
+            'deduplicated': self.deduplicated,
+            'recent': len(self.recent),
+            'rejected': self.rejected,
+        }
+
+
+def _log_failure(future: asyncio.Future) -> None:
+    # Retrieving the exception here also keeps fire-and-forget failures from
+    # surfacing as "exception was never retrieved" warnings.
+    if future.cancelled():
+        return
+    exc = future.exception()
+    if exc is not None:
+        logger.warning('Broadcast failed: %s', exc)
+
@@ -0,0 +1,164 @@
+"""
+Module: config.py
+Description: In-memory config snapshots reloaded when .env or app_config.json change.
+"""
+
+from dataclasses import dataclass
+import hashlib
+import json
+import os
+from pathlib import Path
+import re
+import threading
+from typing import Dict, Mapping, Optional, Tuple
+
+from dotenv import dotenv_values
+
+GENESIS_HASH = 'SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI='
+GENESIS_ID = 'testnet-v1.0'
+# One entry of an If-None-Match list: ``*`` or an optionally weak quoted tag.
+ETAG_ENTRY = re.compile(r'\*|(?:W/)?"[^"]*"')
+
+
+def read_app_config(path: Path) -> Optional[int]:
+    if not path.exists():
+        return None
+    try:
+        data = json.loads(path.read_text())
+    except (json.JSONDecodeError, OSError):
+        return None
+    app_id = data.get('app_id')
+    if isinstance(app_id, int):
+        return app_id
+    if isinstance(app_id, str) and app_id.isdigit():
+        return int(app_id)
+    return None
+
+
+@dataclass(frozen=True)
+class ConfigSnapshot:
+    """Immutable view of the runtime config plus the pre-rendered /api/config body."""
+
+    app_id: int
+    algod_url: Optional[str]
+    algod_token: str
+    walletconnect_project_id: str
+    body: bytes
+    etag: str
+
+    @classmethod
+    def build(cls, env: Dict[str, Optional[str]], configured_app_id: Optional[int]) -> 'ConfigSnapshot':
+        app_id = configured_app_id
+        if app_id is None:
+            try:
+                app_id = int(env.get('APP_ID') or '0')
+            except ValueError:
+                app_id = 0
+        public = {
+            'app_id': app_id,
+            'algod_url': env.get('ALGOD_ADDRESS'),
+            'algod_token': env.get('ALGOD_TOKEN') or '',
+            'walletconnect_project_id': env.get('WALLETCONNECT_PROJECT_ID') or '',
+            'genesis_hash': GENESIS_HASH,
+            'genesis_id': GENESIS_ID,
+        }
+        body = json.dumps(public, separators=(',', ':')).encode()
+        return cls(
+            app_id=app_id,
+            algod_url=public['algod_url'],
+            algod_token=public['algod_token'],
+            walletconnect_project_id=public['walletconnect_project_id'],
+            body=body,
+            etag='"' + hashlib.sha256(body).hexdigest()[:32] + '"',
+        )
+
+
+def etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Whether an ``If-None-Match`` header matches ``etag``.
+
+    The header is a list of tags or ``*``; ``W/`` is ignored, as the weak
+    comparison RFC 9110 prescribes for this header.
+    """
+    if not if_none_match:
+        return False
+    strong = etag[2:] if etag.startswith('W/') else etag
+    for entry in ETAG_ENTRY.findall(if_none_match):
+        if entry == '*' or (entry[2:] if entry.startswith('W/') else entry) == strong:
+            return True
+    return False
+
+
+def _mtime(path: Path) -> Optional[int]:
+    try:
+        return path.stat().st_mtime_ns
+    except OSError:
+        return None
+
+
+class ConfigStore:
+    """Holds the current ConfigSnapshot and swaps it when a watched file's mtime changes.
+
+    ``current()`` is a plain attribute read, so request handlers never touch the
+    filesystem. A background thread started with ``start()`` polls the mtimes of
+    ``.env`` and ``app_config.json`` every ``poll_interval`` seconds. Values in
+    ``.env`` take precedence over the process environment, matching the old
+    per-request ``load_dotenv(override=True)`` behaviour. ``env`` stands in for
+    the process environment, so an app built with its own settings sees them.
+    """
+
+    def __init__(self, dotenv_path: Path, app_config_path: Path, poll_interval: float = 1.0,
+                 env: Optional[Mapping[str, str]] = None):
+        self.env = os.environ if env is None else env
+        self.dotenv_path = Path(dotenv_path)
+        self.app_config_path = Path(app_config_path)
+        self.poll_interval = poll_interval
+        self._mtimes: Tuple[Optional[int], Optional[int]] = (None, None)
+        self._snapshot: Optional[ConfigSnapshot] = None
+        self._lock = threading.Lock()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+
+    def _load(self, mtimes: Tuple[Optional[int], Optional[int]]) -> ConfigSnapshot:
+        env: Dict[str, Optional[str]] = dict(self.env)
+        if mtimes[0] is not None:
+            env.update(dotenv_values(self.dotenv_path))
+        return ConfigSnapshot.build(env, read_app_config(self.app_config_path))
+
+    def refresh(self, force: bool = False) -> bool:
+        """Rebuild the snapshot if a watched file changed; returns True when it was swapped."""
+        mtimes = (_mtime(self.dotenv_path), _mtime(self.app_config_path))
+        with self._lock:
+            if not force and self._snapshot is not None and mtimes == self._mtimes:
+                return False
+            self._snapshot = self._load(mtimes)
+            self._mtimes = mtimes
+            return True
+
+    def current(self) -> ConfigSnapshot:
+        snapshot = self._snapshot
+        if snapshot is None:
+            self.refresh()
+            snapshot = self._snapshot
+        return snapshot
+
+    def _watch(self) -> None:
+        while not self._stop.wait(self.poll_interval):
+            try:
+                self.refresh()
+            except Exception:
+                # Keep serving the last good snapshot; the next poll retries.
+                continue
+
+    def start(self) -> None:
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self.refresh()
+        self._stop.clear()
+        self._thread = threading.Thread(target=self._watch, name='config-watcher', daemon=True)
+        self._thread.start()
+
+    def stop(self) -> None:
+        self._stop.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
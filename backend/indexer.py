@@ -0,0 +1,73 @@
+"""
+Module: indexer.py
+Description: Block-following sync loop shared by the on-disk indexes.
+"""
+
+import asyncio
+import logging
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+
+class BlockIndexer:
+    """Feeds an index from algod, catching up in windows of concurrently fetched blocks.
+
+    The index provides ``checkpoint()`` (last applied round or None) and
+    ``apply_blocks([(round, block), ...])``; both run in a worker thread.
+    """
+
+    name = 'Block'
+
+    def __init__(self, index, client, start_round: Optional[int] = None,
+                 window: int = 8, retry_delay: float = 2.0, block_timeout: float = 65.0):
+        self.index = index
+        self._client = client
+        self.start_round = start_round
+        self.window = window
+        self.retry_delay = retry_delay
+        self.block_timeout = block_timeout
+        self._task: Optional[asyncio.Task] = None
+
+    async def _next_round(self) -> int:
+        checkpoint = await asyncio.to_thread(self.index.checkpoint)
+        if checkpoint is not None:
+            return checkpoint + 1
+        if self.start_round is not None:
+            return self.start_round
+        return (await self._client.status())['last-round']
+
+    async def sync_once(self, next_round: int, head: int) -> int:
+        """Ingest ``next_round..head`` and return the next round to fetch."""
+        while next_round <= head:
+            rounds = list(range(next_round, min(head, next_round + self.window - 1) + 1))
+            blocks = await asyncio.gather(*(self._client.block(r) for r in rounds))
+            await asyncio.to_thread(self.index.apply_blocks, list(zip(rounds, blocks)))
+            next_round = rounds[-1] + 1
+        return next_round
+
+    async def run(self) -> None:
+        next_round = None
+        while True:
+            try:
+                if next_round is None:
+                    next_round = await self._next_round()
+                head = (await self._client.status())['last-round']
+                next_round = await self.sync_once(next_round, head)
+                await self._client.status_after_block(next_round - 1, timeout=self.block_timeout)
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning('%s indexer error: %s', self.name, exc)
+                next_round = None
+                await asyncio.sleep(self.retry_delay)
+
+    def start(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self.run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        if task is not None:
+            task.cancel()
+            await asyncio.gather(task, return_exceptions=True)
@@ -0,0 +1,262 @@
+"""
+Module: ipfs_cid.py
+Description: Streaming IPFS CID computation (UnixFS, dag-pb, balanced layout) without an IPFS daemon.
+
+Produces the same root CID as ``ipfs add`` with its defaults: a fixed-size
+chunker of 256 KiB, at most 174 links per node and the balanced layout.
+CIDv0 wraps every leaf in a dag-pb UnixFS node. CIDv1 uses raw leaves, as
+``ipfs add --cid-version=1`` does. Leaves are hashed in a thread pool, and
+hashlib releases the GIL on large inputs, so big files use every core. Only
+a bounded window of chunks and one partial node per tree level stay in memory.
+"""
+
+import asyncio
+from base64 import b32encode
+from collections import deque
+from concurrent.futures import Executor, Future, ThreadPoolExecutor
+from dataclasses import dataclass
+import hashlib
+import os
+from typing import AsyncIterable, Deque, Iterable, List, Optional, Tuple
+
+DEFAULT_CHUNK_SIZE = 256 * 1024
+# go-unixfs: roughly 8 KiB of links per node at ~47 bytes per link.
+DEFAULT_MAX_LINKS = 174
+DAG_PB = 0x70
+RAW = 0x55
+SHA2_256 = 0x12
+UNIXFS_FILE = 2
+BASE58_ALPHABET = b'123456789ABCDEFGHJKLMNPQRSTUVWXYZabcdefghijkmnopqrstuvwxyz'
+
+_executor: Optional[ThreadPoolExecutor] = None
+
+
+def varint(value: int) -> bytes:
+    out = bytearray()
+    while value >= 0x80:
+        out.append((value & 0x7F) | 0x80)
+        value >>= 7
+    out.append(value)
+    return bytes(out)
+
+
+def _field(number: int, payload: bytes) -> bytes:
+    # Length-delimited protobuf field (wire type 2).
+    return varint(number << 3 | 2) + varint(len(payload)) + payload
+
+
+def _uint_field(number: int, value: int) -> bytes:
+    return varint(number << 3) + varint(value)
+
+
+def unixfs_file(data: Optional[bytes], filesize: int, blocksizes: Iterable[int] = ()) -> bytes:
+    """Encode a UnixFS ``Data`` message of type File, fields in tag order."""
+    out = _uint_field(1, UNIXFS_FILE)
+    if data:
+        out += _field(2, data)
+    out += _uint_field(3, filesize)
+    for size in blocksizes:
+        out += _uint_field(4, size)
+    return out
+
+
+def dag_pb_node(data: bytes, links: Iterable[Tuple[bytes, int]] = ()) -> bytes:
+    """Encode a dag-pb ``PBNode``: links first, then data, as the canonical form requires."""
+    out = b''
+    for cid, tsize in links:
+        # Hash, an empty Name (written explicitly, as go-merkledag does), Tsize.
+        out += _field(2, _field(1, cid) + _field(2, b'') + _uint_field(3, tsize))
+    return out + _field(1, data)
+
+
+def make_cid(block: bytes, codec: int, version: int) -> bytes:
+    multihash = bytes((SHA2_256, 32)) + hashlib.sha256(block).digest()
+    if version == 0:
+        return multihash
+    return varint(1) + varint(codec) + multihash
+
+
+def base58btc(data: bytes) -> str:
+    number = int.from_bytes(data, 'big')
+    out = bytearray()
+    while number:
+        number, rem = divmod(number, 58)
+        out.append(BASE58_ALPHABET[rem])
+    zeros = len(data) - len(data.lstrip(b'\0'))
+    return (BASE58_ALPHABET[:1] * zeros + bytes(reversed(out))).decode()
+
+
+def format_cid(cid: bytes) -> str:
+    """String form: base58btc for CIDv0 (``Qm...``), multibase base32 for CIDv1 (``b...``)."""
+    if cid[0] == SHA2_256:
+        return base58btc(cid)
+    return 'b' + b32encode(cid).decode().lower().rstrip('=')
+
+
+@dataclass
+class _Child:
+    cid: bytes
+    tsize: int  # serialized size of the whole subtree
+    filesize: int  # file bytes under it
+
+
+def encode_leaf(chunk: bytes, version: int = 0, raw_leaves: bool = False) -> _Child:
+    """Build and hash one leaf block; safe to run in a worker thread."""
+    if raw_leaves:
+        return _Child(make_cid(chunk, RAW, version), len(chunk), len(chunk))
+    block = dag_pb_node(unixfs_file(chunk, len(chunk)))
+    return _Child(make_cid(block, DAG_PB, version), len(block), len(chunk))
+
+
+class DagBuilder:
+    """Assemble leaves, in file order, into a balanced UnixFS tree.
+
+    go-unixfs grows its balanced tree from the left: every internal node holds
+    ``max_links`` children until the data runs out. Filling level by level from
+    the bottom gives the same tree, so a node is emitted as soon as it is full.
+    """
+
+    def __init__(self, version: int = 0, max_links: int = DEFAULT_MAX_LINKS):
+        self.version = version
+        self.max_links = max_links
+        self.levels: List[List[_Child]] = [[]]
+
+    def add(self, leaf: _Child) -> None:
+        self.levels[0].append(leaf)
+        depth = 0
+        while len(self.levels[depth]) == self.max_links:
+            node = self._node(self.levels[depth])
+            self.levels[depth] = []
+            if depth + 1 == len(self.levels):
+                self.levels.append([])
+            self.levels[depth + 1].append(node)
+            depth += 1
+
+    def _node(self, children: List[_Child]) -> _Child:
+        filesizes = [child.filesize for child in children]
+        block = dag_pb_node(unixfs_file(None, sum(filesizes), filesizes),
+                            [(child.cid, child.tsize) for child in children])
+        return _Child(make_cid(block, DAG_PB, self.version), len(block) + sum(child.tsize for child in children),
+                      sum(filesizes))
+
+    def root(self) -> _Child:
+        # Close partial nodes bottom-up; the first level holding a lone node with
+        # nothing above it is the root. A one-chunk file is its own root.
+        for depth, children in enumerate(self.levels):
+            above = any(self.levels[depth + 1:])
+            if len(children) == 1 and not above:
+                return children[0]
+            if children:
+                if depth + 1 == len(self.levels):
+                    self.levels.append([])
+                self.levels[depth + 1].append(self._node(children))
+                self.levels[depth] = []
+        raise ValueError('DagBuilder.root() called before any leaf was added')
+
+
+def _default_executor() -> ThreadPoolExecutor:
+    global _executor
+    if _executor is None:
+        _executor = ThreadPoolExecutor(max_workers=os.cpu_count() or 1, thread_name_prefix='cid')
+    return _executor
+
+
+class CidCalculator:
+    """Incremental CID computation: ``update()`` with bytes as they arrive, then ``finish()``.
+
+    Chunks are cut at ``chunk_size`` whatever the sizes passed to ``update``.
+    At most ``window`` leaves are hashed at once; ``update`` blocks on the
+    oldest one when the window is full, which bounds memory.
+    """
+
+    def __init__(self, version: int = 0, raw_leaves: Optional[bool] = None, chunk_size: int = DEFAULT_CHUNK_SIZE,
+                 max_links: int = DEFAULT_MAX_LINKS, executor: Optional[Executor] = None,
+                 window: Optional[int] = None):
+        if version not in (0, 1):
+            raise ValueError(f'Unsupported CID version {version}')
+        self.raw_leaves = version == 1 if raw_leaves is None else raw_leaves
+        if version == 0 and self.raw_leaves:
+            raise ValueError('CIDv0 cannot reference raw leaves')
+        self.version = version
+        self.chunk_size = chunk_size
+        self.executor = executor or _default_executor()
+        self.window = window or 2 * (os.cpu_count() or 1)
+        self.builder = DagBuilder(version, max_links)
+        self.size = 0
+        self._buffer = bytearray()
+        self._pending: Deque[Future] = deque()
+
+    def update(self, data: bytes) -> None:
+        self.size += len(data)
+        self._buffer += data
+        while len(self._buffer) >= self.chunk_size:
+            chunk = bytes(self._buffer[:self.chunk_size])
+            del self._buffer[:self.chunk_size]
+            self._submit(chunk)
+
+    def _submit(self, chunk: bytes) -> None:
+        if len(self._pending) >= self.window:
+            self.builder.add(self._pending.popleft().result())
+        self._pending.append(self.executor.submit(encode_leaf, chunk, self.version, self.raw_leaves))
+
+    def finish(self) -> str:
+        """Flush the last partial chunk and return the root CID string."""
+        if self._buffer or not self.size:
+            # An empty file is still one (empty) leaf.
+            self._submit(bytes(self._buffer))
+            self._buffer = bytearray()
+        while self._pending:
+            self.builder.add(self._pending.popleft().result())
+        return format_cid(self.builder.root().cid)
+
+
+def compute_cid(chunks: Iterable[bytes], version: int = 0, **options) -> str:
+    """CID of the bytes yielded by ``chunks`` (any chunk sizes)."""
+    calculator = CidCalculator(version, **options)
+    for chunk in chunks:
+        calculator.update(chunk)
+    return calculator.finish()
+
+
+def file_cid(path: str, version: int = 0, **options) -> str:
+    with open(path, 'rb') as fh:
+        return compute_cid(iter(lambda: fh.read(DEFAULT_CHUNK_SIZE), b''), version, **options)
+
+
+async def cid_stream(chunks: AsyncIterable[bytes], version: int = 0, algorithm: str = 'sha256',
+                     max_bytes: Optional[int] = None, **options) -> Tuple[str, bytes, int]:
+    """One pass over an async byte stream; returns ``(CID, content digest, size)``.
+
+    Leaf hashing runs in the pool while the next bytes arrive. The whole-file
+    digest is updated in another worker thread, one chunk behind, so neither
+    hash blocks the event loop.
+    """
+    from backend.uploads import UploadTooLargeError
+
+    calculator = CidCalculator(version, **options)
+    hasher = hashlib.new(algorithm)
+    pending: Optional[asyncio.Future] = None
+    buffer = bytearray()
+    size = 0
+    async for data in chunks:
+        size += len(data)
+        if max_bytes is not None and size > max_bytes:
+            if pending is not None:
+                await pending
+            raise UploadTooLargeError(f'Upload exceeds {max_bytes} bytes')
+        buffer += data
+        if len(buffer) >= calculator.chunk_size:
+            if pending is not None:
+                await pending
+            pending = asyncio.ensure_future(asyncio.to_thread(_feed, calculator, hasher, bytes(buffer)))
+            buffer = bytearray()
+    if pending is not None:
+        await pending
+    await asyncio.to_thread(_feed, calculator, hasher, bytes(buffer))
+    cid = await asyncio.to_thread(calculator.finish)
+    return cid, hasher.digest(), size
+
+
+def _feed(calculator: CidCalculator, hasher, data: bytes) -> None:
+    calculator.update(data)
+    hasher.update(data)
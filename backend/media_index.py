@@ -0,0 +1,184 @@
+"""
+Module: media_index.py
+Description: SQLite index of media ``register``/``verify`` app calls keyed by hash, behind a Bloom filter.
+
+Every call whose first argument is ``register`` or ``verify`` is stored under
+its second argument (``media_hash`` / ``content_hash``) with the txid, round
+and sender. A Bloom filter of every indexed hash is held in memory and rebuilt
+from the table when the index opens. Most lookups are for hashes that were
+never registered, and those are answered from memory without touching SQLite.
+"""
+
+import hashlib
+import math
+import sqlite3
+import threading
+from typing import Dict, Iterable, List, Optional, Tuple
+
+from backend.blocks import app_calls
+from backend.indexer import BlockIndexer
+
+METHODS = {b'register': 'register', b'verify': 'verify'}
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS media_calls (
+    app_id INTEGER NOT NULL,
+    hash BLOB NOT NULL,
+    method TEXT NOT NULL,
+    round INTEGER NOT NULL,
+    intra INTEGER NOT NULL,
+    txid TEXT,
+    sender TEXT NOT NULL,
+    PRIMARY KEY (app_id, hash, round, intra, method)
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS media_checkpoints (
+    app_id INTEGER PRIMARY KEY,
+    round INTEGER NOT NULL
+);
+'''
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over byte keys.
+
+    Sized for ``capacity`` keys at ``error_rate`` false positives. Bit positions
+    come from double hashing of one blake2b digest per key.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        self.capacity = max(capacity, 1)
+        self.error_rate = error_rate
+        self.size = max(8, math.ceil(-self.capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / self.capacity * math.log(2)))
+        self.bits = bytearray((self.size + 7) // 8)
+        self.count = 0
+
+    def _positions(self, key: bytes):
+        digest = hashlib.blake2b(key, digest_size=16).digest()
+        first = int.from_bytes(digest[:8], 'little')
+        second = int.from_bytes(digest[8:], 'little') | 1
+        return ((first + i * second) % self.size for i in range(self.hashes))
+
+    def add(self, key: bytes) -> None:
+        for position in self._positions(key):
+            self.bits[position >> 3] |= 1 << (position & 7)
+        self.count += 1
+
+    def __contains__(self, key: bytes) -> bool:
+        return all(self.bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+
+class MediaIndex:
+    """Stores ``register``/``verify`` calls of one app, looked up by hash.
+
+    Blocks are applied like ``WeightIndex``: one SQLite transaction per batch
+    together with the checkpoint. The filter is rebuilt at twice the size
+    when the number of distinct hashes outgrows its capacity, so the false
+    positive rate stays near ``error_rate``.
+    """
+
+    def __init__(self, path: str, app_id: int, bloom_capacity: int = 1_000_000, bloom_error_rate: float = 0.01):
+        self.app_id = app_id
+        self.bloom_error_rate = bloom_error_rate
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+        self.stats = {'lookups': 0, 'bloom_negatives': 0, 'false_positives': 0}
+        with self._lock:
+            self._rebuild_bloom(bloom_capacity)
+
+    def _rebuild_bloom(self, capacity: int) -> None:
+        hashes = self._db.execute('SELECT DISTINCT hash FROM media_calls WHERE app_id = ?', (self.app_id,))
+        keys = [row[0] for row in hashes]
+        bloom = BloomFilter(max(capacity, 2 * len(keys)), self.bloom_error_rate)
+        for key in keys:
+            bloom.add(key)
+        self.bloom = bloom
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def checkpoint(self) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute('SELECT round FROM media_checkpoints WHERE app_id = ?',
+                                   (self.app_id,)).fetchone()
+        return row[0] if row else None
+
+    def apply_blocks(self, blocks: Iterable[Tuple[int, dict]]) -> int:
+        """Apply decoded blocks in order and advance the checkpoint; returns the calls indexed."""
+        added: List[bytes] = []
+        last_round = None
+        with self._lock:
+            with self._db:
+                for round_number, block in blocks:
+                    for call in app_calls(block, self.app_id, with_txids=True):
+                        method = METHODS.get(call.args[0]) if len(call.args) >= 2 else None
+                        if method is None:
+                            continue
+                        self._db.execute(
+                            'INSERT OR IGNORE INTO media_calls (app_id, hash, method, round, intra, txid, sender) '
+                            'VALUES (?, ?, ?, ?, ?, ?, ?)',
+                            (self.app_id, call.args[1], method, round_number, call.intra, call.txid, call.sender),
+                        )
+                        added.append(call.args[1])
+                    last_round = round_number
+                if last_round is not None:
+                    self._db.execute(
+                        'INSERT INTO media_checkpoints (app_id, round) VALUES (?, ?) '
+                        'ON CONFLICT(app_id) DO UPDATE SET round = excluded.round',
+                        (self.app_id, last_round),
+                    )
+            # Only after the commit: a hash in the filter must be findable on disk.
+            for key in added:
+                if key not in self.bloom:
+                    self.bloom.add(key)
+            if self.bloom.count > self.bloom.capacity:
+                self._rebuild_bloom(2 * self.bloom.capacity)
+        return len(added)
+
+    def might_contain(self, media_hash: bytes) -> bool:
+        """False means the hash is certainly not indexed; answered from memory."""
+        self.stats['lookups'] += 1
+        if media_hash in self.bloom:
+            return True
+        self.stats['bloom_negatives'] += 1
+        return False
+
+    def get(self, media_hash: bytes) -> Optional[Dict[str, List[dict]]]:
+        """Every indexed call for ``media_hash``, oldest first, grouped by method."""
+        if not self.might_contain(media_hash):
+            return None
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT method, round, intra, txid, sender FROM media_calls WHERE app_id = ? AND hash = ? '
+                'ORDER BY round, intra', (self.app_id, media_hash),
+            ).fetchall()
+        if not rows:
+            self.stats['false_positives'] += 1
+            return None
+        calls: Dict[str, List[dict]] = {'register': [], 'verify': []}
+        for method, round_number, intra, txid, sender in rows:
+            calls[method].append({'txid': txid, 'round': round_number, 'intra': intra, 'sender': sender})
+        return calls
+
+    def registration(self, media_hash: bytes) -> Optional[dict]:
+        """The first ``register`` call for ``media_hash``, if any."""
+        calls = self.get(media_hash)
+        return calls['register'][0] if calls and calls['register'] else None
+
+    def summary(self) -> dict:
+        with self._lock:
+            hashes = self.bloom.count
+            round_number = self._db.execute('SELECT round FROM media_checkpoints WHERE app_id = ?',
+                                            (self.app_id,)).fetchone()
+        return {'app_id': self.app_id, 'hashes': hashes, 'round': round_number[0] if round_number else None,
+                'bloom_bits': self.bloom.size, 'bloom_hashes': self.bloom.hashes, **self.stats}
+
+
+class MediaIndexer(BlockIndexer):
+    """Feeds a MediaIndex from algod."""
+
+    name = 'Media'
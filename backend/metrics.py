@@ -0,0 +1,308 @@
+"""
+Module: metrics.py
+Description: In-process counters, gauges and latency histograms rendered in Prometheus text format.
+
+Recording takes no lock. Each metric keeps one list of slots per thread, which
+that thread alone updates; a scrape adds the lists up. The event loop and each
+threadpool worker therefore write to their own memory. A lock is taken only
+the first time a thread or label set is seen, and when rendering.
+"""
+
+from bisect import bisect_left
+from functools import wraps
+import threading
+import time
+from typing import Callable, Dict, Iterable, Iterator, List, Sequence, Tuple
+
+# Seconds; spans fast in-process work through slow algod round trips.
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+CONTENT_TYPE = 'text/plain; version=0.0.4; charset=utf-8'
+
+
+class _Shards:
+    """Per-thread slot lists that are summed on read."""
+
+    def __init__(self, size: int):
+        self.size = size
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._all: List[list] = []
+
+    def mine(self) -> list:
+        shard = getattr(self._local, 'shard', None)
+        if shard is None:
+            shard = self._local.shard = [0] * self.size
+            with self._lock:
+                self._all.append(shard)
+        return shard
+
+    def totals(self) -> list:
+        with self._lock:
+            shards = list(self._all)
+        return [sum(column) for column in zip(*shards)] if shards else [0] * self.size
+
+
+def _escape(value: str) -> str:
+    return str(value).replace('\\', '\\\\').replace('\n', '\\n').replace('"', '\\"')
+
+
+def _labels(names: Sequence[str], values: Sequence[str], extra: str = '') -> str:
+    parts = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        parts.append(extra)
+    return '{' + ','.join(parts) + '}' if parts else ''
+
+
+def _number(value: float) -> str:
+    if value == float('inf'):
+        return '+Inf'
+    return repr(float(value)) if isinstance(value, float) else str(value)
+
+
+class _Metric:
+    kind = ''
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = ()):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._children: Dict[Tuple[str, ...], object] = {}
+        self._lock = threading.Lock()
+
+    def _new_child(self):
+        raise NotImplementedError
+
+    def labels(self, *values: str):
+        child = self._children.get(values)
+        if child is None:
+            if len(values) != len(self.labelnames):
+                raise ValueError(f'{self.name} expects labels {self.labelnames}')
+            with self._lock:
+                child = self._children.setdefault(values, self._new_child())
+        return child
+
+    def render(self) -> Iterator[str]:
+        yield f'# HELP {self.name} {self.documentation}'
+        yield f'# TYPE {self.name} {self.kind}'
+        for values, child in sorted(self._children.items()):
+            yield from child.samples(self.name, _labels(self.labelnames, values), self.labelnames, values)
+
+
+class _CounterChild:
+    def __init__(self):
+        self._shards = _Shards(1)
+
+    def inc(self, amount: float = 1) -> None:
+        self._shards.mine()[0] += amount
+
+    @property
+    def value(self) -> float:
+        return self._shards.totals()[0]
+
+    def samples(self, name, labels, labelnames, values):
+        yield f'{name}{labels} {_number(self.value)}'
+
+
+class Counter(_Metric):
+    kind = 'counter'
+    _new_child = _CounterChild
+
+    def inc(self, amount: float = 1) -> None:
+        self.labels().inc(amount)
+
+
+class _GaugeChild(_CounterChild):
+    def dec(self, amount: float = 1) -> None:
+        self._shards.mine()[0] -= amount
+
+
+class Gauge(_Metric):
+    kind = 'gauge'
+    _new_child = _GaugeChild
+
+
+class _HistogramChild:
+    def __init__(self, buckets: Tuple[float, ...]):
+        self.buckets = buckets
+        # One slot per bucket plus +Inf, then the sum.
+        self._shards = _Shards(len(buckets) + 2)
+
+    def observe(self, value: float) -> None:
+        shard = self._shards.mine()
+        shard[bisect_left(self.buckets, value)] += 1
+        shard[-1] += value
+
+    def time(self) -> '_Timer':
+        return _Timer(self.observe)
+
+    def snapshot(self) -> Tuple[List[int], float]:
+        totals = self._shards.totals()
+        return totals[:-1], totals[-1]
+
+    def samples(self, name, labels, labelnames, values):
+        counts, total = self.snapshot()
+        cumulative = 0
+        for bound, count in zip(self.buckets + (float('inf'),), counts):
+            cumulative += count
+            le = 'le="%s"' % _number(bound)
+            yield f'{name}_bucket{_labels(labelnames, values, le)} {cumulative}'
+        yield f'{name}_sum{labels} {_number(float(total))}'
+        yield f'{name}_count{labels} {cumulative}'
+
+
+class Histogram(_Metric):
+    kind = 'histogram'
+
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                 buckets: Sequence[float] = LATENCY_BUCKETS):
+        super().__init__(name, documentation, labelnames)
+        self.buckets = tuple(sorted(buckets))
+
+    def _new_child(self):
+        return _HistogramChild(self.buckets)
+
+
+class _Timer:
+    __slots__ = ('_observe', '_start')
+
+    def __init__(self, observe: Callable[[float], None]):
+        self._observe = observe
+
+    def __enter__(self):
+        self._start = time.perf_counter()
+        return self
+
+    def __exit__(self, *exc_info):
+        self._observe(time.perf_counter() - self._start)
+
+
+class Registry:
+    """Named metrics plus callbacks that report values owned by other objects at scrape time."""
+
+    def __init__(self):
+        self._metrics: Dict[str, _Metric] = {}
+        self._collectors: List[Callable[[], Iterable[Tuple[str, str, float]]]] = []
+        self._lock = threading.Lock()
+
+    def _get_or_create(self, cls, name, documentation, labelnames, **kwargs):
+        with self._lock:
+            metric = self._metrics.get(name)
+            if metric is None:
+                metric = self._metrics[name] = cls(name, documentation, labelnames, **kwargs)
+            elif not isinstance(metric, cls) or metric.labelnames != tuple(labelnames):
+                raise ValueError(f'Metric {name} is already registered with a different type or labels')
+            return metric
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Counter:
+        return self._get_or_create(Counter, name, documentation, labelnames)
+
+    def gauge(self, name: str, documentation: str, labelnames: Sequence[str] = ()) -> Gauge:
+        return self._get_or_create(Gauge, name, documentation, labelnames)
+
+    def histogram(self, name: str, documentation: str, labelnames: Sequence[str] = (),
+                  buckets: Sequence[float] = LATENCY_BUCKETS) -> Histogram:
+        return self._get_or_create(Histogram, name, documentation, labelnames, buckets=buckets)
+
+    def add_collector(self, collect: Callable[[], Iterable[Tuple[str, str, float]]]) -> None:
+        """``collect()`` yields ``(name, help, value)`` gauges; errors skip that collector."""
+        with self._lock:
+            self._collectors.append(collect)
+
+    def remove_collector(self, collect) -> None:
+        with self._lock:
+            if collect in self._collectors:
+                self._collectors.remove(collect)
+
+    def render(self) -> str:
+        with self._lock:
+            metrics = sorted(self._metrics.values(), key=lambda metric: metric.name)
+            collectors = list(self._collectors)
+        lines = [line for metric in metrics for line in metric.render()]
+        for collect in collectors:
+            try:
+                samples = list(collect())
+            except Exception:
+                continue
+            for name, documentation, value in samples:
+                lines += [f'# HELP {name} {documentation}', f'# TYPE {name} gauge', f'{name} {_number(value)}']
+        return '\n'.join(lines) + '\n'
+
+
+REGISTRY = Registry()
+
+HTTP_IN_FLIGHT = REGISTRY.gauge('lucid_http_requests_in_flight', 'HTTP requests being served.', ('method',))
+HTTP_DURATION = REGISTRY.histogram('lucid_http_request_duration_seconds',
+                                   'HTTP request latency by route template.', ('method', 'route', 'status'))
+ALGOD_IN_FLIGHT = REGISTRY.gauge('lucid_algod_requests_in_flight', 'algod calls awaiting a response.', ('method',))
+ALGOD_DURATION = REGISTRY.histogram('lucid_algod_request_duration_seconds', 'algod call latency.', ('method',))
+ALGOD_ERRORS = REGISTRY.counter('lucid_algod_request_errors_total', 'Failed algod calls by error type.',
+                                ('method', 'error'))
+PHASE_DURATION = REGISTRY.histogram('lucid_request_phase_seconds',
+                                    'Time spent in named phases of request handling.', ('phase',))
+
+
+def algod_call(method: str):
+    """Decorate an async algod client method with in-flight, latency and error metrics."""
+    in_flight = ALGOD_IN_FLIGHT.labels(method)
+    duration = ALGOD_DURATION.labels(method)
+
+    def decorate(func):
+        @wraps(func)
+        async def wrapper(*args, **kwargs):
+            in_flight.inc()
+            start = time.perf_counter()
+            try:
+                result = await func(*args, **kwargs)
+            except Exception as exc:
+                ALGOD_ERRORS.labels(method, type(exc).__name__).inc()
+                duration.observe(time.perf_counter() - start)
+                raise
+            finally:
+                # Cancellation (e.g. a hedge loser) is neither an error nor a full round trip.
+                in_flight.dec()
+            duration.observe(time.perf_counter() - start)
+            return result
+        return wrapper
+    return decorate
+
+
+def phase(name: str) -> _Timer:
+    """``with phase('encode'): ...`` times one step of a request, e.g. to split a slow route."""
+    return PHASE_DURATION.labels(name).time()
+
+
+class MetricsMiddleware:
+    """Pure ASGI middleware timing every HTTP request by its matched route template.
+
+    Labelling by template (``/api/stats/{app_id}``) rather than the raw path
+    keeps the number of series bounded.
+    """
+
+    def __init__(self, app, registry: Registry = REGISTRY):
+        self.app = app
+        self.registry = registry
+
+    async def __call__(self, scope, receive, send):
+        if scope['type'] != 'http':
+            await self.app(scope, receive, send)
+            return
+        status = [500]
+
+        async def send_wrapper(message):
+            if message['type'] == 'http.response.start':
+                status[0] = message['status']
+            await send(message)
+
+        in_flight = HTTP_IN_FLIGHT.labels(scope['method'])
+        in_flight.inc()
+        start = time.perf_counter()
+        try:
+            await self.app(scope, receive, send_wrapper)
+        finally:
+            elapsed = time.perf_counter() - start
+            in_flight.dec()
+            route = scope.get('route')
+            template = getattr(route, 'path', None)
+            if template is None:
+                template = 'unmatched'
+            HTTP_DURATION.labels(scope['method'], template or '/', str(status[0])).observe(elapsed)
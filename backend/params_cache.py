@@ -0,0 +1,141 @@
+"""
+Module: params_cache.py
+Description: Shared suggested-params cache for building unsigned transactions.
+"""
+
+import asyncio
+import copy
+import threading
+import time
+from typing import Awaitable, Callable, Dict, Optional
+
+from algosdk.transaction import SuggestedParams
+
+
+class _Flight:
+    """A single in-progress fetch shared by every caller that missed the cache."""
+
+    def __init__(self, done):
+        self.done = done
+        self.params: Optional[SuggestedParams] = None
+        self.error: Optional[BaseException] = None
+
+
+class SuggestedParamsCache:
+    """Caches algod suggested params until the round advances or the TTL expires.
+
+    Concurrent callers that miss at the same time share a single fetch: the first
+    caller performs the request while the others wait for its result. ``get`` serves
+    threads through ``fetch``; ``aget`` serves coroutines through ``afetch`` and falls
+    back to running ``get`` in a worker thread when no async fetcher is configured.
+    """
+
+    def __init__(self, fetch: Callable[[], SuggestedParams], ttl: float = 5.0,
+                 clock: Callable[[], float] = time.monotonic,
+                 afetch: Optional[Callable[[], Awaitable[SuggestedParams]]] = None):
+        self._fetch = fetch
+        self._afetch = afetch
+        self.ttl = ttl
+        self._clock = clock
+        self._lock = threading.Lock()
+        self._params: Optional[SuggestedParams] = None
+        self._fetched_at = 0.0
+        self._inflight: Optional[_Flight] = None
+        self._async_inflight: Optional[_Flight] = None
+        self.hits = 0
+        self.misses = 0
+
+    def _is_fresh(self) -> bool:
+        return self._params is not None and self._clock() - self._fetched_at < self.ttl
+
+    def get(self) -> SuggestedParams:
+        """Return a copy of the cached params, fetching them from algod when stale."""
+        with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return copy.copy(self._params)
+            self.misses += 1
+            flight = self._inflight
+            leader = flight is None
+            if leader:
+                flight = self._inflight = _Flight(threading.Event())
+
+        if not leader:
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return copy.copy(flight.params)
+
+        try:
+            params = self._fetch()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        else:
+            flight.params = params
+            with self._lock:
+                self._params = params
+                self._fetched_at = self._clock()
+            return copy.copy(params)
+        finally:
+            with self._lock:
+                self._inflight = None
+            flight.done.set()
+
+    async def aget(self) -> SuggestedParams:
+        """Async variant of ``get`` that never blocks the event loop on algod."""
+        if self._afetch is None:
+            return await asyncio.to_thread(self.get)
+        with self._lock:
+            if self._is_fresh():
+                self.hits += 1
+                return copy.copy(self._params)
+            self.misses += 1
+            flight = self._async_inflight
+            leader = flight is None
+            if leader:
+                flight = self._async_inflight = _Flight(asyncio.Event())
+
+        if not leader:
+            await flight.done.wait()
+            if isinstance(flight.error, asyncio.CancelledError):
+                # The leading request was cancelled; that is not our failure to report.
+                return await self.aget()
+            if flight.error is not None:
+                raise flight.error
+            return copy.copy(flight.params)
+
+        try:
+            params = await self._afetch()
+        except BaseException as exc:
+            flight.error = exc
+            raise
+        else:
+            flight.params = params
+            with self._lock:
+                self._params = params
+                self._fetched_at = self._clock()
+            return copy.copy(params)
+        finally:
+            with self._lock:
+                self._async_inflight = None
+            flight.done.set()
+
+    def observe_round(self, round_number: int) -> None:
+        """Drop the cached params once the chain has moved past their first valid round."""
+        with self._lock:
+            if self._params is not None and round_number > self._params.first:
+                self._params = None
+
+    def invalidate(self) -> None:
+        with self._lock:
+            self._params = None
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'ttl': self.ttl,
+                'round': self._params.first if self._params is not None else None,
+            }
@@ -0,0 +1,210 @@
+"""
+Module: static_assets.py
+Description: Static file serving with precompressed gzip/brotli variants, strong ETags and long-lived caching.
+
+Compressed variants live in a content-addressed cache directory (keyed by the
+SHA-256 of the original file), so they are produced once per file version:
+either ahead of time with ``python -m backend.static_assets`` or on the first
+request for a file. Requests then cost a stat, a dict lookup and a sendfile. Brotli is
+used when the optional ``brotli`` package is installed; gzip otherwise.
+"""
+
+import argparse
+from dataclasses import dataclass, field
+import gzip
+import hashlib
+import mimetypes
+import os
+from pathlib import Path
+import re
+import stat
+from typing import Dict, Iterable, Optional, Tuple
+
+from starlette.datastructures import Headers
+from starlette.responses import FileResponse, Response
+from starlette.staticfiles import NotModifiedResponse, StaticFiles
+from starlette.types import Scope
+
+try:
+    import brotli
+except ImportError:  # optional; gzip alone still covers every browser
+    brotli = None
+
+CACHE_DIR = Path(os.environ.get('LUCID_STATIC_CACHE', Path(__file__).resolve().parent.parent / '.build' / 'static'))
+MIN_COMPRESS_SIZE = 1024
+IMMUTABLE = 'public, max-age=31536000, immutable'
+REVALIDATE = 'no-cache'
+COMPRESSIBLE_TYPES = {'application/javascript', 'application/json', 'application/xml', 'application/wasm',
+                      'image/svg+xml', 'application/manifest+json'}
+# A content hash in the file name, e.g. ``app-3f9a1c2b.js``; only trusted once it matches the file's SHA-256.
+HASHED_NAME = re.compile(r'[.-]([0-9a-f]{8,64})\.\w+$')
+
+
+def _compress_gzip(data: bytes) -> bytes:
+    # mtime=0 keeps the output deterministic, so rebuilt variants are byte-identical.
+    return gzip.compress(data, compresslevel=9, mtime=0)
+
+
+ENCODERS = {'gzip': ('.gz', _compress_gzip)}
+if brotli is not None:
+    ENCODERS['br'] = ('.br', lambda data: brotli.compress(data, quality=11))
+# Server preference when the client accepts several encodings equally.
+PREFERENCE = ('br', 'gzip')
+
+
+def is_compressible(path: Path) -> bool:
+    media_type = mimetypes.guess_type(path.name)[0] or ''
+    return media_type.startswith('text/') or media_type in COMPRESSIBLE_TYPES
+
+
+def cache_control(path: Path, digest: str) -> str:
+    """``immutable`` only when the name carries a prefix of the file's own SHA-256 hex digest.
+
+    A name that merely looks hashed (a version, a date, a commit id) could be
+    rewritten in place, and clients would never revalidate it.
+    """
+    match = HASHED_NAME.search(path.name)
+    return IMMUTABLE if match and digest.startswith(match.group(1)) else REVALIDATE
+
+
+def accepted_encodings(header: Optional[str]) -> Dict[str, float]:
+    """Parse ``Accept-Encoding`` (or any list in its form, such as ``Accept``) into ``{coding: q}``."""
+    accepted = {}
+    for part in (header or '').split(','):
+        coding, _, params = part.strip().partition(';')
+        if not coding:
+            continue
+        quality = 1.0
+        match = re.search(r'q=([0-9.]+)', params)
+        if match:
+            try:
+                quality = float(match.group(1))
+            except ValueError:
+                quality = 0.0
+        accepted[coding.strip().lower()] = quality
+    return accepted
+
+
+def choose_encoding(header: Optional[str], available: Iterable[str]) -> Optional[str]:
+    accepted = accepted_encodings(header)
+    best, best_q = None, 0.0
+    for coding in PREFERENCE:
+        if coding not in available:
+            continue
+        quality = accepted.get(coding, accepted.get('*', 0.0))
+        if quality > best_q:
+            best, best_q = coding, quality
+    return best
+
+
+@dataclass
+class AssetEntry:
+    """One file version: its content hash and the on-disk compressed variants."""
+
+    digest: str
+    mtime_ns: int
+    size: int
+    media_type: Optional[str]
+    cache_control: str
+    variants: Dict[str, Tuple[Path, os.stat_result]] = field(default_factory=dict)
+
+    def matches(self, stat_result: os.stat_result) -> bool:
+        return stat_result.st_mtime_ns == self.mtime_ns and stat_result.st_size == self.size
+
+    def etag(self, coding: Optional[str] = None) -> str:
+        # Each representation needs its own strong validator.
+        return f'"{self.digest[:32]}{"-" + coding if coding else ""}"'
+
+
+def build_entry(path: Path, stat_result: os.stat_result, cache_dir: Path = CACHE_DIR) -> AssetEntry:
+    """Hash ``path`` and make sure its compressed variants exist in ``cache_dir``."""
+    data = path.read_bytes()
+    digest = hashlib.sha256(data).hexdigest()
+    entry = AssetEntry(digest, stat_result.st_mtime_ns, stat_result.st_size,
+                       mimetypes.guess_type(path.name)[0], cache_control(path, digest))
+    if len(data) < MIN_COMPRESS_SIZE or not is_compressible(path):
+        return entry
+    for coding, (suffix, compress) in ENCODERS.items():
+        target = cache_dir / digest[:2] / f'{digest}{suffix}'
+        if not target.exists():
+            compressed = compress(data)
+            if len(compressed) >= len(data) * 0.9:
+                continue
+            target.parent.mkdir(parents=True, exist_ok=True)
+            # Write-then-rename so concurrent workers never serve a partial file.
+            tmp = target.with_suffix(target.suffix + f'.{os.getpid()}.tmp')
+            tmp.write_bytes(compressed)
+            os.replace(tmp, target)
+        entry.variants[coding] = (target, target.stat())
+    return entry
+
+
+class CompressedStaticFiles(StaticFiles):
+    """``StaticFiles`` that serves precompressed variants with strong ETags and cache headers.
+
+    Entries are keyed by resolved path and revalidated against the file's mtime
+    and size on every request, so edited files pick up new variants.
+    """
+
+    def __init__(self, *args, cache_dir: Path = CACHE_DIR, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.cache_dir = Path(cache_dir)
+        self._entries: Dict[str, AssetEntry] = {}
+
+    def lookup_path(self, path: str) -> Tuple[str, Optional[os.stat_result]]:
+        # Runs in a worker thread, so hashing and compressing stay off the event loop.
+        full_path, stat_result = super().lookup_path(path)
+        if stat_result is not None and stat.S_ISREG(stat_result.st_mode):
+            entry = self._entries.get(full_path)
+            if entry is None or not entry.matches(stat_result):
+                try:
+                    self._entries[full_path] = build_entry(Path(full_path), stat_result, self.cache_dir)
+                except OSError:
+                    self._entries.pop(full_path, None)  # serve it uncompressed
+        return full_path, stat_result
+
+    def file_response(self, full_path, stat_result: os.stat_result, scope: Scope,
+                      status_code: int = 200) -> Response:
+        entry = self._entries.get(str(full_path))
+        if entry is None or not entry.matches(stat_result):
+            return super().file_response(full_path, stat_result, scope, status_code)
+        request_headers = Headers(scope=scope)
+        coding = choose_encoding(request_headers.get('accept-encoding'), entry.variants)
+        headers = {'ETag': entry.etag(coding), 'Cache-Control': entry.cache_control}
+        if entry.variants:
+            headers['Vary'] = 'Accept-Encoding'
+        if coding is None:
+            response = FileResponse(full_path, status_code=status_code, headers=headers,
+                                    media_type=entry.media_type, stat_result=stat_result)
+        else:
+            variant, variant_stat = entry.variants[coding]
+            headers['Content-Encoding'] = coding
+            response = FileResponse(variant, status_code=status_code, headers=headers,
+                                    media_type=entry.media_type, stat_result=variant_stat)
+        if self.is_not_modified(response.headers, request_headers):
+            return NotModifiedResponse(response.headers)
+        return response
+
+
+def precompress(directory: Path, cache_dir: Path = CACHE_DIR) -> Tuple[int, int]:
+    """Build variants for every file under ``directory``; returns (files, compressed files)."""
+    files = compressed = 0
+    for path in sorted(Path(directory).rglob('*')):
+        if path.is_file():
+            files += 1
+            compressed += bool(build_entry(path, path.stat(), cache_dir).variants)
+    return files, compressed
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Precompress static asset directories into the asset cache.')
+    parser.add_argument('directories', nargs='+', type=Path)
+    parser.add_argument('--cache-dir', type=Path, default=CACHE_DIR)
+    args = parser.parse_args()
+    for directory in args.directories:
+        files, compressed = precompress(directory, args.cache_dir)
+        print(f'{directory}: {compressed}/{files} files compressed ({", ".join(ENCODERS)})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,164 @@
+"""
+Module: stats.py
+Description: In-memory UMIS engine stats kept current from each new block's app calls.
+"""
+
+from collections import Counter
+import json
+from typing import Callable, Dict, Optional
+
+import httpx
+
+from backend.blocks import CLEAR_STATE, CLOSE_OUT, AppCall, app_calls, decode_state
+
+# State keys written by contracts/umis_engine.py.
+WEIGHT_KEY = 'weight'
+OPT_IN_COUNT_KEY = 'opt_in_count'
+TOTAL_WEIGHT_KEY = 'total_weight'
+
+
+def weight_bucket(weight: int) -> str:
+    """Decade bucket label for the weight histogram, e.g. 10-99."""
+    digits = len(str(max(weight, 1)))
+    return f'{10 ** (digits - 1)}-{10 ** digits - 1}'
+
+
+class UmisStatsView:
+    """Materialized aggregate of one UMIS engine app.
+
+    Seeded once from algod (and the indexer for per-account weights when one is
+    configured), then updated from block deltas, so serving a request costs a
+    dictionary lookup. Payout totals count only distributions observed since
+    ``tracked_since_round``.
+    """
+
+    def __init__(self, app_id: int, on_change: Optional[Callable[['UmisStatsView'], None]] = None):
+        self.app_id = app_id
+        self.on_change = on_change
+        self.opt_in_count = 0
+        self.weights: Dict[str, int] = {}
+        self.total_weight = 0
+        self.buckets: Counter = Counter()
+        self.weights_complete = False
+        self.distribute_calls = 0
+        self.distributed_total = 0
+        self.remainder_total = 0
+        self.withdrawn_total = 0
+        self.claimed_total = 0
+        self.tracked_since_round: Optional[int] = None
+        self.last_round: Optional[int] = None
+        self._body: Optional[bytes] = None
+
+    def seed(self, global_state: dict, weights: Optional[Dict[str, int]], round_number: int) -> None:
+        self.opt_in_count = global_state.get(OPT_IN_COUNT_KEY, 0)
+        for address, weight in (weights or {}).items():
+            self._set_weight(address, weight)
+        self.weights_complete = weights is not None
+        if TOTAL_WEIGHT_KEY in global_state:
+            self.total_weight = global_state[TOTAL_WEIGHT_KEY]
+        self.tracked_since_round = round_number
+        self.last_round = round_number
+        self._body = None
+
+    def _set_weight(self, address: str, weight: Optional[int]) -> None:
+        previous = self.weights.pop(address, None)
+        if previous is not None:
+            self.total_weight -= previous
+            self.buckets[weight_bucket(previous)] -= 1
+        if weight:
+            self.weights[address] = weight
+            self.total_weight += weight
+            self.buckets[weight_bucket(weight)] += 1
+
+    def apply(self, call: AppCall) -> None:
+        if OPT_IN_COUNT_KEY in call.global_delta:
+            self.opt_in_count = call.global_delta[OPT_IN_COUNT_KEY] or 0
+        for address, delta in call.local_deltas.items():
+            if WEIGHT_KEY in delta:
+                self._set_weight(address, delta[WEIGHT_KEY])
+        if call.on_complete in (CLOSE_OUT, CLEAR_STATE):
+            self._set_weight(call.sender, None)
+        if TOTAL_WEIGHT_KEY in call.global_delta:
+            # Apps that track total_weight on chain are authoritative even
+            # when the per-account weights were never seeded.
+            self.total_weight = call.global_delta[TOTAL_WEIGHT_KEY] or 0
+        method = call.args[0] if call.args else b''
+        if method == b'distribute':
+            self.distribute_calls += 1
+            # One share per listed account, in order; anything after that is the refunded remainder.
+            shares = call.inner_payments[:len(call.accounts)]
+            self.distributed_total += sum(amount for _receiver, amount in shares)
+            self.remainder_total += sum(amount for _receiver, amount in call.inner_payments[len(call.accounts):])
+        elif method == b'withdraw':
+            self.withdrawn_total += sum(amount for _receiver, amount in call.inner_payments)
+        elif method == b'claim' or call.on_complete == CLOSE_OUT:
+            # Claim-mode payouts reach accounts when they claim or close out.
+            self.claimed_total += sum(amount for _receiver, amount in call.inner_payments)
+
+    async def on_block(self, round_number: int, block: dict) -> None:
+        if self.last_round is not None and round_number <= self.last_round:
+            # Already reflected in the seed, or delivered before.
+            return
+        changed = False
+        for call in app_calls(block, self.app_id):
+            self.apply(call)
+            changed = True
+        self.last_round = round_number
+        self._body = None
+        if changed and self.on_change is not None:
+            self.on_change(self)
+
+    def snapshot(self) -> dict:
+        return {
+            'app_id': self.app_id,
+            'round': self.last_round,
+            'tracked_since_round': self.tracked_since_round,
+            'opt_in_count': self.opt_in_count,
+            'total_weight': self.total_weight,
+            'weighted_accounts': len(self.weights),
+            'weights_complete': self.weights_complete,
+            'weight_distribution': {bucket: count for bucket, count in sorted(self.buckets.items()) if count},
+            'distribute_calls': self.distribute_calls,
+            'distributed_total': self.distributed_total,
+            'remainder_total': self.remainder_total,
+            'withdrawn_total': self.withdrawn_total,
+            'claimed_total': self.claimed_total,
+        }
+
+    def body(self) -> bytes:
+        """JSON body for /api/stats, rebuilt at most once per block."""
+        if self._body is None:
+            self._body = json.dumps(self.snapshot(), separators=(',', ':')).encode()
+        return self._body
+
+
+async def indexer_weights(indexer: httpx.AsyncClient, app_id: int, page_size: int = 1000) -> Dict[str, int]:
+    """Page through the indexer for every account opted into ``app_id`` and its weight."""
+    weights = {}
+    params = {'application-id': app_id, 'limit': page_size}
+    while True:
+        response = await indexer.get('/v2/accounts', params=params)
+        response.raise_for_status()
+        page = response.json()
+        for account in page.get('accounts', []):
+            for local in account.get('apps-local-state') or []:
+                if local.get('id') == app_id and not local.get('deleted'):
+                    weights[account['address']] = decode_state(local.get('key-value')).get(WEIGHT_KEY, 0)
+        next_token = page.get('next-token')
+        if not next_token or not page.get('accounts'):
+            return weights
+        params['next'] = next_token
+
+
+async def seed_view(view: UmisStatsView, algod, indexer: Optional[httpx.AsyncClient] = None) -> None:
+    """Seed ``view`` from current state; follow it with blocks from ``view.tracked_since_round + 1``.
+
+    The round is read first. Blocks landing before the state reads are then
+    replayed, which is harmless for state (deltas carry absolute values) and
+    counts their payouts exactly once.
+    """
+    status = await algod.status()
+    info = await algod.application_info(view.app_id)
+    global_state = decode_state(info.get('params', {}).get('global-state'))
+    weights = await indexer_weights(indexer, view.app_id) if indexer is not None else None
+    view.seed(global_state, weights, status['last-round'])
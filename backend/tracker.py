@@ -0,0 +1,217 @@
+"""
+Module: tracker.py
+Description: Follows new blocks once for the whole backend and fans out confirmations.
+"""
+
+import asyncio
+import logging
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Set
+
+from algosdk import error
+
+from backend.broadcast import TransactionRejectedError
+
+logger = logging.getLogger(__name__)
+
+
+class _Watch:
+    def __init__(self, future: asyncio.Future, rounds_left: int):
+        self.future = future
+        self.rounds_left = rounds_left
+
+
+class ConfirmationTracker:
+    """Follows the chain with ``status_after_block`` and resolves pending txids per round.
+
+    Each new round costs one block-txids lookup regardless of how many txids are
+    being watched. Subscribers (the SSE endpoint) receive ``round`` and
+    ``confirmed`` events through bounded queues; slow subscribers lose their
+    oldest events instead of stalling the tracker. The follow loop only runs while
+    somebody is watching a txid, subscribed, or consuming blocks, so an idle
+    backend issues no algod calls.
+    """
+
+    def __init__(self, client, block_timeout: float = 65.0, retry_delay: float = 2.0,
+                 subscriber_buffer: int = 100):
+        self._client = client
+        self.block_timeout = block_timeout
+        self.retry_delay = retry_delay
+        self.subscriber_buffer = subscriber_buffer
+        self._watches: Dict[str, _Watch] = {}
+        self._subscribers: Set[asyncio.Queue] = set()
+        self._round_listeners: List[Callable[[int], None]] = []
+        # Block listener -> next round it expects (None: whatever round comes next).
+        self._block_listeners: Dict[Callable[[int, dict], Awaitable[None]], Optional[int]] = {}
+        self._task: Optional[asyncio.Task] = None
+        self._checks: Set[asyncio.Task] = set()
+        self._block_txids_supported = True
+        self.last_round: Optional[int] = None
+
+    def on_round(self, listener: Callable[[int], None]) -> None:
+        """Register a callback invoked with each newly observed round."""
+        self._round_listeners.append(listener)
+
+    def on_block(self, listener: Callable[[int, dict], Awaitable[None]], from_round: Optional[int] = None) -> None:
+        """Register a coroutine fed every new decoded block; keeps the follower running.
+
+        With ``from_round`` the listener gets every block from that round on, even
+        ones the follower passed before it was registered, and none before it.
+        """
+        self._block_listeners[listener] = from_round
+        self._ensure_running()
+
+    def watch(self, txid: str, max_rounds: int = 10) -> asyncio.Future:
+        """Return a future resolving to the confirmed round of ``txid``."""
+        existing = self._watches.get(txid)
+        if existing is not None:
+            existing.rounds_left = max(existing.rounds_left, max_rounds)
+            return existing.future
+        future = asyncio.get_running_loop().create_future()
+        # Nobody may await a watch registered only for SSE fan-out.
+        future.add_done_callback(lambda f: f.cancelled() or f.exception())
+        self._watches[txid] = _Watch(future, max_rounds)
+        self._ensure_running()
+        # The follower only sees rounds after its first status call; a txid that
+        # confirmed before then would otherwise wait out every round of the watch.
+        check = asyncio.create_task(self._check_pending(txid))
+        self._checks.add(check)
+        check.add_done_callback(self._checks.discard)
+        return future
+
+    def subscribe(self) -> asyncio.Queue:
+        queue = asyncio.Queue(maxsize=self.subscriber_buffer)
+        self._subscribers.add(queue)
+        self._ensure_running()
+        return queue
+
+    def unsubscribe(self, queue: asyncio.Queue) -> None:
+        self._subscribers.discard(queue)
+
+    def publish(self, event: str, data: dict) -> None:
+        for queue in self._subscribers:
+            if queue.full():
+                queue.get_nowait()
+            queue.put_nowait((event, data))
+
+    def _ensure_running(self) -> None:
+        if self._task is None or self._task.done():
+            self._task = asyncio.create_task(self._run())
+
+    async def stop(self) -> None:
+        task, self._task = self._task, None
+        tasks = [task] if task is not None else []
+        tasks += list(self._checks)
+        for pending in tasks:
+            pending.cancel()
+        await asyncio.gather(*tasks, return_exceptions=True)
+        for watch in self._watches.values():
+            if not watch.future.done():
+                watch.future.cancel()
+        self._watches.clear()
+
+    async def _check_pending(self, txid: str) -> None:
+        try:
+            info = await self._client.pending_transaction_info(txid)
+        except Exception as exc:
+            # The follower and the watch's expiry still settle it.
+            logger.debug('Pending check for %s failed: %s', txid, exc)
+            return
+        confirmed_round = info.get('confirmed-round', 0)
+        watch = self._watches.get(txid)
+        if confirmed_round > 0 and watch is not None:
+            del self._watches[txid]
+            if not watch.future.done():
+                watch.future.set_result(confirmed_round)
+            self.publish('confirmed', {'txid': txid, 'round': confirmed_round})
+
+    async def _run(self) -> None:
+        current = None
+        while self._watches or self._subscribers or self._block_listeners:
+            try:
+                if current is None:
+                    current = (await self._client.status())['last-round']
+                    self.last_round = current
+                status = await self._client.status_after_block(current, timeout=self.block_timeout)
+                latest = status['last-round']
+                for round_number in range(current + 1, latest + 1):
+                    await self._process_round(round_number)
+                    current = round_number
+            except asyncio.CancelledError:
+                raise
+            except Exception as exc:
+                logger.warning('Block follower error: %s', exc)
+                await asyncio.sleep(self.retry_delay)
+
+    async def _process_round(self, round_number: int) -> None:
+        self.last_round = round_number
+        if self._watches:
+            confirmed = await self._confirmed_in(round_number, list(self._watches))
+            for txid, confirmed_round in confirmed.items():
+                watch = self._watches.pop(txid, None)
+                if watch is not None and not watch.future.done():
+                    watch.future.set_result(confirmed_round)
+                self.publish('confirmed', {'txid': txid, 'round': confirmed_round})
+            await self._expire_watches()
+        for listener in self._round_listeners:
+            try:
+                listener(round_number)
+            except Exception as exc:
+                logger.warning('Round listener failed: %s', exc)
+        if self._block_listeners:
+            await self._feed_blocks(round_number)
+        self.publish('round', {'round': round_number})
+
+    async def _feed_blocks(self, round_number: int) -> None:
+        # One fetch per round is shared by every block consumer, including catch-up rounds.
+        blocks: Dict[int, dict] = {}
+        for listener, next_round in list(self._block_listeners.items()):
+            start = round_number if next_round is None else next_round
+            for number in range(start, round_number + 1):
+                if number not in blocks:
+                    blocks[number] = await self._client.block(number, timeout=self.block_timeout)
+                try:
+                    await listener(number, blocks[number])
+                except Exception as exc:
+                    logger.warning('Block listener failed: %s', exc)
+            if listener in self._block_listeners:
+                self._block_listeners[listener] = max(round_number + 1, start)
+
+    async def _confirmed_in(self, round_number: int, txids: Iterable[str]) -> Dict[str, int]:
+        if self._block_txids_supported:
+            try:
+                block = await self._client.request('GET', f'/blocks/{round_number}/txids')
+                matched = set(block.get('blockTxids') or []) & set(txids)
+                return {txid: round_number for txid in matched}
+            except error.AlgodHTTPError as exc:
+                if exc.code != 404:
+                    raise
+                # Older nodes lack the txids route; fall back to per-txid lookups. A pool
+                # raises RoundNotReachedError instead when only lagging nodes answered 404,
+                # and the round is then retried.
+                self._block_txids_supported = False
+        confirmed = {}
+        for txid in txids:
+            info = await self._client.pending_transaction_info(txid)
+            if info.get('confirmed-round', 0) > 0:
+                confirmed[txid] = info['confirmed-round']
+        return confirmed
+
+    async def _expire_watches(self) -> None:
+        for txid, watch in list(self._watches.items()):
+            watch.rounds_left -= 1
+            if watch.rounds_left > 0 and not watch.future.done():
+                continue
+            del self._watches[txid]
+            if watch.future.done():
+                continue
+            try:
+                info = await self._client.pending_transaction_info(txid)
+            except Exception as exc:
+                watch.future.set_exception(exc)
+                continue
+            if info.get('confirmed-round', 0) > 0:
+                watch.future.set_result(info['confirmed-round'])
+            elif info.get('pool-error'):
+                watch.future.set_exception(TransactionRejectedError(info['pool-error']))
+            else:
+                watch.future.set_exception(TimeoutError(f'Transaction {txid} not confirmed in time'))
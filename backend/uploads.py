@@ -0,0 +1,47 @@
+"""
+Module: uploads.py
+Description: Constant-memory hashing of streamed uploads.
+
+Incoming chunks are gathered into fixed-size buffers. Each full buffer is
+hashed in a worker thread while the next one fills. hashlib releases the GIL
+on large updates, so concurrent uploads hash in parallel. Memory per upload
+is about two buffers, whatever the file size.
+"""
+
+import asyncio
+import hashlib
+from typing import AsyncIterable, Optional, Tuple
+
+HASH_BUFFER_SIZE = 1 << 20
+
+
+class UploadTooLargeError(ValueError):
+    """Raised when a streamed upload exceeds the configured size limit."""
+
+
+async def hash_stream(chunks: AsyncIterable[bytes], algorithm: str = 'sha256',
+                      buffer_size: int = HASH_BUFFER_SIZE, max_bytes: Optional[int] = None) -> Tuple[bytes, int]:
+    """Hash an async byte stream; returns ``(digest, total size)``."""
+    hasher = hashlib.new(algorithm)
+    buffer = bytearray()
+    pending: Optional[asyncio.Future] = None
+    size = 0
+    async for chunk in chunks:
+        size += len(chunk)
+        if max_bytes is not None and size > max_bytes:
+            if pending is not None:
+                await pending
+            raise UploadTooLargeError(f'Upload exceeds {max_bytes} bytes')
+        buffer += chunk
+        if len(buffer) >= buffer_size:
+            # At most one update is in flight, so updates stay in order.
+            if pending is not None:
+                await pending
+            # Hand the full buffer to the worker and keep filling a fresh one.
+            pending = asyncio.ensure_future(asyncio.to_thread(hasher.update, buffer))
+            buffer = bytearray()
+    if pending is not None:
+        await pending
+    if buffer:
+        await asyncio.to_thread(hasher.update, buffer)
+    return hasher.digest(), size
@@ -0,0 +1,157 @@
+"""
+Module: weight_index.py
+Description: SQLite index of UMIS engine account weights, synced block by block.
+"""
+
+import sqlite3
+import threading
+from typing import Iterable, List, Optional, Tuple
+
+from backend.blocks import CLEAR_STATE, CLOSE_OUT, OPT_IN, app_calls
+from backend.indexer import BlockIndexer
+
+WEIGHT_KEY = 'weight'
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS accounts (
+    app_id INTEGER NOT NULL,
+    address TEXT NOT NULL,
+    weight INTEGER NOT NULL,
+    opted_in_round INTEGER NOT NULL,
+    updated_round INTEGER NOT NULL,
+    PRIMARY KEY (app_id, address)
+) WITHOUT ROWID;
+CREATE INDEX IF NOT EXISTS accounts_by_weight ON accounts (app_id, weight DESC, address);
+CREATE TABLE IF NOT EXISTS checkpoints (
+    app_id INTEGER PRIMARY KEY,
+    round INTEGER NOT NULL,
+    accounts INTEGER NOT NULL DEFAULT 0,
+    total_weight INTEGER NOT NULL DEFAULT 0
+);
+'''
+
+
+class WeightIndex:
+    """Stores opted-in accounts and their ``weight`` local state for one app.
+
+    Writes happen one batch of blocks per SQLite transaction together with the
+    checkpoint, so a crash resumes from the last fully applied round. Reads use
+    the ``(app_id, weight DESC, address)`` index, which keeps top-N and keyset
+    pagination cheap regardless of how many accounts are indexed; account count
+    and total weight are kept alongside the checkpoint instead of being summed.
+    """
+
+    def __init__(self, path: str, app_id: int):
+        self.app_id = app_id
+        self._lock = threading.Lock()
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute('PRAGMA journal_mode=WAL')
+        self._db.execute('PRAGMA synchronous=NORMAL')
+        self._db.executescript(SCHEMA)
+
+    def close(self) -> None:
+        with self._lock:
+            self._db.close()
+
+    def checkpoint(self) -> Optional[int]:
+        with self._lock:
+            row = self._db.execute('SELECT round FROM checkpoints WHERE app_id = ?', (self.app_id,)).fetchone()
+        return row[0] if row else None
+
+    def apply_blocks(self, blocks: Iterable[Tuple[int, dict]]) -> int:
+        """Apply decoded blocks in order and advance the checkpoint; returns the calls seen."""
+        seen = 0
+        last_round = None
+        totals = [0, 0]  # account and weight deltas for the checkpoint row
+        with self._lock, self._db:
+            for round_number, block in blocks:
+                for call in app_calls(block, self.app_id):
+                    seen += 1
+                    self._apply_call(round_number, call, totals)
+                last_round = round_number
+            if last_round is not None:
+                self._db.execute(
+                    'INSERT INTO checkpoints (app_id, round, accounts, total_weight) VALUES (?, ?, ?, ?) '
+                    'ON CONFLICT(app_id) DO UPDATE SET round = excluded.round, '
+                    'accounts = checkpoints.accounts + excluded.accounts, '
+                    'total_weight = checkpoints.total_weight + excluded.total_weight',
+                    (self.app_id, last_round, *totals),
+                )
+        return seen
+
+    def _previous_weight(self, address: str) -> Optional[int]:
+        row = self._db.execute(
+            'SELECT weight FROM accounts WHERE app_id = ? AND address = ?', (self.app_id, address),
+        ).fetchone()
+        return row[0] if row else None
+
+    def _apply_call(self, round_number: int, call, totals: List[int]) -> None:
+        if call.on_complete in (CLOSE_OUT, CLEAR_STATE):
+            previous = self._previous_weight(call.sender)
+            if previous is not None:
+                self._db.execute('DELETE FROM accounts WHERE app_id = ? AND address = ?',
+                                 (self.app_id, call.sender))
+                totals[0] -= 1
+                totals[1] -= previous
+            return
+        for address, delta in call.local_deltas.items():
+            if WEIGHT_KEY not in delta:
+                continue
+            weight = delta[WEIGHT_KEY] or 0
+            previous = self._previous_weight(address)
+            totals[0] += previous is None
+            totals[1] += weight - (previous or 0)
+            opted_in_round = round_number if call.on_complete == OPT_IN and address == call.sender else None
+            self._db.execute(
+                'INSERT INTO accounts (app_id, address, weight, opted_in_round, updated_round) '
+                'VALUES (?, ?, ?, ?, ?) '
+                'ON CONFLICT(app_id, address) DO UPDATE SET weight = excluded.weight, '
+                'updated_round = excluded.updated_round, '
+                'opted_in_round = COALESCE(?, accounts.opted_in_round)',
+                (self.app_id, address, weight, opted_in_round or round_number, round_number, opted_in_round),
+            )
+
+    def top(self, limit: int) -> List[dict]:
+        with self._lock:
+            rows = self._db.execute(
+                'SELECT address, weight FROM accounts WHERE app_id = ? ORDER BY weight DESC, address LIMIT ?',
+                (self.app_id, limit),
+            ).fetchall()
+        return [{'address': address, 'weight': weight} for address, weight in rows]
+
+    def page(self, limit: int, after: Optional[Tuple[int, str]] = None) -> List[dict]:
+        """Keyset page ordered by weight desc, address asc, starting after ``(weight, address)``."""
+        query = 'SELECT address, weight FROM accounts WHERE app_id = ?'
+        params: list = [self.app_id]
+        if after is not None:
+            query += ' AND (weight < ? OR (weight = ? AND address > ?))'
+            params += [after[0], after[0], after[1]]
+        query += ' ORDER BY weight DESC, address LIMIT ?'
+        params.append(limit)
+        with self._lock:
+            rows = self._db.execute(query, params).fetchall()
+        return [{'address': address, 'weight': weight} for address, weight in rows]
+
+    def get(self, address: str) -> Optional[dict]:
+        with self._lock:
+            row = self._db.execute(
+                'SELECT weight, opted_in_round, updated_round FROM accounts WHERE app_id = ? AND address = ?',
+                (self.app_id, address),
+            ).fetchone()
+        if row is None:
+            return None
+        return {'address': address, 'weight': row[0], 'opted_in_round': row[1], 'updated_round': row[2]}
+
+    def summary(self) -> dict:
+        with self._lock:
+            row = self._db.execute(
+                'SELECT round, accounts, total_weight FROM checkpoints WHERE app_id = ?', (self.app_id,),
+            ).fetchone()
+        round_number, count, total = row or (None, 0, 0)
+        return {'app_id': self.app_id, 'accounts': count, 'total_weight': total, 'round': round_number}
+
+
+class WeightIndexer(BlockIndexer):
+    """Feeds a WeightIndex from algod."""
+
+    name = 'Weight'
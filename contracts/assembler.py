@@ -0,0 +1,367 @@
+"""
+Module: assembler.py
+Description: Offline TEAL assembler that produces the same program bytes as algod's /v2/teal/compile.
+
+Covers the TEAL v6 opcode set. Constant handling follows algod: for version 4
+and up, ``int``/``byte``/``addr``/``method`` constants used more than once go
+into ``intcblock``/``bytecblock`` ordered by use count (ties keep first-use
+order) and single-use constants become ``pushint``/``pushbytes``; earlier
+versions put every distinct constant in the block in first-use order. A
+program that declares its own constant blocks is assembled as written.
+"""
+
+import base64
+from collections import Counter
+from dataclasses import dataclass, field
+import hashlib
+from typing import Dict, List, Optional, Sequence, Tuple, Union
+
+from algosdk import encoding, logic
+
+from contracts.teal_evaluator import parse_bytes, parse_int, tokenize
+
+DEFAULT_VERSION = 1
+OPTIMIZE_CONSTANTS_VERSION = 4
+
+TXN_FIELDS = [
+    'Sender', 'Fee', 'FirstValid', 'FirstValidTime', 'LastValid', 'Note', 'Lease', 'Receiver', 'Amount',
+    'CloseRemainderTo', 'VotePK', 'SelectionPK', 'VoteFirst', 'VoteLast', 'VoteKeyDilution', 'Type',
+    'TypeEnum', 'XferAsset', 'AssetAmount', 'AssetSender', 'AssetReceiver', 'AssetCloseTo', 'GroupIndex',
+    'TxID', 'ApplicationID', 'OnCompletion', 'ApplicationArgs', 'NumAppArgs', 'Accounts', 'NumAccounts',
+    'ApprovalProgram', 'ClearStateProgram', 'RekeyTo', 'ConfigAsset', 'ConfigAssetTotal',
+    'ConfigAssetDecimals', 'ConfigAssetDefaultFrozen', 'ConfigAssetUnitName', 'ConfigAssetName',
+    'ConfigAssetURL', 'ConfigAssetMetadataHash', 'ConfigAssetManager', 'ConfigAssetReserve',
+    'ConfigAssetFreeze', 'ConfigAssetClawback', 'FreezeAsset', 'FreezeAssetAccount', 'FreezeAssetFrozen',
+    'Assets', 'NumAssets', 'Applications', 'NumApplications', 'GlobalNumUint', 'GlobalNumByteSlice',
+    'LocalNumUint', 'LocalNumByteSlice', 'ExtraProgramPages', 'Nonparticipation', 'Logs', 'NumLogs',
+    'CreatedAssetID', 'CreatedApplicationID', 'LastLog', 'StateProofPK',
+]
+GLOBAL_FIELDS = [
+    'MinTxnFee', 'MinBalance', 'MaxTxnLife', 'ZeroAddress', 'GroupSize', 'LogicSigVersion', 'Round',
+    'LatestTimestamp', 'CurrentApplicationID', 'CreatorAddress', 'CurrentApplicationAddress', 'GroupID',
+    'OpcodeBudget', 'CallerApplicationID', 'CallerApplicationAddress',
+]
+FIELD_GROUPS = {
+    'txn': TXN_FIELDS,
+    'global': GLOBAL_FIELDS,
+    'holding': ['AssetBalance', 'AssetFrozen'],
+    'asset': ['AssetTotal', 'AssetDecimals', 'AssetDefaultFrozen', 'AssetUnitName', 'AssetName', 'AssetURL',
+              'AssetMetadataHash', 'AssetManager', 'AssetReserve', 'AssetFreeze', 'AssetClawback', 'AssetCreator'],
+    'app': ['AppApprovalProgram', 'AppClearStateProgram', 'AppGlobalNumUint', 'AppGlobalNumByteSlice',
+            'AppLocalNumUint', 'AppLocalNumByteSlice', 'AppExtraProgramPages', 'AppCreator', 'AppAddress'],
+    'acct': ['AcctBalance', 'AcctMinBalance', 'AcctAuthAddr'],
+    'curve': ['Secp256k1'],
+}
+
+# Opcodes without immediates.
+SIMPLE_OPS = {
+    'err': 0x00, 'sha256': 0x01, 'keccak256': 0x02, 'sha512_256': 0x03, 'ed25519verify': 0x04,
+    '+': 0x08, '-': 0x09, '/': 0x0a, '*': 0x0b, '<': 0x0c, '>': 0x0d, '<=': 0x0e, '>=': 0x0f,
+    '&&': 0x10, '||': 0x11, '==': 0x12, '!=': 0x13, '!': 0x14, 'len': 0x15, 'itob': 0x16, 'btoi': 0x17,
+    '%': 0x18, '|': 0x19, '&': 0x1a, '^': 0x1b, '~': 0x1c, 'mulw': 0x1d, 'addw': 0x1e, 'divmodw': 0x1f,
+    'intc_0': 0x22, 'intc_1': 0x23, 'intc_2': 0x24, 'intc_3': 0x25,
+    'bytec_0': 0x28, 'bytec_1': 0x29, 'bytec_2': 0x2a, 'bytec_3': 0x2b,
+    'arg_0': 0x2d, 'arg_1': 0x2e, 'arg_2': 0x2f, 'arg_3': 0x30,
+    'gaids': 0x3d, 'loads': 0x3e, 'stores': 0x3f, 'return': 0x43, 'assert': 0x44,
+    'pop': 0x48, 'dup': 0x49, 'dup2': 0x4a, 'swap': 0x4c, 'select': 0x4d,
+    'concat': 0x50, 'substring3': 0x52, 'getbit': 0x53, 'setbit': 0x54, 'getbyte': 0x55, 'setbyte': 0x56,
+    'extract3': 0x58, 'extract_uint16': 0x59, 'extract_uint32': 0x5a, 'extract_uint64': 0x5b,
+    'balance': 0x60, 'app_opted_in': 0x61, 'app_local_get': 0x62, 'app_local_get_ex': 0x63,
+    'app_global_get': 0x64, 'app_global_get_ex': 0x65, 'app_local_put': 0x66, 'app_global_put': 0x67,
+    'app_local_del': 0x68, 'app_global_del': 0x69, 'min_balance': 0x78, 'retsub': 0x89,
+    'shl': 0x90, 'shr': 0x91, 'sqrt': 0x92, 'bitlen': 0x93, 'exp': 0x94, 'expw': 0x95, 'bsqrt': 0x96,
+    'divw': 0x97,
+    'b+': 0xa0, 'b-': 0xa1, 'b/': 0xa2, 'b*': 0xa3, 'b<': 0xa4, 'b>': 0xa5, 'b<=': 0xa6, 'b>=': 0xa7,
+    'b==': 0xa8, 'b!=': 0xa9, 'b%': 0xaa, 'b|': 0xab, 'b&': 0xac, 'b^': 0xad, 'b~': 0xae, 'bzero': 0xaf,
+    'log': 0xb0, 'itxn_begin': 0xb1, 'itxn_submit': 0xb3, 'itxn_next': 0xb6, 'args': 0xc3, 'gloadss': 0xc4,
+}
+
+# Opcodes with fixed-size immediates: 'u8' literal byte, a FIELD_GROUPS key, or 'label' (int16 offset).
+IMMEDIATE_OPS: Dict[str, Tuple[int, Tuple[str, ...]]] = {
+    'ecdsa_verify': (0x05, ('curve',)), 'ecdsa_pk_decompress': (0x06, ('curve',)),
+    'ecdsa_pk_recover': (0x07, ('curve',)),
+    'intc': (0x21, ('u8',)), 'bytec': (0x27, ('u8',)), 'arg': (0x2c, ('u8',)),
+    'txn': (0x31, ('txn',)), 'global': (0x32, ('global',)), 'gtxn': (0x33, ('u8', 'txn')),
+    'load': (0x34, ('u8',)), 'store': (0x35, ('u8',)), 'txna': (0x36, ('txn', 'u8')),
+    'gtxna': (0x37, ('u8', 'txn', 'u8')), 'gtxns': (0x38, ('txn',)), 'gtxnsa': (0x39, ('txn', 'u8')),
+    'gload': (0x3a, ('u8', 'u8')), 'gloads': (0x3b, ('u8',)), 'gaid': (0x3c, ('u8',)),
+    'bnz': (0x40, ('label',)), 'bz': (0x41, ('label',)), 'b': (0x42, ('label',)),
+    'dig': (0x4b, ('u8',)), 'cover': (0x4e, ('u8',)), 'uncover': (0x4f, ('u8',)),
+    'substring': (0x51, ('u8', 'u8')), 'extract': (0x57, ('u8', 'u8')),
+    'asset_holding_get': (0x70, ('holding',)), 'asset_params_get': (0x71, ('asset',)),
+    'app_params_get': (0x72, ('app',)), 'acct_params_get': (0x73, ('acct',)),
+    'callsub': (0x88, ('label',)),
+    'itxn_field': (0xb2, ('txn',)), 'itxn': (0xb4, ('txn',)), 'itxna': (0xb5, ('txn', 'u8')),
+    'gitxn': (0xb7, ('u8', 'txn')), 'gitxna': (0xb8, ('u8', 'txn', 'u8')),
+    'txnas': (0xc0, ('txn',)), 'gtxnas': (0xc1, ('u8', 'txn')), 'gtxnsas': (0xc2, ('txn',)),
+    'itxnas': (0xc5, ('txn',)), 'gitxnas': (0xc6, ('u8', 'txn')),
+}
+
+# Field accessors that take an extra array index select their "a" variant.
+ARRAY_VARIANTS = {'txn': (2, 'txna'), 'gtxn': (3, 'gtxna'), 'gtxns': (2, 'gtxnsa'),
+                  'itxn': (2, 'itxna'), 'gitxn': (3, 'gitxna')}
+
+INTCBLOCK, BYTECBLOCK, PUSHBYTES, PUSHINT = 0x20, 0x26, 0x80, 0x81
+
+
+class AssemblyError(ValueError):
+    """Invalid TEAL source; ``line`` is 1-based."""
+
+    def __init__(self, message: str, line: Optional[int] = None):
+        super().__init__(f'line {line}: {message}' if line else message)
+        self.line = line
+
+
+def varuint(value: int) -> bytes:
+    out = bytearray()
+    while True:
+        byte = value & 0x7f
+        value >>= 7
+        if value:
+            out.append(byte | 0x80)
+        else:
+            out.append(byte)
+            return bytes(out)
+
+
+_VLQ_CHARS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZabcdefghijklmnopqrstuvwxyz0123456789+/'
+
+
+def _vlq(value: int) -> str:
+    value = (-value << 1) | 1 if value < 0 else value << 1
+    out = ''
+    while True:
+        digit = value & 0x1f
+        value >>= 5
+        out += _VLQ_CHARS[digit | (0x20 if value else 0)]
+        if not value:
+            return out
+
+
+@dataclass
+class AssembledProgram:
+    """Program bytes plus the instruction offset -> zero-based source line map."""
+
+    program: bytes
+    version: int
+    pc_to_line: Dict[int, int] = field(default_factory=dict)
+
+    @property
+    def hash(self) -> str:
+        """Logic-signature address of the program, as algod reports it."""
+        return logic.address(self.program)
+
+    def source_map(self) -> dict:
+        """Source map in algod's format (one ``;``-separated VLQ segment per pc)."""
+        segments = []
+        previous = 0
+        for pc in range(max(self.pc_to_line, default=-1) + 1):
+            line = self.pc_to_line.get(pc)
+            if line is None:
+                segments.append('')
+            else:
+                segments.append('AA' + _vlq(line - previous) + 'A')
+                previous = line
+        return {'version': 3, 'sources': [], 'names': [], 'mappings': ';'.join(segments)}
+
+    def compile_response(self) -> dict:
+        """Same shape as algod's ``/v2/teal/compile`` response with ``sourcemap=true``."""
+        return {'hash': self.hash, 'result': base64.b64encode(self.program).decode(),
+                'sourcemap': self.source_map()}
+
+
+@dataclass
+class _Line:
+    number: int
+    op: str
+    args: List[str]
+    constant: Optional[Union[int, bytes]] = None
+
+
+def _constant(op: str, args: Sequence[str], number: int) -> Union[int, bytes]:
+    try:
+        if op == 'int':
+            return parse_int(args[0])
+        if op == 'byte':
+            return parse_bytes(args)
+        if op == 'addr':
+            return encoding.decode_address(args[0])
+        # method: ARC-4 selector
+        return hashlib.new('sha512_256', parse_bytes(args)).digest()[:4]
+    except (IndexError, ValueError, KeyError) as exc:
+        raise AssemblyError(f'bad {op} constant: {exc}', number) from None
+
+
+def _field_index(group: str, name: str, number: int) -> int:
+    names = FIELD_GROUPS[group]
+    if name in names:
+        return names.index(name)
+    if name.isdigit() and int(name) < len(names):
+        return int(name)
+    raise AssemblyError(f'unknown {group} field {name}', number)
+
+
+def _u8(value: str, number: int) -> int:
+    try:
+        parsed = int(value, 0)
+    except ValueError:
+        parsed = -1
+    if not 0 <= parsed <= 255:
+        raise AssemblyError(f'expected uint8 immediate, got {value}', number)
+    return parsed
+
+
+def _parse(source: str) -> Tuple[int, List[_Line], Dict[str, int]]:
+    version = None
+    lines: List[_Line] = []
+    labels: Dict[str, int] = {}
+    for number, raw in enumerate(source.splitlines(), start=1):
+        tokens = tokenize(raw)
+        if not tokens:
+            continue
+        if tokens[0] == '#pragma':
+            if len(tokens) < 3 or tokens[1] != 'version':
+                raise AssemblyError('unsupported pragma', number)
+            if lines or version is not None:
+                raise AssemblyError('#pragma version must come first', number)
+            version = int(tokens[2])
+            continue
+        if tokens[0].endswith(':'):
+            label = tokens[0][:-1]
+            if label in labels:
+                raise AssemblyError(f'duplicate label {label}', number)
+            labels[label] = len(lines)
+            tokens = tokens[1:]
+            if not tokens:
+                continue
+        op, args = tokens[0], tokens[1:]
+        if op in ARRAY_VARIANTS and len(args) == ARRAY_VARIANTS[op][0]:
+            op = ARRAY_VARIANTS[op][1]
+        line = _Line(number, op, args)
+        if op in ('int', 'byte', 'addr', 'method'):
+            line.constant = _constant(op, args, number)
+        elif op not in SIMPLE_OPS and op not in IMMEDIATE_OPS and op not in (
+                'intcblock', 'bytecblock', 'pushint', 'pushbytes'):
+            raise AssemblyError(f'unknown opcode {op}', number)
+        lines.append(line)
+    return version or DEFAULT_VERSION, lines, labels
+
+
+def _constant_block(values: List[Union[int, bytes]], optimize: bool) -> List[Union[int, bytes]]:
+    first_use: List[Union[int, bytes]] = []
+    for value in values:
+        if value not in first_use:
+            first_use.append(value)
+    if not optimize:
+        return first_use
+    counts = Counter(values)
+    # Stable sort keeps first-use order among equally used constants.
+    ranked = sorted(first_use, key=lambda value: -counts[value])
+    return [value for value in ranked if counts[value] > 1]
+
+
+def _const_ref(block: List[Union[int, bytes]], value: Union[int, bytes], is_int: bool,
+               version: int, number: int) -> bytes:
+    if value in block:
+        index = block.index(value)
+        if index < 4:
+            return bytes([(0x22 if is_int else 0x28) + index])
+        return bytes([0x21 if is_int else 0x27, index])
+    if version < 3:
+        raise AssemblyError('constant not in constant block', number)
+    if is_int:
+        return bytes([PUSHINT]) + varuint(value)
+    return bytes([PUSHBYTES]) + varuint(len(value)) + value
+
+
+def _int_block(values: List[int]) -> bytes:
+    return bytes([INTCBLOCK]) + varuint(len(values)) + b''.join(varuint(v) for v in values)
+
+
+def _bytes_block(values: List[bytes]) -> bytes:
+    return bytes([BYTECBLOCK]) + varuint(len(values)) + b''.join(varuint(len(v)) + v for v in values)
+
+
+def assemble(source: str) -> AssembledProgram:
+    """Assemble TEAL text into program bytes identical to algod's."""
+    version, lines, labels = _parse(source)
+    user_intc = [line for line in lines if line.op == 'intcblock']
+    user_bytec = [line for line in lines if line.op == 'bytecblock']
+    optimize = version >= OPTIMIZE_CONSTANTS_VERSION
+    int_values = [line.constant for line in lines if line.op == 'int']
+    byte_values = [line.constant for line in lines if line.op in ('byte', 'addr', 'method')]
+    # With a hand-written block, pseudo-ops resolve against the block the program declares first.
+    if user_intc:
+        intc = [parse_int(arg) for arg in user_intc[0].args]
+    else:
+        intc = _constant_block(int_values, optimize)
+    if user_bytec:
+        bytec = [parse_bytes([arg]) for arg in user_bytec[0].args]
+    else:
+        bytec = _constant_block(byte_values, optimize)
+
+    # First pass: encode everything except branch offsets, which only need sizes.
+    encoded: List[bytes] = []
+    branches: Dict[int, Tuple[str, int]] = {}
+    for index, line in enumerate(lines):
+        op, args, number = line.op, line.args, line.number
+        if op == 'int':
+            encoded.append(_const_ref(intc, line.constant, True, version, number))
+        elif op in ('byte', 'addr', 'method'):
+            encoded.append(_const_ref(bytec, line.constant, False, version, number))
+        elif op == 'intcblock':
+            encoded.append(_int_block([parse_int(arg) for arg in args]))
+        elif op == 'bytecblock':
+            encoded.append(_bytes_block([parse_bytes([arg]) for arg in args]))
+        elif op == 'pushint':
+            encoded.append(bytes([PUSHINT]) + varuint(parse_int(args[0])))
+        elif op == 'pushbytes':
+            value = parse_bytes(args)
+            encoded.append(bytes([PUSHBYTES]) + varuint(len(value)) + value)
+        elif op in SIMPLE_OPS:
+            if args:
+                raise AssemblyError(f'{op} takes no immediates', number)
+            encoded.append(bytes([SIMPLE_OPS[op]]))
+        else:
+            opcode, kinds = IMMEDIATE_OPS[op]
+            if len(args) != len(kinds):
+                raise AssemblyError(f'{op} expects {len(kinds)} immediate(s)', number)
+            out = bytearray([opcode])
+            for kind, arg in zip(kinds, args):
+                if kind == 'label':
+                    if arg not in labels:
+                        raise AssemblyError(f'unknown label {arg}', number)
+                    branches[index] = (arg, number)
+                    out += b'\0\0'
+                elif kind == 'u8':
+                    out.append(_u8(arg, number))
+                else:
+                    out.append(_field_index(kind, arg, number))
+            encoded.append(bytes(out))
+
+    offsets = []
+    pc = 0
+    for chunk in encoded:
+        offsets.append(pc)
+        pc += len(chunk)
+    offsets.append(pc)
+
+    for index, (label, number) in branches.items():
+        target = offsets[labels[label]]
+        delta = target - (offsets[index] + 3)
+        if not -0x8000 <= delta <= 0x7fff:
+            raise AssemblyError(f'branch to {label} too far', number)
+        encoded[index] = encoded[index][:1] + delta.to_bytes(2, 'big', signed=True)
+
+    prefix = varuint(version)
+    if intc and not user_intc:
+        prefix += _int_block(intc)
+    if bytec and not user_bytec:
+        prefix += _bytes_block(bytec)
+    pc_to_line = {len(prefix) + offsets[i]: line.number - 1 for i, line in enumerate(lines)}
+    return AssembledProgram(prefix + b''.join(encoded), version, pc_to_line)
+
+
+def assemble_bytes(source: str) -> bytes:
+    """``Assembler`` callable for contracts.build."""
+    return assemble(source).program
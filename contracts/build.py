@@ -0,0 +1,215 @@
+"""
+Module: build.py
+Description: Content-addressed build cache for the PyTeal contracts.
+
+A contract's build key hashes its module source (plus every ``contracts.*``
+module it imports), the PyTeal version and the compile options. Generated
+TEAL is stored under that key and assembled bytecode under the hash of the
+TEAL itself, so an unchanged contract costs two file reads: no PyTeal run
+and no algod round-trip. Cache misses compile in parallel worker processes.
+Bytecode comes from the offline assembler unless an algod assembler is
+passed; offline assembly is cheaper than a cache lookup and is not cached.
+
+Usage: python -m contracts.build [name ...] [--force] [--jobs N]
+"""
+
+import argparse
+import ast
+from base64 import b64decode
+from concurrent.futures import ProcessPoolExecutor
+from dataclasses import dataclass
+import hashlib
+import importlib
+import importlib.metadata
+import importlib.util
+import json
+import os
+from pathlib import Path
+from typing import Callable, Dict, Iterable, List, Optional, Sequence
+
+import pyteal
+
+from contracts.assembler import assemble_bytes
+
+CONTRACTS = ('donation_pool', 'umis_engine')
+TEAL_VERSION = 6
+PYTEAL_VERSION = importlib.metadata.version('pyteal')
+CACHE_DIR = Path(os.environ.get('LUCID_BUILD_CACHE', Path(__file__).resolve().parent.parent / '.build'))
+
+Assembler = Callable[[str], bytes]
+
+
+@dataclass
+class Artifact:
+    """TEAL and (when an assembler was available) bytecode for one contract."""
+
+    name: str
+    key: str
+    approval_teal: str
+    clear_teal: str
+    approval_bytes: Optional[bytes] = None
+    clear_bytes: Optional[bytes] = None
+    cached: bool = False
+
+
+def _module_path(module: str) -> Path:
+    spec = importlib.util.find_spec(module)
+    if spec is None or spec.origin is None:
+        raise ValueError(f'Cannot locate contract module {module}')
+    return Path(spec.origin)
+
+
+def _local_imports(path: Path) -> List[str]:
+    modules = []
+    # Top-level imports only; a ``__main__`` block importing the build tooling is not a dependency.
+    for node in ast.parse(path.read_text()).body:
+        if isinstance(node, ast.ImportFrom) and node.module == 'contracts':
+            # ``from contracts import utils`` names submodules
+            modules += [f'contracts.{alias.name}' for alias in node.names]
+        elif isinstance(node, ast.ImportFrom) and (node.module or '').startswith('contracts.'):
+            modules.append(node.module)
+        elif isinstance(node, ast.Import):
+            modules += [alias.name for alias in node.names if alias.name.startswith('contracts.')]
+    return modules
+
+
+def source_files(name: str) -> List[Path]:
+    """The contract module and every ``contracts.*`` module it transitively imports."""
+    seen: Dict[str, Path] = {}
+    pending = [f'contracts.{name}']
+    while pending:
+        module = pending.pop()
+        if module in seen:
+            continue
+        seen[module] = _module_path(module)
+        pending += _local_imports(seen[module])
+    return [seen[module] for module in sorted(seen)]
+
+
+def build_key(name: str, version: int = TEAL_VERSION, assemble_constants: bool = False) -> str:
+    digest = hashlib.sha256()
+    options = {'pyteal': PYTEAL_VERSION, 'version': version, 'assemble_constants': assemble_constants}
+    digest.update(json.dumps(options, sort_keys=True).encode())
+    for path in source_files(name):
+        digest.update(path.name.encode() + b'\0' + path.read_bytes() + b'\0')
+    return digest.hexdigest()
+
+
+def compile_contract(name: str, version: int = TEAL_VERSION, assemble_constants: bool = False) -> Dict[str, str]:
+    """Run PyTeal for one contract; executed in a worker process on cache misses."""
+    module = importlib.import_module(f'contracts.{name}')
+    options = {'mode': pyteal.Mode.Application, 'version': version, 'assembleConstants': assemble_constants}
+    return {
+        'approval': pyteal.compileTeal(module.approval_program(), **options),
+        'clear': pyteal.compileTeal(module.clear_state_program(), **options),
+    }
+
+
+class BuildCache:
+    """On-disk store: ``teal/<build key>.json`` and ``bytecode/<sha256 of TEAL>.bin``."""
+
+    def __init__(self, root: Path = CACHE_DIR):
+        self.root = Path(root)
+
+    def _write(self, path: Path, data: bytes) -> None:
+        path.parent.mkdir(parents=True, exist_ok=True)
+        # Write-then-rename so concurrent builds never read a partial file.
+        tmp = path.with_suffix(path.suffix + f'.{os.getpid()}.tmp')
+        tmp.write_bytes(data)
+        os.replace(tmp, path)
+
+    def get_teal(self, key: str) -> Optional[Dict[str, str]]:
+        path = self.root / 'teal' / f'{key}.json'
+        return json.loads(path.read_text()) if path.exists() else None
+
+    def put_teal(self, key: str, teal: Dict[str, str]) -> None:
+        self._write(self.root / 'teal' / f'{key}.json', json.dumps(teal).encode())
+
+    def get_bytecode(self, teal: str) -> Optional[bytes]:
+        path = self.root / 'bytecode' / f'{hashlib.sha256(teal.encode()).hexdigest()}.bin'
+        return path.read_bytes() if path.exists() else None
+
+    def put_bytecode(self, teal: str, program: bytes) -> None:
+        self._write(self.root / 'bytecode' / f'{hashlib.sha256(teal.encode()).hexdigest()}.bin', program)
+
+
+def build_contracts(names: Iterable[str] = CONTRACTS, assembler: Optional[Assembler] = assemble_bytes,
+                    cache: Optional[BuildCache] = None, version: int = TEAL_VERSION,
+                    assemble_constants: bool = False, force: bool = False,
+                    jobs: Optional[int] = None) -> Dict[str, Artifact]:
+    """Build contracts, compiling only those whose build key is not cached.
+
+    The ``assembler`` (TEAL text -> program bytes) fills in the bytecode; any
+    assembler other than the offline one only runs for TEAL not assembled
+    before. Pass ``None`` to skip assembly.
+    """
+    cache = cache or BuildCache()
+    names = list(names)
+    keys = {name: build_key(name, version, assemble_constants) for name in names}
+    teal = {} if force else {name: cache.get_teal(keys[name]) for name in names}
+    missing = [name for name in names if teal.get(name) is None]
+
+    if len(missing) == 1:
+        teal[missing[0]] = compile_contract(missing[0], version, assemble_constants)
+    elif missing:
+        workers = min(len(missing), jobs or os.cpu_count() or 1)
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = {name: pool.submit(compile_contract, name, version, assemble_constants) for name in missing}
+            for name, future in futures.items():
+                teal[name] = future.result()
+    for name in missing:
+        cache.put_teal(keys[name], teal[name])
+
+    artifacts = {}
+    for name in names:
+        artifact = Artifact(name, keys[name], teal[name]['approval'], teal[name]['clear'], cached=name not in missing)
+        if assembler is not None:
+            programs = []
+            for source in (artifact.approval_teal, artifact.clear_teal):
+                if assembler is assemble_bytes:
+                    programs.append(assembler(source))
+                    continue
+                program = None if force else cache.get_bytecode(source)
+                if program is None:
+                    program = assembler(source)
+                    cache.put_bytecode(source, program)
+                programs.append(program)
+            artifact.approval_bytes, artifact.clear_bytes = programs
+        artifacts[name] = artifact
+    return artifacts
+
+
+def algod_assembler(client) -> Assembler:
+    """Assemble through algod's ``/v2/teal/compile``; only called on bytecode cache misses."""
+    return lambda source: b64decode(client.compile(source)['result'])
+
+
+def build_contract(name: str, assembler: Optional[Assembler] = assemble_bytes, **kwargs) -> Artifact:
+    return build_contracts([name], assembler=assembler, **kwargs)[name]
+
+
+def export_teal(artifact: Artifact, directory: Path) -> Sequence[Path]:
+    """Write ``<name>_approval.teal``/``<name>_clear.teal``, leaving unchanged files untouched."""
+    paths = []
+    for suffix, text in (('approval', artifact.approval_teal), ('clear', artifact.clear_teal)):
+        path = Path(directory) / f'{artifact.name}_{suffix}.teal'
+        if not path.exists() or path.read_text() != text:
+            path.write_text(text)
+        paths.append(path)
+    return paths
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description='Build PyTeal contracts through the content-addressed cache.')
+    parser.add_argument('names', nargs='*', default=list(CONTRACTS))
+    parser.add_argument('--force', action='store_true', help='ignore cached TEAL and bytecode')
+    parser.add_argument('--jobs', type=int, default=None, help='worker processes for cache misses')
+    parser.add_argument('--out', type=Path, default=Path(__file__).resolve().parent, help='where to write .teal files')
+    args = parser.parse_args()
+    for artifact in build_contracts(args.names, force=args.force, jobs=args.jobs).values():
+        export_teal(artifact, args.out)
+        print(f"{artifact.name}: {'cached' if artifact.cached else 'compiled'} {artifact.key[:12]}")
+
+
+if __name__ == '__main__':
+    main()
@@ -8,29 +8,23 @@ from dotenv import load_dotenv
 from algosdk import account, mnemonic
 import base64
 import json
-import json
-from algosdk.v2client import algod
+from algosdk import transaction as future_txn
+from backend.algod_pool import best_algod_client
+from contracts.assembler import assemble
+from contracts.build import BuildCache
 
 # Load environment variables (backend/.env)
 load_dotenv(dotenv_path=os.path.join(os.path.dirname(__file__), '..', 'backend', '.env'))
 
-ALGOD_ADDRESS = os.getenv('ALGOD_ADDRESS')
-ALGOD_TOKEN   = os.getenv('ALGOD_TOKEN') or ''
-ALGOD_HEADER_KV = os.getenv('ALGOD_HEADER_KV')
 DEPLOYER_MNEMONIC = os.getenv('DEPLOYER_MNEMONIC')
 if DEPLOYER_MNEMONIC:
     DEPLOYER_MNEMONIC = DEPLOYER_MNEMONIC.strip('"')
 
-if not ALGOD_ADDRESS or not DEPLOYER_MNEMONIC:
-    raise RuntimeError('Missing required environment variables: ALGOD_ADDRESS and DEPLOYER_MNEMONIC')
+if not DEPLOYER_MNEMONIC:
+    raise RuntimeError('Missing required environment variable: DEPLOYER_MNEMONIC')
 
-# Prepare algod client (PureStake style headers if needed)
-headers = {}
-if ALGOD_HEADER_KV:
-    # Expected format "Key:Value"
-    key, value = ALGOD_HEADER_KV.split(':', 1)
-    headers[key.strip()] = value.strip()
-client = algod.AlgodClient(algod_token=ALGOD_TOKEN, algod_address=ALGOD_ADDRESS, headers=headers)
+# Most current of the configured nodes (ALGOD_ENDPOINTS, or ALGOD_ADDRESS/ALGOD_TOKEN/ALGOD_HEADER_KV)
+client = best_algod_client(os.environ)
 
 # Recover deployer account
 private_key = mnemonic.to_private_key(DEPLOYER_MNEMONIC)
@@ -39,10 +33,19 @@ sender = account.address_from_private_key(private_key)
 def compile_teal(path: str):
     with open(path, 'r') as f:
         source = f.read()
-    compile_response = client.compile(source)
-    # Algod returns base64-encoded program
-    program_b64 = compile_response['result']
-    return base64.b64decode(program_b64)
+    if os.getenv('TEAL_ASSEMBLER') == 'offline':
+        # Opt-in: the offline assembler is only checked byte for byte against
+        # algod for programs recorded in tests/fixtures/algod_compile
+        return assemble(source).program
+    # Bytecode is cached by TEAL hash, so unchanged programs skip algod entirely
+    cache = BuildCache()
+    program = cache.get_bytecode(source)
+    if program is None:
+        compile_response = client.compile(source)
+        # Algod returns base64-encoded program
+        program = base64.b64decode(compile_response['result'])
+        cache.put_bytecode(source, program)
+    return program
 
 
 
@@ -0,0 +1,172 @@
+"""
+Module: distribution_planner.py
+Description: Off-chain planner that splits large UMIS payouts into distribute groups.
+
+Each ``distribute`` call pays the accounts listed in ``Txn.accounts``
+``WideRatio([pool_amount, weight], [total_weight])`` (see ``contracts/utils.py``),
+where ``total_weight`` is the app's pool-wide global, and refunds any part of
+the group payment left over to the payer. The arithmetic here mirrors that
+exactly: a 128-bit product followed by floor division, vectorized over NumPy
+``uint64`` arrays so millions of recipients can be planned in seconds.
+"""
+
+from dataclasses import dataclass
+from typing import Iterator, List, Optional, Sequence, Tuple
+
+import numpy as np
+
+# AVM limit on foreign accounts per application call.
+MAX_ACCOUNTS_PER_CALL = 4
+MIN_TXN_FEE = 1000
+MIN_WEIGHT = 1
+MAX_WEIGHT = 1_000_000
+
+_U64 = np.uint64
+_MASK32 = _U64(0xFFFFFFFF)
+_MAX_U64 = (1 << 64) - 1
+
+
+def mulw(a: np.ndarray, b: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Full 128-bit product of two uint64 arrays as ``(high, low)`` words, like TEAL ``mulw``."""
+    a = np.asarray(a, dtype=_U64)
+    b = np.asarray(b, dtype=_U64)
+    a_lo, a_hi = a & _MASK32, a >> _U64(32)
+    b_lo, b_hi = b & _MASK32, b >> _U64(32)
+    ll = a_lo * b_lo
+    lh = a_lo * b_hi
+    hl = a_hi * b_lo
+    hh = a_hi * b_hi
+    mid = (ll >> _U64(32)) + (lh & _MASK32) + (hl & _MASK32)
+    low = (ll & _MASK32) | (mid << _U64(32))
+    high = hh + (lh >> _U64(32)) + (hl >> _U64(32)) + (mid >> _U64(32))
+    return high, low
+
+
+def divmodw(high: np.ndarray, low: np.ndarray, divisor: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Divide 128-bit values by uint64 divisors, returning 64-bit quotients and remainders.
+
+    Like ``WideRatio`` this rejects quotients that do not fit in 64 bits.
+    """
+    high = np.asarray(high, dtype=_U64)
+    low = np.asarray(low, dtype=_U64)
+    divisor = np.broadcast_to(np.asarray(divisor, dtype=_U64), low.shape)
+    if np.any(divisor == 0):
+        raise ZeroDivisionError('WideRatio divisor is zero')
+    if np.any(high >= divisor):
+        raise OverflowError('WideRatio result does not fit in uint64')
+    quotient = np.zeros(low.shape, dtype=_U64)
+    remainder = high.copy()
+    one = _U64(1)
+    with np.errstate(over='ignore'):
+        for bit in range(63, -1, -1):
+            carry = remainder >> _U64(63)
+            remainder = (remainder << one) | ((low >> _U64(bit)) & one)
+            take = (carry == one) | (remainder >= divisor)
+            remainder = np.where(take, remainder - divisor, remainder)
+            quotient |= take.astype(_U64) << _U64(bit)
+    return quotient, remainder
+
+
+def wide_ratio(amount: np.ndarray, weight: np.ndarray, total_weight: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+    """Vectorized ``share_for_weight``: ``floor(amount * weight / total_weight)`` plus remainder."""
+    amount = np.asarray(amount, dtype=_U64)
+    weight = np.asarray(weight, dtype=_U64)
+    total_weight = np.asarray(total_weight, dtype=_U64)
+    if amount.size and weight.size and int(amount.max()) * int(weight.max()) <= _MAX_U64:
+        # Common case: the product fits in 64 bits, so plain integer division is exact.
+        product = amount * weight
+        return product // total_weight, product % total_weight
+    high, low = mulw(amount, weight)
+    return divmodw(high, low, total_weight)
+
+
+@dataclass
+class DistributionPlan:
+    """Per-group payment amounts and the exact per-recipient shares the contract will pay.
+
+    Group ``g`` covers ``order[group_offsets[g]:group_offsets[g + 1]]``. Every
+    group's app call passes ``pool_amount`` as its second argument; the payment
+    in front of it covers exactly its recipients' shares, so nothing is
+    refunded to the payer.
+    """
+
+    pool_amount: int
+    pool_weight: int
+    order: np.ndarray
+    group_offsets: np.ndarray
+    group_amounts: np.ndarray
+    shares: np.ndarray
+    inner_payments: int
+    fee_total: int
+
+    @property
+    def group_count(self) -> int:
+        return len(self.group_amounts)
+
+    @property
+    def distributed_total(self) -> int:
+        return int(self.shares.sum(dtype=object))
+
+    @property
+    def remainder_total(self) -> int:
+        """Rounding dust that stays with the funder because no group pays it out."""
+        return self.pool_amount - self.distributed_total
+
+    def app_args(self) -> List[bytes]:
+        """Application arguments for every ``distribute`` call in the plan."""
+        return [b'distribute', self.pool_amount.to_bytes(8, 'big')]
+
+    def groups(self) -> Iterator[Tuple[int, np.ndarray]]:
+        """Yield ``(payment_amount, recipient_indexes)`` for each payment + app-call group."""
+        for g in range(self.group_count):
+            start, end = self.group_offsets[g], self.group_offsets[g + 1]
+            yield int(self.group_amounts[g]), self.order[start:end]
+
+
+def plan_distribution(weights: Sequence[int], total_amount: int,
+                      accounts_per_call: int = MAX_ACCOUNTS_PER_CALL,
+                      min_fee: int = MIN_TXN_FEE,
+                      pool_weight: Optional[int] = None) -> DistributionPlan:
+    """Plan payment + ``distribute`` groups that pay ``total_amount`` across ``weights``.
+
+    ``pool_weight`` is the app's ``total_weight`` global at distribution time;
+    it defaults to the sum of ``weights``, i.e. every opted-in account is being
+    paid. Each recipient receives ``total_amount * weight // pool_weight``, the
+    same value the contract computes, and recipients are packed heaviest first
+    (``accounts_per_call`` per call). Fees assume the app call pools the fee
+    for its inner payments.
+    """
+    weights = np.asarray(weights, dtype=np.int64)
+    if weights.ndim != 1 or weights.size == 0:
+        raise ValueError('Provide at least one recipient weight')
+    if weights.min() < MIN_WEIGHT or weights.max() > MAX_WEIGHT:
+        raise ValueError(f'Weights must be between {MIN_WEIGHT} and {MAX_WEIGHT}')
+    if not 0 < total_amount <= _MAX_U64:
+        raise ValueError('total_amount must be a positive uint64')
+    if not 1 <= accounts_per_call <= MAX_ACCOUNTS_PER_CALL:
+        raise ValueError(f'accounts_per_call must be between 1 and {MAX_ACCOUNTS_PER_CALL}')
+    # Weights are capped at MAX_WEIGHT, so the summed weight always fits in uint64.
+    recipients_weight = int(weights.sum(dtype=object))
+    if pool_weight is None:
+        pool_weight = recipients_weight
+    elif not recipients_weight <= pool_weight <= _MAX_U64:
+        raise ValueError('pool_weight must cover every recipient weight')
+
+    order = np.argsort(-weights, kind='stable')
+    group_offsets = np.append(np.arange(0, weights.size, accounts_per_call), weights.size)
+    shares, _ = wide_ratio(_U64(total_amount), weights.astype(_U64), _U64(pool_weight))
+    group_amounts = np.add.reduceat(shares[order], group_offsets[:-1])
+
+    # The contract pays every listed recipient, even a zero share.
+    inner_payments = int(weights.size)
+    fee_total = min_fee * (2 * len(group_amounts) + inner_payments)
+    return DistributionPlan(
+        pool_amount=total_amount,
+        pool_weight=pool_weight,
+        order=order,
+        group_offsets=group_offsets,
+        group_amounts=group_amounts,
+        shares=shares,
+        inner_payments=inner_payments,
+        fee_total=fee_total,
+    )
@@ -0,0 +1,1287 @@
+"""
+Module: teal_evaluator.py
+Description: Offline evaluator for the TEAL v6 subset PyTeal emits, with opcode-cost accounting.
+
+Runs compiled approval/clear programs against an in-memory ledger so contract
+behaviour, inner transactions and opcode cost can be checked without algod.
+Costs follow the v6 cost table and the group-pooled 700-per-app-call budget;
+each run also reports cost per basic block (the label an instruction sits
+under), which makes it easy to see which branch of a program dominates.
+"""
+
+import base64
+from collections import Counter
+import copy
+from dataclasses import dataclass, field
+import hashlib
+import re
+from typing import Callable, Dict, List, Optional, Sequence, Tuple, Union
+
+from algosdk import encoding, logic
+
+Value = Union[int, bytes]
+
+MAX_UINT64 = 2 ** 64 - 1
+MAX_STACK_DEPTH = 1000
+MAX_BYTE_MATH_SIZE = 64
+MAX_BYTES_LENGTH = 4096
+MAX_KEY_LENGTH = 64
+MAX_KEY_VALUE_LENGTH = 128
+MAX_GROUP_SIZE = 16
+MAX_APP_ARGS = 16
+MAX_APP_ACCOUNTS = 4
+APP_CALL_BUDGET = 700
+MAX_INNER_TXNS_PER_CALL = 16
+MIN_TXN_FEE = 1000
+MIN_BALANCE = 100_000
+APP_MIN_BALANCE = 100_000
+SCHEMA_UINT_MIN_BALANCE = 28_500
+SCHEMA_BYTES_MIN_BALANCE = 50_000
+ENTRY_BLOCK = 'main'
+
+NOOP, OPT_IN, CLOSE_OUT, CLEAR_STATE, UPDATE_APPLICATION, DELETE_APPLICATION = range(6)
+TXN_TYPES = {'unknown': 0, 'pay': 1, 'keyreg': 2, 'acfg': 3, 'axfer': 4, 'afrz': 5, 'appl': 6}
+ON_COMPLETE_NAMES = {
+    'NoOp': NOOP, 'OptIn': OPT_IN, 'CloseOut': CLOSE_OUT, 'ClearState': CLEAR_STATE,
+    'UpdateApplication': UPDATE_APPLICATION, 'DeleteApplication': DELETE_APPLICATION,
+}
+NAMED_INTS = {**TXN_TYPES, **ON_COMPLETE_NAMES}
+
+# Opcodes whose v6 cost is not 1.
+OPCODE_COSTS = {
+    'sha256': 35, 'sha512_256': 45, 'keccak256': 130, 'ed25519verify': 1900,
+    'divmodw': 20, 'expw': 10, 'sqrt': 4, 'bsqrt': 40,
+    'b+': 10, 'b-': 10, 'b*': 20, 'b/': 20, 'b%': 20,
+    'b|': 6, 'b&': 6, 'b^': 6, 'b~': 4,
+}
+
+
+class TealError(Exception):
+    """A program failed or the group broke a protocol rule; the whole group is rejected."""
+
+    def __init__(self, message: str, line: Optional[int] = None):
+        super().__init__(f'line {line}: {message}' if line else message)
+        self.line = line
+        self.txn_index: Optional[int] = None
+
+
+def _raw(address: str) -> bytes:
+    return encoding.decode_address(address)
+
+
+def _address(raw: bytes) -> str:
+    return encoding.encode_address(raw)
+
+
+def app_address(app_id: int) -> str:
+    return logic.get_application_address(app_id)
+
+
+# --- Parsing ---------------------------------------------------------------
+
+_TOKEN = re.compile(r'"(?:[^"\\]|\\.)*"|\S+')
+
+
+@dataclass
+class Instruction:
+    op: str
+    args: List[str]
+    line: int
+    block: str
+
+
+def _parse_string(token: str) -> bytes:
+    out = bytearray()
+    body = token[1:-1]
+    i = 0
+    escapes = {'n': 10, 'r': 13, 't': 9, '\\': 92, '"': 34}
+    while i < len(body):
+        char = body[i]
+        if char == '\\':
+            code = body[i + 1]
+            if code == 'x':
+                out.append(int(body[i + 2:i + 4], 16))
+                i += 4
+                continue
+            out.append(escapes[code])
+            i += 2
+            continue
+        out += char.encode()
+        i += 1
+    return bytes(out)
+
+
+def parse_bytes(args: Sequence[str]) -> bytes:
+    """Decode a ``byte``/``pushbytes`` immediate: ``"str"``, ``0x..``, ``base64 ..`` or ``base32 ..``."""
+    token = args[0]
+    if token.startswith('"'):
+        return _parse_string(token)
+    if token.startswith('0x'):
+        return bytes.fromhex(token[2:])
+    for prefix, decode in (('base64', base64.b64decode), ('b64', base64.b64decode),
+                           ('base32', lambda s: base64.b32decode(s + '=' * (-len(s) % 8))),
+                           ('b32', lambda s: base64.b32decode(s + '=' * (-len(s) % 8)))):
+        if token == prefix:
+            return decode(args[1])
+        if token.startswith(prefix + '(') and token.endswith(')'):
+            return decode(token[len(prefix) + 1:-1])
+    raise ValueError(f'Cannot parse byte constant {" ".join(args)}')
+
+
+def tokenize(line: str) -> List[str]:
+    """Split one source line into tokens, dropping any ``//`` comment."""
+    tokens = []
+    for token in _TOKEN.findall(line):
+        if token.startswith('//'):
+            break
+        tokens.append(token)
+    return tokens
+
+
+def parse_int(token: str) -> int:
+    if token in NAMED_INTS:
+        return NAMED_INTS[token]
+    value = int(token, 0)
+    if not 0 <= value <= MAX_UINT64:
+        raise ValueError(f'Integer constant out of range: {token}')
+    return value
+
+
+class Program:
+    """A parsed TEAL program: instructions, label targets and the basic block of each instruction."""
+
+    def __init__(self, source: str):
+        self.source = source
+        self.version = 1
+        self.instructions: List[Instruction] = []
+        self.labels: Dict[str, int] = {}
+        block = ENTRY_BLOCK
+        for number, raw_line in enumerate(source.splitlines(), start=1):
+            tokens = tokenize(raw_line)
+            if not tokens:
+                continue
+            if tokens[0] == '#pragma':
+                if tokens[1] == 'version':
+                    self.version = int(tokens[2])
+                continue
+            if tokens[0].endswith(':'):
+                block = tokens[0][:-1]
+                self.labels[block] = len(self.instructions)
+                tokens = tokens[1:]
+                if not tokens:
+                    continue
+            op = tokens[0]
+            if op not in _OPS:
+                raise ValueError(f'line {number}: unsupported opcode {op}')
+            self.instructions.append(Instruction(op, tokens[1:], number, block))
+        for ins in self.instructions:
+            if ins.op in ('b', 'bz', 'bnz', 'callsub') and ins.args[0] not in self.labels:
+                raise ValueError(f'line {ins.line}: unknown label {ins.args[0]}')
+
+
+# --- Ledger model ----------------------------------------------------------
+
+@dataclass
+class Transaction:
+    """A payment or application call as seen by the evaluator."""
+
+    sender: str
+    type: str = 'pay'
+    fee: int = MIN_TXN_FEE
+    receiver: Optional[str] = None
+    amount: int = 0
+    close_remainder_to: Optional[str] = None
+    note: bytes = b''
+    app_id: int = 0
+    on_complete: int = NOOP
+    app_args: List[bytes] = field(default_factory=list)
+    accounts: List[str] = field(default_factory=list)
+    foreign_apps: List[int] = field(default_factory=list)
+    approval_program: Optional[str] = None
+    clear_program: Optional[str] = None
+    global_schema: Tuple[int, int] = (0, 0)
+    local_schema: Tuple[int, int] = (0, 0)
+
+
+def payment(sender: str, receiver: str, amount: int, fee: int = MIN_TXN_FEE) -> Transaction:
+    return Transaction(sender=sender, receiver=receiver, amount=amount, fee=fee)
+
+
+def app_call(sender: str, app_id: int, app_args: Sequence[bytes] = (), accounts: Sequence[str] = (),
+             on_complete: int = NOOP, fee: int = MIN_TXN_FEE) -> Transaction:
+    return Transaction(sender=sender, type='appl', fee=fee, app_id=app_id, on_complete=on_complete,
+                       app_args=list(app_args), accounts=list(accounts))
+
+
+@dataclass
+class Application:
+    app_id: int
+    creator: bytes
+    approval: Program
+    clear: Program
+    global_schema: Tuple[int, int]
+    local_schema: Tuple[int, int]
+    global_state: Dict[bytes, Value] = field(default_factory=dict)
+
+
+@dataclass
+class EvalResult:
+    """Outcome of one program run."""
+
+    approved: bool
+    cost: int
+    opcodes: int
+    branch_costs: Dict[str, int]
+    inner_txns: List[Transaction]
+    logs: List[bytes]
+
+
+@dataclass
+class GroupResult:
+    """Per-transaction results (``None`` for payments) and group-wide totals."""
+
+    results: List[Optional[EvalResult]]
+    budget: int
+    app_id: Optional[int] = None
+
+    @property
+    def cost(self) -> int:
+        return sum(result.cost for result in self.results if result is not None)
+
+    @property
+    def inner_txn_count(self) -> int:
+        return sum(len(result.inner_txns) for result in self.results if result is not None)
+
+    @property
+    def branch_costs(self) -> Dict[str, int]:
+        total: Counter = Counter()
+        for result in self.results:
+            if result is not None:
+                total.update(result.branch_costs)
+        return dict(total)
+
+
+class _GroupContext:
+    def __init__(self, group: Sequence[Transaction]):
+        self.group = group
+        calls = sum(txn.type == 'appl' for txn in group)
+        self.budget = APP_CALL_BUDGET * calls
+        self.remaining = self.budget
+        self.inner_remaining = MAX_INNER_TXNS_PER_CALL * calls
+        self.fee_credit = sum(txn.fee for txn in group) - MIN_TXN_FEE * len(group)
+
+
+class Ledger:
+    """In-memory balances, applications and local state."""
+
+    def __init__(self, round_number: int = 1000, timestamp: int = 1_700_000_000, first_app_id: int = 1001):
+        self.round = round_number
+        self.timestamp = timestamp
+        self.balances: Dict[bytes, int] = {}
+        self.apps: Dict[int, Application] = {}
+        self.local: Dict[Tuple[bytes, int], Dict[bytes, Value]] = {}
+        self._next_app_id = first_app_id
+
+    # Inspection helpers take and return string addresses and text keys.
+
+    def fund(self, address: str, amount: int) -> None:
+        raw = _raw(address)
+        self.balances[raw] = self.balances.get(raw, 0) + amount
+
+    def balance(self, address: str) -> int:
+        return self.balances.get(_raw(address), 0)
+
+    def global_state(self, app_id: int) -> Dict[str, Value]:
+        return {key.decode('utf-8', 'surrogateescape'): value
+                for key, value in self.apps[app_id].global_state.items()}
+
+    def local_state(self, address: str, app_id: int) -> Optional[Dict[str, Value]]:
+        state = self.local.get((_raw(address), app_id))
+        if state is None:
+            return None
+        return {key.decode('utf-8', 'surrogateescape'): value for key, value in state.items()}
+
+    def min_balance(self, raw: bytes) -> int:
+        required = MIN_BALANCE
+        for app in self.apps.values():
+            if (raw, app.app_id) in self.local:
+                uints, byte_slices = app.local_schema
+                required += APP_MIN_BALANCE + SCHEMA_UINT_MIN_BALANCE * uints + SCHEMA_BYTES_MIN_BALANCE * byte_slices
+            if app.creator == raw:
+                uints, byte_slices = app.global_schema
+                required += APP_MIN_BALANCE + SCHEMA_UINT_MIN_BALANCE * uints + SCHEMA_BYTES_MIN_BALANCE * byte_slices
+        return required
+
+    def _snapshot(self):
+        # Parsed programs are immutable, so only the state containers are copied.
+        apps = {app_id: (copy.copy(app), dict(app.global_state)) for app_id, app in self.apps.items()}
+        local = {key: dict(state) for key, state in self.local.items()}
+        return dict(self.balances), apps, local, self._next_app_id
+
+    def _restore(self, snapshot) -> None:
+        balances, apps, local, self._next_app_id = snapshot
+        self.balances = balances
+        self.local = local
+        self.apps = {}
+        for app_id, (app, global_state) in apps.items():
+            app.global_state = global_state
+            self.apps[app_id] = app
+
+    def _debit(self, raw: bytes, amount: int, touched: set) -> None:
+        balance = self.balances.get(raw, 0)
+        if balance < amount:
+            raise TealError(f'overspend: {_address(raw)} has {balance}, needs {amount}')
+        self.balances[raw] = balance - amount
+        touched.add(raw)
+
+    def _credit(self, raw: bytes, amount: int) -> None:
+        self.balances[raw] = self.balances.get(raw, 0) + amount
+
+    def _check_min_balances(self, touched: set) -> None:
+        for raw in touched:
+            balance = self.balances.get(raw, 0)
+            if balance and balance < self.min_balance(raw):
+                raise TealError(f'{_address(raw)} balance {balance} below min {self.min_balance(raw)}')
+
+    def execute(self, group: Sequence[Transaction]) -> GroupResult:
+        """Apply an atomic group; on any failure the ledger is left untouched and TealError raised."""
+        if not 1 <= len(group) <= MAX_GROUP_SIZE:
+            raise TealError(f'group size must be between 1 and {MAX_GROUP_SIZE}')
+        context = _GroupContext(group)
+        if context.fee_credit < 0:
+            raise TealError('group fees below the minimum')
+        snapshot = self._snapshot()
+        results: List[Optional[EvalResult]] = []
+        created = None
+        index = 0
+        try:
+            for index, txn in enumerate(group):
+                result, app_id = self._apply(context, index)
+                results.append(result)
+                created = app_id if txn.type == 'appl' and txn.app_id == 0 else created
+        except TealError as exc:
+            self._restore(snapshot)
+            exc.txn_index = index
+            raise
+        return GroupResult(results, context.budget, app_id=created)
+
+    def _apply(self, context: _GroupContext, index: int) -> Tuple[Optional[EvalResult], Optional[int]]:
+        txn = context.group[index]
+        sender = _raw(txn.sender)
+        touched: set = set()
+        self._debit(sender, txn.fee, touched)
+        result = None
+        app_id = None
+        if txn.type == 'pay':
+            self._pay(sender, txn, touched)
+        elif txn.type == 'appl':
+            result, app_id = self._app_call(context, index, touched)
+        else:
+            raise TealError(f'unsupported transaction type {txn.type}')
+        self._check_min_balances(touched)
+        return result, app_id
+
+    def _pay(self, sender: bytes, txn: Transaction, touched: set) -> None:
+        self._debit(sender, txn.amount, touched)
+        self._credit(_raw(txn.receiver), txn.amount)
+        if txn.close_remainder_to:
+            remainder = self.balances.pop(sender, 0)
+            self._credit(_raw(txn.close_remainder_to), remainder)
+
+    def _app_call(self, context: _GroupContext, index: int, touched: set) -> Tuple[EvalResult, int]:
+        txn = context.group[index]
+        if len(txn.app_args) > MAX_APP_ARGS or len(txn.accounts) > MAX_APP_ACCOUNTS:
+            raise TealError('too many application arguments or foreign accounts')
+        sender = _raw(txn.sender)
+        app_id = txn.app_id
+        if app_id == 0:
+            app_id = self._next_app_id
+            self._next_app_id += 1
+            self.apps[app_id] = Application(
+                app_id, sender, Program(txn.approval_program), Program(txn.clear_program),
+                tuple(txn.global_schema), tuple(txn.local_schema),
+            )
+            touched.add(sender)
+        if app_id not in self.apps:
+            raise TealError(f'application {app_id} does not exist')
+        app = self.apps[app_id]
+        key = (sender, app_id)
+
+        if txn.on_complete == CLEAR_STATE:
+            if key not in self.local:
+                raise TealError('clear state from an account that is not opted in')
+            saved = self._snapshot()
+            try:
+                result = _Evaluator(self, app, app.clear, context, index, touched).run()
+            except TealError:
+                result = None
+            if result is None or not result.approved:
+                # A failing clear program still clears local state; only its effects are undone.
+                self._restore(saved)
+                app = self.apps[app_id]
+            self.local.pop(key, None)
+            return result or EvalResult(False, 0, 0, {}, [], []), app_id
+
+        if txn.on_complete == OPT_IN:
+            if key in self.local:
+                raise TealError('account already opted in')
+            self.local[key] = {}
+            touched.add(sender)
+        elif txn.on_complete == CLOSE_OUT and key not in self.local:
+            raise TealError('close out from an account that is not opted in')
+
+        result = _Evaluator(self, app, app.approval, context, index, touched).run()
+        if not result.approved:
+            raise TealError('rejected by approval program')
+
+        if txn.on_complete == CLOSE_OUT:
+            self.local.pop(key, None)
+        elif txn.on_complete == DELETE_APPLICATION:
+            del self.apps[app_id]
+            for local_key in [k for k in self.local if k[1] == app_id]:
+                del self.local[local_key]
+        elif txn.on_complete == UPDATE_APPLICATION:
+            app.approval = Program(txn.approval_program)
+            app.clear = Program(txn.clear_program)
+        return result, app_id
+
+
+# --- Evaluation ------------------------------------------------------------
+
+_OPS: Dict[str, Callable] = {}
+
+
+def _op(*names: str):
+    def register(func):
+        for name in names:
+            _OPS[name] = func
+        return func
+    return register
+
+
+class _Return(Exception):
+    pass
+
+
+class _Evaluator:
+    def __init__(self, ledger: Ledger, app: Application, program: Program,
+                 context: _GroupContext, index: int, touched: set):
+        self.ledger = ledger
+        self.app = app
+        self.program = program
+        self.context = context
+        self.index = index
+        self.txn = context.group[index]
+        self.touched = touched
+        self.stack: List[Value] = []
+        self.scratch: List[Value] = [0] * 256
+        self.calls: List[int] = []
+        self.intc: List[int] = []
+        self.bytec: List[bytes] = []
+        self.inner_pending: Optional[List[Dict[str, Value]]] = None
+        self.inner_txns: List[Transaction] = []
+        self.logs: List[bytes] = []
+        self.line: Optional[int] = None
+        self.pc = 0
+
+    def fail(self, message: str) -> TealError:
+        return TealError(message, self.line)
+
+    # stack helpers
+
+    def push(self, value: Value) -> None:
+        if isinstance(value, int) and not 0 <= value <= MAX_UINT64:
+            raise self.fail('integer overflow')
+        if isinstance(value, bytes) and len(value) > MAX_BYTES_LENGTH:
+            raise self.fail('byte string too long')
+        if len(self.stack) >= MAX_STACK_DEPTH:
+            raise self.fail('stack overflow')
+        self.stack.append(value)
+
+    def pop(self) -> Value:
+        if not self.stack:
+            raise self.fail('stack underflow')
+        return self.stack.pop()
+
+    def pop_int(self) -> int:
+        value = self.pop()
+        if not isinstance(value, int):
+            raise self.fail('expected uint64, got bytes')
+        return value
+
+    def pop_bytes(self) -> bytes:
+        value = self.pop()
+        if not isinstance(value, bytes):
+            raise self.fail('expected bytes, got uint64')
+        return value
+
+    def pop_ints(self, count: int) -> List[int]:
+        values = [self.pop_int() for _ in range(count)]
+        return values[::-1]
+
+    def pop_bigints(self, count: int) -> List[int]:
+        values = []
+        for _ in range(count):
+            value = self.pop_bytes()
+            if len(value) > MAX_BYTE_MATH_SIZE:
+                raise self.fail('byte math input too long')
+            values.append(int.from_bytes(value, 'big'))
+        return values[::-1]
+
+    def push_bigint(self, value: int) -> None:
+        self.push(value.to_bytes((value.bit_length() + 7) // 8, 'big'))
+
+    # run loop
+
+    def run(self) -> EvalResult:
+        instructions = self.program.instructions
+        branch_costs: Counter = Counter()
+        cost = opcodes = 0
+        approved = None
+        try:
+            while self.pc < len(instructions):
+                ins = instructions[self.pc]
+                self.line = ins.line
+                op_cost = OPCODE_COSTS.get(ins.op, 1)
+                self.context.remaining -= op_cost
+                if self.context.remaining < 0:
+                    raise self.fail('dynamic cost budget exceeded')
+                cost += op_cost
+                opcodes += 1
+                branch_costs[ins.block] += op_cost
+                self.pc += 1
+                _OPS[ins.op](self, ins)
+        except _Return:
+            approved = self.pop_int() != 0
+        if approved is None:
+            if len(self.stack) != 1:
+                raise self.fail(f'stack has {len(self.stack)} values at end of program')
+            approved = self.pop_int() != 0
+        return EvalResult(approved, cost, opcodes, dict(branch_costs), self.inner_txns, self.logs)
+
+    # accounts and fields
+
+    def resolve_account(self, value: Value) -> bytes:
+        refs = [_raw(self.txn.sender)] + [_raw(a) for a in self.txn.accounts]
+        if isinstance(value, int):
+            if value >= len(refs):
+                raise self.fail(f'invalid Accounts index {value}')
+            return refs[value]
+        if value in refs or value == _raw(app_address(self.app.app_id)):
+            return value
+        raise self.fail(f'unavailable Account {_address(value) if len(value) == 32 else value!r}')
+
+    def resolve_app(self, value: int) -> int:
+        apps = [self.app.app_id] + list(self.txn.foreign_apps)
+        if value < len(apps):
+            return apps[value]
+        if value in apps:
+            return value
+        raise self.fail(f'unavailable App {value}')
+
+    def txn_field(self, txn: Transaction, name: str, group_index: int, array_index: Optional[int] = None) -> Value:
+        if name in ('ApplicationArgs', 'Accounts', 'Applications'):
+            if name == 'ApplicationArgs':
+                values: List[Value] = list(txn.app_args)
+            elif name == 'Accounts':
+                values = [_raw(txn.sender)] + [_raw(a) for a in txn.accounts]
+            else:
+                values = [txn.app_id] + list(txn.foreign_apps)
+            if array_index is None or array_index >= len(values):
+                raise self.fail(f'invalid {name} index {array_index}')
+            return values[array_index]
+        fields = {
+            'Sender': lambda: _raw(txn.sender),
+            'Fee': lambda: txn.fee,
+            'FirstValid': lambda: self.ledger.round,
+            'LastValid': lambda: self.ledger.round + 1000,
+            'Note': lambda: txn.note,
+            'Lease': lambda: bytes(32),
+            'Receiver': lambda: _raw(txn.receiver) if txn.receiver else bytes(32),
+            'Amount': lambda: txn.amount,
+            'CloseRemainderTo': lambda: _raw(txn.close_remainder_to) if txn.close_remainder_to else bytes(32),
+            'RekeyTo': lambda: bytes(32),
+            'Type': lambda: txn.type.encode(),
+            'TypeEnum': lambda: TXN_TYPES[txn.type],
+            'GroupIndex': lambda: group_index,
+            'ApplicationID': lambda: txn.app_id,
+            'OnCompletion': lambda: txn.on_complete,
+            'NumAppArgs': lambda: len(txn.app_args),
+            'NumAccounts': lambda: len(txn.accounts),
+            'NumApplications': lambda: len(txn.foreign_apps),
+            'GlobalNumUint': lambda: txn.global_schema[0],
+            'GlobalNumByteSlice': lambda: txn.global_schema[1],
+            'LocalNumUint': lambda: txn.local_schema[0],
+            'LocalNumByteSlice': lambda: txn.local_schema[1],
+        }
+        if name not in fields:
+            raise self.fail(f'unsupported transaction field {name}')
+        return fields[name]()
+
+    def group_txn(self, index: int) -> Transaction:
+        if index >= len(self.context.group):
+            raise self.fail(f'group index {index} out of range')
+        return self.context.group[index]
+
+    def global_field(self, name: str) -> Value:
+        fields = {
+            'MinTxnFee': lambda: MIN_TXN_FEE,
+            'MinBalance': lambda: MIN_BALANCE,
+            'MaxTxnLife': lambda: 1000,
+            'ZeroAddress': lambda: bytes(32),
+            'GroupSize': lambda: len(self.context.group),
+            'LogicSigVersion': lambda: 6,
+            'Round': lambda: self.ledger.round,
+            'LatestTimestamp': lambda: self.ledger.timestamp,
+            'CurrentApplicationID': lambda: self.app.app_id,
+            'CreatorAddress': lambda: self.app.creator,
+            'CurrentApplicationAddress': lambda: _raw(app_address(self.app.app_id)),
+            'GroupID': lambda: bytes(32),
+            'OpcodeBudget': lambda: self.context.remaining,
+            'CallerApplicationID': lambda: 0,
+            'CallerApplicationAddress': lambda: bytes(32),
+        }
+        if name not in fields:
+            raise self.fail(f'unsupported global field {name}')
+        return fields[name]()
+
+    def local_state(self, account: bytes, app_id: int, create: bool = False) -> Optional[Dict[bytes, Value]]:
+        state = self.ledger.local.get((account, app_id))
+        if state is None and create:
+            raise self.fail(f'{_address(account)} is not opted in to {app_id}')
+        return state
+
+    def check_put(self, state: Dict[bytes, Value], schema: Tuple[int, int], key: bytes, value: Value) -> None:
+        if len(key) > MAX_KEY_LENGTH or (isinstance(value, bytes) and len(key) + len(value) > MAX_KEY_VALUE_LENGTH):
+            raise self.fail('key or value too long')
+        updated = dict(state)
+        updated[key] = value
+        uints = sum(isinstance(v, int) for v in updated.values())
+        if uints > schema[0] or len(updated) - uints > schema[1]:
+            raise self.fail(f'store exceeds schema {schema[0]} uints / {schema[1]} byte slices')
+
+
+# Control flow
+
+@_op('err')
+def _err(ev: _Evaluator, ins: Instruction):
+    raise ev.fail('err opcode executed')
+
+
+@_op('assert')
+def _assert(ev: _Evaluator, ins: Instruction):
+    if ev.pop_int() == 0:
+        raise ev.fail('assert failed')
+
+
+@_op('return')
+def _return(ev: _Evaluator, ins: Instruction):
+    ev.stack[:] = ev.stack[-1:]
+    raise _Return()
+
+
+@_op('b')
+def _branch(ev: _Evaluator, ins: Instruction):
+    ev.pc = ev.program.labels[ins.args[0]]
+
+
+@_op('bz', 'bnz')
+def _branch_if(ev: _Evaluator, ins: Instruction):
+    if (ev.pop_int() != 0) == (ins.op == 'bnz'):
+        ev.pc = ev.program.labels[ins.args[0]]
+
+
+@_op('callsub')
+def _callsub(ev: _Evaluator, ins: Instruction):
+    ev.calls.append(ev.pc)
+    ev.pc = ev.program.labels[ins.args[0]]
+
+
+@_op('retsub')
+def _retsub(ev: _Evaluator, ins: Instruction):
+    if not ev.calls:
+        raise ev.fail('retsub with empty call stack')
+    ev.pc = ev.calls.pop()
+
+
+# Constants
+
+@_op('int', 'pushint')
+def _int(ev: _Evaluator, ins: Instruction):
+    ev.push(parse_int(ins.args[0]))
+
+
+@_op('byte', 'pushbytes')
+def _byte(ev: _Evaluator, ins: Instruction):
+    ev.push(parse_bytes(ins.args))
+
+
+@_op('addr')
+def _addr(ev: _Evaluator, ins: Instruction):
+    ev.push(_raw(ins.args[0]))
+
+
+@_op('intcblock')
+def _intcblock(ev: _Evaluator, ins: Instruction):
+    ev.intc = [parse_int(arg) for arg in ins.args]
+
+
+@_op('bytecblock')
+def _bytecblock(ev: _Evaluator, ins: Instruction):
+    ev.bytec = [parse_bytes([arg]) for arg in ins.args]
+
+
+@_op('intc', 'intc_0', 'intc_1', 'intc_2', 'intc_3')
+def _intc(ev: _Evaluator, ins: Instruction):
+    index = int(ins.args[0]) if ins.op == 'intc' else int(ins.op[-1])
+    if index >= len(ev.intc):
+        raise ev.fail(f'intc {index} out of range')
+    ev.push(ev.intc[index])
+
+
+@_op('bytec', 'bytec_0', 'bytec_1', 'bytec_2', 'bytec_3')
+def _bytec(ev: _Evaluator, ins: Instruction):
+    index = int(ins.args[0]) if ins.op == 'bytec' else int(ins.op[-1])
+    if index >= len(ev.bytec):
+        raise ev.fail(f'bytec {index} out of range')
+    ev.push(ev.bytec[index])
+
+
+# uint64 arithmetic and logic
+
+_BINARY_INT = {
+    '+': lambda a, b: a + b,
+    '-': lambda a, b: a - b,
+    '*': lambda a, b: a * b,
+    '/': lambda a, b: a // b,
+    '%': lambda a, b: a % b,
+    '<': lambda a, b: int(a < b),
+    '>': lambda a, b: int(a > b),
+    '<=': lambda a, b: int(a <= b),
+    '>=': lambda a, b: int(a >= b),
+    '&&': lambda a, b: int(bool(a) and bool(b)),
+    '||': lambda a, b: int(bool(a) or bool(b)),
+    '&': lambda a, b: a & b,
+    '|': lambda a, b: a | b,
+    '^': lambda a, b: a ^ b,
+    'shl': lambda a, b: (a << b) & MAX_UINT64,
+    'shr': lambda a, b: a >> b,
+    'exp': lambda a, b: a ** b,
+}
+
+
+@_op(*_BINARY_INT)
+def _binary_int(ev: _Evaluator, ins: Instruction):
+    a, b = ev.pop_ints(2)
+    if ins.op in ('/', '%') and b == 0:
+        raise ev.fail('division by zero')
+    if ins.op in ('shl', 'shr') and b > 63:
+        raise ev.fail('shift amount too large')
+    if ins.op == '-' and b > a:
+        raise ev.fail('integer underflow')
+    if ins.op == 'exp' and a == 0 and b == 0:
+        raise ev.fail('0 ** 0 is undefined')
+    ev.push(_BINARY_INT[ins.op](a, b))
+
+
+@_op('!')
+def _not(ev: _Evaluator, ins: Instruction):
+    ev.push(int(ev.pop_int() == 0))
+
+
+@_op('~')
+def _bitnot(ev: _Evaluator, ins: Instruction):
+    ev.push(ev.pop_int() ^ MAX_UINT64)
+
+
+@_op('sqrt')
+def _sqrt(ev: _Evaluator, ins: Instruction):
+    value = ev.pop_int()
+    root = int(value ** 0.5)
+    while root * root > value:
+        root -= 1
+    while (root + 1) * (root + 1) <= value:
+        root += 1
+    ev.push(root)
+
+
+@_op('bitlen')
+def _bitlen(ev: _Evaluator, ins: Instruction):
+    value = ev.pop()
+    ev.push((value if isinstance(value, int) else int.from_bytes(value, 'big')).bit_length())
+
+
+@_op('==', '!=')
+def _equals(ev: _Evaluator, ins: Instruction):
+    b, a = ev.pop(), ev.pop()
+    if type(a) is not type(b):
+        raise ev.fail(f'{ins.op} on mismatched types')
+    ev.push(int((a == b) == (ins.op == '==')))
+
+
+@_op('mulw')
+def _mulw(ev: _Evaluator, ins: Instruction):
+    a, b = ev.pop_ints(2)
+    product = a * b
+    ev.push(product >> 64)
+    ev.push(product & MAX_UINT64)
+
+
+@_op('addw')
+def _addw(ev: _Evaluator, ins: Instruction):
+    a, b = ev.pop_ints(2)
+    total = a + b
+    ev.push(total >> 64)
+    ev.push(total & MAX_UINT64)
+
+
+@_op('expw')
+def _expw(ev: _Evaluator, ins: Instruction):
+    a, b = ev.pop_ints(2)
+    if a == 0 and b == 0:
+        raise ev.fail('0 ** 0 is undefined')
+    result = a ** b
+    if result > 2 ** 128 - 1:
+        raise ev.fail('expw overflow')
+    ev.push(result >> 64)
+    ev.push(result & MAX_UINT64)
+
+
+@_op('divmodw')
+def _divmodw(ev: _Evaluator, ins: Instruction):
+    a_hi, a_lo, b_hi, b_lo = ev.pop_ints(4)
+    dividend = (a_hi << 64) | a_lo
+    divisor = (b_hi << 64) | b_lo
+    if divisor == 0:
+        raise ev.fail('division by zero')
+    quotient, remainder = divmod(dividend, divisor)
+    ev.push(quotient >> 64)
+    ev.push(quotient & MAX_UINT64)
+    ev.push(remainder >> 64)
+    ev.push(remainder & MAX_UINT64)
+
+
+@_op('divw')
+def _divw(ev: _Evaluator, ins: Instruction):
+    a_hi, a_lo, divisor = ev.pop_ints(3)
+    if divisor == 0:
+        raise ev.fail('division by zero')
+    quotient = ((a_hi << 64) | a_lo) // divisor
+    if quotient > MAX_UINT64:
+        raise ev.fail('divw overflow')
+    ev.push(quotient)
+
+
+# Byte strings and byte math
+
+@_op('len')
+def _len(ev: _Evaluator, ins: Instruction):
+    ev.push(len(ev.pop_bytes()))
+
+
+@_op('itob')
+def _itob(ev: _Evaluator, ins: Instruction):
+    ev.push(ev.pop_int().to_bytes(8, 'big'))
+
+
+@_op('btoi')
+def _btoi(ev: _Evaluator, ins: Instruction):
+    value = ev.pop_bytes()
+    if len(value) > 8:
+        raise ev.fail('btoi input longer than 8 bytes')
+    ev.push(int.from_bytes(value, 'big'))
+
+
+@_op('concat')
+def _concat(ev: _Evaluator, ins: Instruction):
+    b, a = ev.pop_bytes(), ev.pop_bytes()
+    ev.push(a + b)
+
+
+def _slice(ev: _Evaluator, value: bytes, start: int, end: int) -> bytes:
+    if start > end or end > len(value):
+        raise ev.fail('substring out of range')
+    return value[start:end]
+
+
+@_op('substring')
+def _substring(ev: _Evaluator, ins: Instruction):
+    ev.push(_slice(ev, ev.pop_bytes(), int(ins.args[0]), int(ins.args[1])))
+
+
+@_op('substring3')
+def _substring3(ev: _Evaluator, ins: Instruction):
+    start, end = ev.pop_ints(2)
+    ev.push(_slice(ev, ev.pop_bytes(), start, end))
+
+
+@_op('extract')
+def _extract(ev: _Evaluator, ins: Instruction):
+    value = ev.pop_bytes()
+    start, length = int(ins.args[0]), int(ins.args[1])
+    ev.push(_slice(ev, value, start, len(value) if length == 0 else start + length))
+
+
+@_op('extract3')
+def _extract3(ev: _Evaluator, ins: Instruction):
+    start, length = ev.pop_ints(2)
+    ev.push(_slice(ev, ev.pop_bytes(), start, start + length))
+
+
+@_op('extract_uint16', 'extract_uint32', 'extract_uint64')
+def _extract_uint(ev: _Evaluator, ins: Instruction):
+    start = ev.pop_int()
+    size = int(ins.op[len('extract_uint'):]) // 8
+    ev.push(int.from_bytes(_slice(ev, ev.pop_bytes(), start, start + size), 'big'))
+
+
+@_op('getbyte')
+def _getbyte(ev: _Evaluator, ins: Instruction):
+    index = ev.pop_int()
+    value = ev.pop_bytes()
+    if index >= len(value):
+        raise ev.fail('getbyte index out of range')
+    ev.push(value[index])
+
+
+@_op('bzero')
+def _bzero(ev: _Evaluator, ins: Instruction):
+    ev.push(bytes(ev.pop_int()))
+
+
+@_op('sha256', 'sha512_256')
+def _hash(ev: _Evaluator, ins: Instruction):
+    value = ev.pop_bytes()
+    digest = hashlib.sha256(value) if ins.op == 'sha256' else hashlib.new('sha512_256', value)
+    ev.push(digest.digest())
+
+
+_BYTE_MATH = {
+    'b+': lambda a, b: a + b,
+    'b-': lambda a, b: a - b,
+    'b*': lambda a, b: a * b,
+    'b/': lambda a, b: a // b,
+    'b%': lambda a, b: a % b,
+}
+
+_BYTE_COMPARE = {
+    'b==': lambda a, b: a == b,
+    'b!=': lambda a, b: a != b,
+    'b<': lambda a, b: a < b,
+    'b>': lambda a, b: a > b,
+    'b<=': lambda a, b: a <= b,
+    'b>=': lambda a, b: a >= b,
+}
+
+
+@_op(*_BYTE_MATH)
+def _byte_math(ev: _Evaluator, ins: Instruction):
+    a, b = ev.pop_bigints(2)
+    if ins.op in ('b/', 'b%') and b == 0:
+        raise ev.fail('byte math division by zero')
+    if ins.op == 'b-' and b > a:
+        raise ev.fail('byte math underflow')
+    ev.push_bigint(_BYTE_MATH[ins.op](a, b))
+
+
+@_op(*_BYTE_COMPARE)
+def _byte_compare(ev: _Evaluator, ins: Instruction):
+    a, b = ev.pop_bigints(2)
+    ev.push(int(_BYTE_COMPARE[ins.op](a, b)))
+
+
+# Stack manipulation and scratch space
+
+@_op('pop')
+def _pop(ev: _Evaluator, ins: Instruction):
+    ev.pop()
+
+
+@_op('dup')
+def _dup(ev: _Evaluator, ins: Instruction):
+    value = ev.pop()
+    ev.push(value)
+    ev.push(value)
+
+
+@_op('dup2')
+def _dup2(ev: _Evaluator, ins: Instruction):
+    b, a = ev.pop(), ev.pop()
+    for value in (a, b, a, b):
+        ev.push(value)
+
+
+@_op('swap')
+def _swap(ev: _Evaluator, ins: Instruction):
+    b, a = ev.pop(), ev.pop()
+    ev.push(b)
+    ev.push(a)
+
+
+@_op('dig')
+def _dig(ev: _Evaluator, ins: Instruction):
+    depth = int(ins.args[0])
+    if depth >= len(ev.stack):
+        raise ev.fail('dig past bottom of stack')
+    ev.push(ev.stack[-1 - depth])
+
+
+@_op('cover')
+def _cover(ev: _Evaluator, ins: Instruction):
+    depth = int(ins.args[0])
+    if depth >= len(ev.stack):
+        raise ev.fail('cover past bottom of stack')
+    ev.stack.insert(len(ev.stack) - 1 - depth, ev.stack.pop())
+
+
+@_op('uncover')
+def _uncover(ev: _Evaluator, ins: Instruction):
+    depth = int(ins.args[0])
+    if depth >= len(ev.stack):
+        raise ev.fail('uncover past bottom of stack')
+    ev.stack.append(ev.stack.pop(len(ev.stack) - 1 - depth))
+
+
+@_op('select')
+def _select(ev: _Evaluator, ins: Instruction):
+    condition = ev.pop_int()
+    b, a = ev.pop(), ev.pop()
+    ev.push(b if condition else a)
+
+
+@_op('load')
+def _load(ev: _Evaluator, ins: Instruction):
+    ev.push(ev.scratch[int(ins.args[0])])
+
+
+@_op('store')
+def _store(ev: _Evaluator, ins: Instruction):
+    ev.scratch[int(ins.args[0])] = ev.pop()
+
+
+@_op('loads')
+def _loads(ev: _Evaluator, ins: Instruction):
+    slot = ev.pop_int()
+    if slot > 255:
+        raise ev.fail('scratch slot out of range')
+    ev.push(ev.scratch[slot])
+
+
+@_op('stores')
+def _stores(ev: _Evaluator, ins: Instruction):
+    value = ev.pop()
+    slot = ev.pop_int()
+    if slot > 255:
+        raise ev.fail('scratch slot out of range')
+    ev.scratch[slot] = value
+
+
+# Transaction and global fields
+
+@_op('txn')
+def _txn(ev: _Evaluator, ins: Instruction):
+    ev.push(ev.txn_field(ev.txn, ins.args[0], ev.index, int(ins.args[1]) if len(ins.args) > 1 else None))
+
+
+@_op('txna')
+def _txna(ev: _Evaluator, ins: Instruction):
+    ev.push(ev.txn_field(ev.txn, ins.args[0], ev.index, int(ins.args[1])))
+
+
+@_op('txnas')
+def _txnas(ev: _Evaluator, ins: Instruction):
+    ev.push(ev.txn_field(ev.txn, ins.args[0], ev.index, ev.pop_int()))
+
+
+@_op('gtxn', 'gtxna')
+def _gtxn(ev: _Evaluator, ins: Instruction):
+    group_index = int(ins.args[0])
+    array_index = int(ins.args[2]) if len(ins.args) > 2 else None
+    ev.push(ev.txn_field(ev.group_txn(group_index), ins.args[1], group_index, array_index))
+
+
+@_op('gtxnas')
+def _gtxnas(ev: _Evaluator, ins: Instruction):
+    group_index = int(ins.args[0])
+    ev.push(ev.txn_field(ev.group_txn(group_index), ins.args[1], group_index, ev.pop_int()))
+
+
+@_op('gtxns', 'gtxnsa')
+def _gtxns(ev: _Evaluator, ins: Instruction):
+    group_index = ev.pop_int()
+    array_index = int(ins.args[1]) if len(ins.args) > 1 else None
+    ev.push(ev.txn_field(ev.group_txn(group_index), ins.args[0], group_index, array_index))
+
+
+@_op('gtxnsas')
+def _gtxnsas(ev: _Evaluator, ins: Instruction):
+    array_index = ev.pop_int()
+    group_index = ev.pop_int()
+    ev.push(ev.txn_field(ev.group_txn(group_index), ins.args[0], group_index, array_index))
+
+
+@_op('global')
+def _global(ev: _Evaluator, ins: Instruction):
+    ev.push(ev.global_field(ins.args[0]))
+
+
+# Application state and balances
+
+@_op('app_global_get')
+def _app_global_get(ev: _Evaluator, ins: Instruction):
+    ev.push(ev.app.global_state.get(ev.pop_bytes(), 0))
+
+
+@_op('app_global_get_ex')
+def _app_global_get_ex(ev: _Evaluator, ins: Instruction):
+    key = ev.pop_bytes()
+    app_id = ev.resolve_app(ev.pop_int())
+    state = ev.ledger.apps[app_id].global_state if app_id in ev.ledger.apps else {}
+    ev.push(state.get(key, 0))
+    ev.push(int(key in state))
+
+
+@_op('app_global_put')
+def _app_global_put(ev: _Evaluator, ins: Instruction):
+    value = ev.pop()
+    key = ev.pop_bytes()
+    ev.check_put(ev.app.global_state, ev.app.global_schema, key, value)
+    ev.app.global_state[key] = value
+
+
+@_op('app_global_del')
+def _app_global_del(ev: _Evaluator, ins: Instruction):
+    ev.app.global_state.pop(ev.pop_bytes(), None)
+
+
+@_op('app_local_get')
+def _app_local_get(ev: _Evaluator, ins: Instruction):
+    key = ev.pop_bytes()
+    account = ev.resolve_account(ev.pop())
+    ev.push((ev.local_state(account, ev.app.app_id) or {}).get(key, 0))
+
+
+@_op('app_local_get_ex')
+def _app_local_get_ex(ev: _Evaluator, ins: Instruction):
+    key = ev.pop_bytes()
+    app_id = ev.resolve_app(ev.pop_int())
+    account = ev.resolve_account(ev.pop())
+    state = ev.local_state(account, app_id) or {}
+    ev.push(state.get(key, 0))
+    ev.push(int(key in state))
+
+
+@_op('app_local_put')
+def _app_local_put(ev: _Evaluator, ins: Instruction):
+    value = ev.pop()
+    key = ev.pop_bytes()
+    account = ev.resolve_account(ev.pop())
+    state = ev.local_state(account, ev.app.app_id, create=True)
+    ev.check_put(state, ev.app.local_schema, key, value)
+    state[key] = value
+
+
+@_op('app_local_del')
+def _app_local_del(ev: _Evaluator, ins: Instruction):
+    key = ev.pop_bytes()
+    account = ev.resolve_account(ev.pop())
+    ev.local_state(account, ev.app.app_id, create=True).pop(key, None)
+
+
+@_op('app_opted_in')
+def _app_opted_in(ev: _Evaluator, ins: Instruction):
+    app_id = ev.resolve_app(ev.pop_int())
+    account = ev.resolve_account(ev.pop())
+    ev.push(int((account, app_id) in ev.ledger.local))
+
+
+@_op('balance')
+def _balance(ev: _Evaluator, ins: Instruction):
+    ev.push(ev.ledger.balances.get(ev.resolve_account(ev.pop()), 0))
+
+
+@_op('min_balance')
+def _min_balance(ev: _Evaluator, ins: Instruction):
+    ev.push(ev.ledger.min_balance(ev.resolve_account(ev.pop())))
+
+
+@_op('log')
+def _log(ev: _Evaluator, ins: Instruction):
+    if len(ev.logs) >= 32:
+        raise ev.fail('too many log calls')
+    ev.logs.append(ev.pop_bytes())
+
+
+# Inner transactions (payments only)
+
+_INNER_FIELDS = {'TypeEnum', 'Type', 'Sender', 'Receiver', 'Amount', 'CloseRemainderTo', 'Fee', 'Note'}
+
+
+@_op('itxn_begin')
+def _itxn_begin(ev: _Evaluator, ins: Instruction):
+    if ev.inner_pending is not None:
+        raise ev.fail('itxn_begin without itxn_submit')
+    ev.inner_pending = [{}]
+
+
+@_op('itxn_next')
+def _itxn_next(ev: _Evaluator, ins: Instruction):
+    if ev.inner_pending is None:
+        raise ev.fail('itxn_next without itxn_begin')
+    ev.inner_pending.append({})
+
+
+@_op('itxn_field')
+def _itxn_field(ev: _Evaluator, ins: Instruction):
+    if ev.inner_pending is None:
+        raise ev.fail('itxn_field without itxn_begin')
+    name = ins.args[0]
+    if name not in _INNER_FIELDS:
+        raise ev.fail(f'unsupported inner transaction field {name}')
+    ev.inner_pending[-1][name] = ev.pop()
+
+
+@_op('itxn_submit')
+def _itxn_submit(ev: _Evaluator, ins: Instruction):
+    if not ev.inner_pending:
+        raise ev.fail('itxn_submit without itxn_begin')
+    pending, ev.inner_pending = ev.inner_pending, None
+    ledger, context = ev.ledger, ev.context
+    app_account = _raw(app_address(ev.app.app_id))
+    for fields in pending:
+        if context.inner_remaining <= 0:
+            raise ev.fail('too many inner transactions')
+        context.inner_remaining -= 1
+        kind = fields.get('Type', b'').decode() if 'Type' in fields else None
+        if 'TypeEnum' in fields:
+            kind = {v: k for k, v in TXN_TYPES.items()}.get(fields['TypeEnum'])
+        if kind != 'pay':
+            raise ev.fail(f'unsupported inner transaction type {kind}')
+        sender = fields.get('Sender', app_account)
+        if sender != app_account:
+            raise ev.fail('inner transaction sender must be the application account')
+        if 'Fee' in fields:
+            fee = fields['Fee']
+        elif context.fee_credit >= MIN_TXN_FEE:
+            # Fee pooling: earlier overpayment in the group covers this inner transaction.
+            context.fee_credit -= MIN_TXN_FEE
+            fee = 0
+        else:
+            fee = MIN_TXN_FEE
+        receiver = fields.get('Receiver', bytes(32))
+        amount = fields.get('Amount', 0)
+        ledger._debit(sender, fee + amount, ev.touched)
+        ledger._credit(receiver, amount)
+        inner = Transaction(sender=_address(sender), receiver=_address(receiver), amount=amount, fee=fee,
+                            note=fields.get('Note', b''))
+        if 'CloseRemainderTo' in fields:
+            inner.close_remainder_to = _address(fields['CloseRemainderTo'])
+            ledger._credit(fields['CloseRemainderTo'], ledger.balances.pop(sender, 0))
+        ev.inner_txns.append(inner)
+
+
+@_op('itxn')
+def _itxn(ev: _Evaluator, ins: Instruction):
+    if not ev.inner_txns:
+        raise ev.fail('no inner transaction submitted')
+    ev.push(ev.txn_field(ev.inner_txns[-1], ins.args[0], 0))
@@ -1,19 +1,38 @@
 """PyTeal implementation of the UMIS engine that regulates opt-in weights
-and pays out proportional distributions via inner payments."""
+and pays out proportional distributions, either pushed via inner payments or
+accrued per weight for recipients to claim."""
 
 from pyteal import *
 from pyteal import TxnType
-from contracts.utils import share_for_weight
+from contracts.utils import accrue_reward, funded_reward, pending_reward, reward_increment, share_for_weight
 
 # UMIS Engine: registration + weighted distribution
 # Local state keys:
 # - "weight" : uint64 weight for each opted-in account (default 1)
+# - "reward_checkpoint" : reward_per_weight when the account last settled
+# - "owed" : uint64 settled but unclaimed payout
 # Global keys:
 # - "Owner" : creator address (set on creation)
+# - "opt_in_count" : number of currently opted-in accounts
+# - "total_weight" : sum of every opted-in account's weight
+# - "payout_mode" : PUSH_MODE or CLAIM_MODE, chosen at creation
+# - "reward_per_weight" : fixed-point cumulative payout per weight unit (bytes)
+# - "claim_reserved" : microAlgos funded but not yet claimed (the part of each
+#   payment the accumulator took in; rounding leftovers stay withdrawable)
+# Schema: global 4 uints / 2 byte slices, local 2 uints / 1 byte slice.
 
-OWNER_KEY = Bytes("Owner")  # stored at creation; controls withdrawals and remainders
+OWNER_KEY = Bytes("Owner")  # stored at creation; controls withdrawals
 WEIGHT_KEY = Bytes("weight")  # per-account weight used during payout allocation
 OPT_IN_COUNT_KEY = Bytes("opt_in_count")  # counter for opted-in accounts
+TOTAL_WEIGHT_KEY = Bytes("total_weight")  # pool weight maintained on every weight change
+PAYOUT_MODE_KEY = Bytes("payout_mode")  # how distribute pays recipients
+REWARD_PER_WEIGHT_KEY = Bytes("reward_per_weight")  # claim-mode accumulator
+RESERVED_KEY = Bytes("claim_reserved")  # funds the owner cannot withdraw
+CHECKPOINT_KEY = Bytes("reward_checkpoint")  # per-account accumulator snapshot
+OWED_KEY = Bytes("owed")  # per-account settled payout
+
+PUSH_MODE = Int(0)  # distribute sends an inner payment to every listed account
+CLAIM_MODE = Int(1)  # distribute bumps reward_per_weight; accounts call claim
 
 MIN_WEIGHT = Int(1)
 MAX_WEIGHT = Int(1_000_000)
@@ -35,33 +54,94 @@ def send_payment(receiver: Expr, amount: Expr, memo: Expr = None) -> Expr:
     )
 
 
+def owed_after_settle(account: Expr) -> Expr:
+    """The account's owed amount plus whatever its weight accrued since its checkpoint."""
+    return App.localGet(account, OWED_KEY) + pending_reward(
+        App.globalGet(REWARD_PER_WEIGHT_KEY),
+        App.localGet(account, CHECKPOINT_KEY),
+        App.localGet(account, WEIGHT_KEY),
+    )
+
+
+def settle(account: Expr) -> Expr:
+    """Fold accrued rewards into ``owed`` before the account's weight changes."""
+    return Seq(
+        App.localPut(account, OWED_KEY, owed_after_settle(account)),
+        App.localPut(account, CHECKPOINT_KEY, App.globalGet(REWARD_PER_WEIGHT_KEY)),
+    )
+
+
+def release_reserve(amount: Expr) -> Expr:
+    """Lower claim_reserved by ``amount``, clamped at zero."""
+    reserved = App.globalGet(RESERVED_KEY)
+    return App.globalPut(RESERVED_KEY, If(reserved > amount, reserved - amount, Int(0)))
+
+
+def leave_pool(account: Expr) -> Expr:
+    """Remove an account's weight and membership from the global totals.
+
+    Clamped at zero instead of asserting so the clear-state program, whose
+    failure would still clear local state, never leaves the totals stale.
+    """
+    current = App.globalGet(TOTAL_WEIGHT_KEY)
+    weight = App.localGet(account, WEIGHT_KEY)
+    count = App.globalGet(OPT_IN_COUNT_KEY)
+    return Seq(
+        App.globalPut(TOTAL_WEIGHT_KEY, If(current > weight, current - weight, Int(0))),
+        App.globalPut(OPT_IN_COUNT_KEY, If(count > Int(0), count - Int(1), Int(0))),
+    )
+
+
 def approval_program():
     """Builds the approval logic that handles opt-in, weight updates, and distribute."""
     i = ScratchVar(TealType.uint64)
     n = ScratchVar(TealType.uint64)
-    total_amount = ScratchVar(TealType.uint64)
-    total_weight = ScratchVar(TealType.uint64)
+    pool_amount = ScratchVar(TealType.uint64)
+    pool_weight = ScratchVar(TealType.uint64)
     weight = ScratchVar(TealType.uint64)
     w = ScratchVar(TealType.uint64)
     share = ScratchVar(TealType.uint64)
     remainder = ScratchVar(TealType.uint64)
     distributed_amount = ScratchVar(TealType.uint64)
+    owed = ScratchVar(TealType.uint64)
+    increment = ScratchVar(TealType.bytes)
 
+    # Create: args = [] for push payouts or ["claim"] for claim mode
     on_create = Seq([
         App.globalPut(OWNER_KEY, Txn.sender()),
         App.globalPut(OPT_IN_COUNT_KEY, Int(0)),
+        App.globalPut(TOTAL_WEIGHT_KEY, Int(0)),
+        App.globalPut(PAYOUT_MODE_KEY, PUSH_MODE),
+        # Nested rather than And(): TEAL evaluates both operands of &&
+        If(Txn.application_args.length() > Int(0)).Then(
+            If(Txn.application_args[0] == Bytes("claim")).Then(App.globalPut(PAYOUT_MODE_KEY, CLAIM_MODE)),
+        ),
+        App.globalPut(REWARD_PER_WEIGHT_KEY, Itob(Int(0))),
+        App.globalPut(RESERVED_KEY, Int(0)),
         Approve(),
     ])
 
-    # Opt-in: set initial weight to 1
+    # Opt-in: set initial weight to 1; earlier payouts are not owed to newcomers
     on_opt_in = Seq([
         App.localPut(Txn.sender(), WEIGHT_KEY, Int(1)),
+        App.localPut(Txn.sender(), CHECKPOINT_KEY, App.globalGet(REWARD_PER_WEIGHT_KEY)),
         App.globalPut(OPT_IN_COUNT_KEY, App.globalGet(OPT_IN_COUNT_KEY) + Int(1)),
+        App.globalPut(TOTAL_WEIGHT_KEY, App.globalGet(TOTAL_WEIGHT_KEY) + Int(1)),
         Approve(),
     ])
 
-    # CloseOut & ClearState: just approve for now
-    on_closeout = Approve()
+    # CloseOut: pay out anything still owed, then drop the account from the
+    # pool totals. ClearState runs clear_state_program instead, so on_clear
+    # only guards the Cond branch.
+    on_closeout = Seq([
+        owed.store(owed_after_settle(Txn.sender())),
+        If(owed.load() > Int(0)).Then(Seq(
+            release_reserve(owed.load()),
+            send_payment(Txn.sender(), owed.load()),
+        )),
+        leave_pool(Txn.sender()),
+        Approve(),
+    ])
     on_clear = Approve()
 
     # Allow user to set their own weight: args = ["set_weight", <weight>]
@@ -72,59 +152,90 @@ def approval_program():
             weight.store(Btoi(Txn.application_args[1])),
             Assert(weight.load() >= MIN_WEIGHT),
             Assert(weight.load() <= MAX_WEIGHT),
+            # Rewards accrued at the old weight stay owed at the old weight
+            settle(Txn.sender()),
+            App.globalPut(
+                TOTAL_WEIGHT_KEY,
+                App.globalGet(TOTAL_WEIGHT_KEY) - App.localGet(Txn.sender(), WEIGHT_KEY) + weight.load(),
+            ),
             App.localPut(Txn.sender(), WEIGHT_KEY, weight.load()),
             Approve(),
         ]
     )
 
-    # Distribute funds proportionally by local weight
-    # Expects group of 2 txns: Gtxn[0] payment to app address, Gtxn[1] this app call
-    distribute = Seq(
-        Assert(Global.group_size() == Int(2)),
-        Assert(Gtxn[0].type_enum() == TxnType.Payment),
-        Assert(Gtxn[1].type_enum() == TxnType.ApplicationCall),
-        Assert(Gtxn[0].receiver() == Global.current_application_address()),
-        # number of recipients passed in Txn.accounts (exclude sender at index 0)
-        n.store(Txn.accounts.length() - Int(1)),
+    # Push mode: distribute funds proportionally to each recipient's share of the whole pool.
+    # args = ["distribute"] or ["distribute", <pool amount>]
+    # Each listed account receives pool_amount * weight / total_weight, where
+    # pool_amount is the optional argument (default: the payment amount). Large
+    # payouts are split across many groups that share one pool_amount, and each
+    # group's payment only has to cover its own recipients' shares.
+    push_distribute = Seq(
+        # number of recipients passed in Txn.accounts (indexes 1..n; index 0 is the caller)
+        n.store(Txn.accounts.length()),
         Assert(n.load() > Int(0)),
-        total_amount.store(Gtxn[0].amount()),
-        # compute total weight
-        total_weight.store(Int(0)),
-        # Ensure every recipient has opted in before computing totals
-        i.store(Int(1)),
-        For(i.store(Int(1)), i.load() <= n.load(), i.store(i.load() + Int(1))).Do(
-            Assert(App.localGet(Txn.accounts[i.load()], WEIGHT_KEY) >= MIN_WEIGHT)
-        ),
-        i.store(Int(1)),
+        If(Txn.application_args.length() > Int(1))
+        .Then(pool_amount.store(Btoi(Txn.application_args[1])))
+        .Else(pool_amount.store(Gtxn[0].amount())),
+        pool_weight.store(App.globalGet(TOTAL_WEIGHT_KEY)),
+        Assert(pool_weight.load() > Int(0)),
+        distributed_amount.store(Int(0)),
+        # Single pass: validate opt-in, compute the share and pay it
         For(i.store(Int(1)), i.load() <= n.load(), i.store(i.load() + Int(1))).Do(
             Seq(
                 w.store(App.localGet(Txn.accounts[i.load()], WEIGHT_KEY)),
                 # If account not opted-in, weight will be 0 -> reject
                 Assert(w.load() >= MIN_WEIGHT),
-                total_weight.store(total_weight.load() + w.load()),
-            )
-        ),
-        Assert(total_weight.load() > Int(0)),
-        distributed_amount.store(Int(0)),
-        # For each recipient, send share = total_amount * weight / total_weight
-        i.store(Int(1)),
-        For(i.store(Int(1)), i.load() <= n.load(), i.store(i.load() + Int(1))).Do(
-            Seq(
-                w.store(App.localGet(Txn.accounts[i.load()], WEIGHT_KEY)),
-                share.store(share_for_weight(total_amount.load(), w.load(), total_weight.load())),
+                share.store(share_for_weight(pool_amount.load(), w.load(), pool_weight.load())),
                 distributed_amount.store(distributed_amount.load() + share.load()),
                 send_payment(Txn.accounts[i.load()], share.load()),
             )
         ),
-        remainder.store(total_amount.load() - distributed_amount.load()),
-        Assert(remainder.load() >= Int(0)),
-        # Send any tiny leftover (due to division rounding) back to the owner
+        # The group's payment must cover every share paid out of it
+        Assert(distributed_amount.load() <= Gtxn[0].amount()),
+        remainder.store(Gtxn[0].amount() - distributed_amount.load()),
+        # Refund anything the shares did not use to whoever paid it in; the
+        # payer is normally the caller, so it is always an available account
         If(remainder.load() > Int(0)).Then(
-            send_payment(App.globalGet(OWNER_KEY), remainder.load()),
+            send_payment(Gtxn[0].sender(), remainder.load()),
         ),
         Approve(),
     )
 
+    # Claim mode: the payment only moves the accumulator, so funding costs the
+    # same however many accounts are opted in. Txn.accounts is not used.
+    claim_distribute = Seq(
+        pool_weight.store(App.globalGet(TOTAL_WEIGHT_KEY)),
+        Assert(pool_weight.load() > Int(0)),
+        increment.store(reward_increment(Gtxn[0].amount(), pool_weight.load())),
+        # A payment too small to move the accumulator would be reserved for nobody
+        Assert(BytesGt(increment.load(), Itob(Int(0)))),
+        App.globalPut(REWARD_PER_WEIGHT_KEY, accrue_reward(App.globalGet(REWARD_PER_WEIGHT_KEY), increment.load())),
+        # Only what holders can claim is reserved; the rounding leftover stays with the owner
+        App.globalPut(RESERVED_KEY, App.globalGet(RESERVED_KEY) + funded_reward(increment.load(), pool_weight.load())),
+        Approve(),
+    )
+
+    # Expects group of 2 txns: Gtxn[0] payment to app address, Gtxn[1] this app call.
+    distribute = Seq(
+        Assert(Global.group_size() == Int(2)),
+        Assert(Gtxn[0].type_enum() == TxnType.Payment),
+        Assert(Gtxn[1].type_enum() == TxnType.ApplicationCall),
+        Assert(Gtxn[0].receiver() == Global.current_application_address()),
+        If(App.globalGet(PAYOUT_MODE_KEY) == CLAIM_MODE, claim_distribute, push_distribute),
+    )
+
+    # Claim: args = ["claim"]; pays the sender everything accrued since its
+    # last settlement. The caller covers the inner payment via fee pooling.
+    claim = Seq(
+        owed.store(owed_after_settle(Txn.sender())),
+        Assert(owed.load() > Int(0)),
+        App.localPut(Txn.sender(), OWED_KEY, Int(0)),
+        App.localPut(Txn.sender(), CHECKPOINT_KEY, App.globalGet(REWARD_PER_WEIGHT_KEY)),
+        release_reserve(owed.load()),
+        send_payment(Txn.sender(), owed.load()),
+        Approve(),
+    )
+
     # Owner withdraw: args = ["withdraw", <amount>]
     withdraw_amount = ScratchVar(TealType.uint64)
     withdraw = Seq(
@@ -133,7 +244,9 @@ def approval_program():
             Assert(Txn.application_args.length() == Int(2)),
             withdraw_amount.store(Btoi(Txn.application_args[1])),
             Assert(withdraw_amount.load() > Int(0)),
-            Assert(withdraw_amount.load() <= Balance(Global.current_application_address())),
+            # Funds reserved for claims are not the owner's to take
+            Assert(withdraw_amount.load() + App.globalGet(RESERVED_KEY)
+                   <= Balance(Global.current_application_address())),
             InnerTxnBuilder.Begin(),
             InnerTxnBuilder.SetFields({
                 TxnField.type_enum: TxnType.Payment,
@@ -150,6 +263,7 @@ def approval_program():
             [Txn.application_args[0] == Bytes("set_weight"), set_weight],
             [Txn.application_args[0] == Bytes("distribute"), distribute],
             [Txn.application_args[0] == Bytes("withdraw"), withdraw],
+            [Txn.application_args[0] == Bytes("claim"), claim],
         )],
         [Int(1), Reject()],
     )
@@ -168,14 +282,20 @@ def approval_program():
 
 
 def clear_state_program():
-    """Clears user state (no cleanup logic yet)."""
-    return Approve()
+    """Drops the clearing account's weight from the pool totals.
+
+    Anything the account had not claimed is forfeited and released back to
+    the owner's withdrawable balance.
+    """
+    return Seq(
+        release_reserve(owed_after_settle(Txn.sender())),
+        leave_pool(Txn.sender()),
+        Approve(),
+    )
 
 
 if __name__ == "__main__":
-    from pyteal import compileTeal, Mode
-    with open("contracts/umis_engine_approval.teal", "w") as f:
-        f.write(compileTeal(approval_program(), mode=Mode.Application, version=6))
-    with open("contracts/umis_engine_clear.teal", "w") as f:
-        f.write(compileTeal(clear_state_program(), mode=Mode.Application, version=6))
+    from pathlib import Path
+    from contracts.build import build_contract, export_teal
+    export_teal(build_contract("umis_engine"), Path("contracts"))
     print("Compiled umis_engine to TEAL files in contracts/")
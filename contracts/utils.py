@@ -3,9 +3,43 @@ Module: utils.py
 Description: Implementation of utils.py for Lucid project.
 """
 
-from pyteal import Expr, WideRatio
+from pyteal import Btoi, BytesAdd, BytesDiv, BytesMinus, BytesMul, Expr, Int, Itob, WideRatio
+
+# Fixed-point scale of the reward-per-weight accumulator (microAlgos * 1e12 per weight unit).
+REWARD_SCALE = 1_000_000_000_000
 
 
 def share_for_weight(total_amount: Expr, weight: Expr, total_weight: Expr) -> Expr:
     """Return the proportional share for a weight using WideRatio for safety."""
     return WideRatio([total_amount, weight], [total_weight])
+
+
+def reward_increment(amount: Expr, total_weight: Expr) -> Expr:
+    """Return ``amount * REWARD_SCALE / total_weight`` (floored) as a byte-string accumulator increment."""
+    return BytesDiv(BytesMul(Itob(amount), Itob(Int(REWARD_SCALE))), Itob(total_weight))
+
+
+def accrue_reward(accumulator: Expr, increment: Expr) -> Expr:
+    """Add a ``reward_increment`` to a byte-string accumulator.
+
+    Byte math keeps the running total exact past 2**64, so the accumulator
+    never wraps no matter how many payouts it absorbs.
+    """
+    return BytesAdd(accumulator, increment)
+
+
+def funded_reward(increment: Expr, total_weight: Expr) -> Expr:
+    """Return the uint64 amount an increment makes claimable across ``total_weight``, rounded up.
+
+    This is the part of a payment the accumulator actually took in; the
+    floored remainder of ``reward_increment`` is not. Rounding up keeps the
+    reserve covering claims once the fractions carried in the accumulator
+    add up over several payments.
+    """
+    scaled = BytesMul(increment, Itob(total_weight))
+    return Btoi(BytesDiv(BytesAdd(scaled, Itob(Int(REWARD_SCALE - 1))), Itob(Int(REWARD_SCALE))))
+
+
+def pending_reward(accumulator: Expr, checkpoint: Expr, weight: Expr) -> Expr:
+    """Return what ``weight`` earned since ``checkpoint`` as a uint64 amount."""
+    return Btoi(BytesDiv(BytesMul(BytesMinus(accumulator, checkpoint), Itob(weight)), Itob(Int(REWARD_SCALE))))
@@ -8,6 +8,7 @@ import { connectMyAlgo } from './modules/wallet/myalgo.js';
 import { connectLute } from './modules/wallet/lute.js';
 import { connectWalletConnect } from './modules/wallet/walletconnect.js';
 import { getAlgodParams, sendSignedTxns } from './modules/api/client.js';
+import { subscribeEvents } from './modules/api/events.js';
 
 let connectedWallet = null;
 let connectedAccount = null;
@@ -33,9 +34,17 @@ function onWalletConnected(walletName, account, instance) {
     updateStats();
     updateStatusTag(null);
 
-    // Periodic updates
-    setInterval(updateStats, 12000);
-    setInterval(refreshTimeline, 18000);
+    // Push updates from the backend block follower; poll only if SSE is unavailable
+    subscribeEvents({
+        confirmed: () => {
+            updateStats();
+            refreshTimeline();
+        },
+        stats: () => updateStats(),
+    }, () => {
+        setInterval(updateStats, 12000);
+        setInterval(refreshTimeline, 18000);
+    });
 
     // Setup Wallet Buttons
     const connectPeraBtn = document.getElementById('connect-pera');
@@ -0,0 +1,29 @@
+/**
+ * Module: events.js
+ * Description: Frontend module for events.js.
+ */
+
+// Subscribes to the backend Server-Sent Events stream. `onUnavailable` runs once
+// if the browser lacks EventSource or the stream is closed for good, so callers
+// can fall back to polling.
+export function subscribeEvents(handlers, onUnavailable) {
+    if (typeof EventSource === 'undefined') {
+        if (onUnavailable) onUnavailable();
+        return null;
+    }
+
+    const source = new EventSource('/api/events');
+    Object.entries(handlers).forEach(([event, handler]) => {
+        source.addEventListener(event, (e) => handler(JSON.parse(e.data)));
+    });
+
+    let fellBack = false;
+    source.onerror = () => {
+        // EventSource retries on its own; CLOSED means it gave up.
+        if (source.readyState === EventSource.CLOSED && !fellBack) {
+            fellBack = true;
+            if (onUnavailable) onUnavailable();
+        }
+    };
+    return source;
+}
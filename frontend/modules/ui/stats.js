@@ -4,6 +4,7 @@
  */
 
 import { formatAlgo } from '../core/format.js';
+import { getConfig } from '../core/config.js';
 
 const poolValue = document.getElementById('pool-value');
 const participantCount = document.getElementById('participant-count');
@@ -29,8 +30,8 @@ export function renderStatCards() {
     });
 }
 
-export function updateStats() {
-    const stats = generateRuntimeStats();
+export async function updateStats() {
+    const stats = (await fetchBackendStats()) || generateRuntimeStats();
     const elDonations = document.getElementById('stat-donations');
     if (elDonations) elDonations.querySelector('.large').textContent = formatAlgo(stats.totalDonations);
 
@@ -48,6 +49,32 @@ export function updateStats() {
     if (nextPayout) nextPayout.textContent = stats.timeToNext;
 }
 
+// Reads the backend's materialized view; returns null so callers fall back to samples.
+async function fetchBackendStats() {
+    let appId = 0;
+    try {
+        appId = getConfig().app_id;
+    } catch (err) {
+        return null;
+    }
+    if (!appId) return null;
+    try {
+        const res = await fetch(`/api/stats/${appId}`);
+        if (!res.ok) return null;
+        const data = await res.json();
+        return {
+            // The push-mode remainder is refunded to the payer, so it is not a donation.
+            totalDonations: data.distributed_total,
+            recurringPayments: data.distribute_calls,
+            activeRecipients: data.opt_in_count,
+            avgWeight: data.weighted_accounts ? data.total_weight / data.weighted_accounts : 1,
+            timeToNext: `as of round ${data.round}`,
+        };
+    } catch (err) {
+        return null;
+    }
+}
+
 function generateRuntimeStats() {
     const activeRecipients = 120 + Math.floor(Math.random() * 40);
     const recurringPayments = 5 + Math.floor(Math.random() * 3);
@@ -0,0 +1,70 @@
+"""
+Module: bench_contracts.py
+Description: Opcode-cost benchmark for the UMIS engine, run on the offline TEAL evaluator.
+
+Usage: python -m scripts.bench_contracts [--holders 1000]
+"""
+
+import argparse
+from typing import List, Tuple
+
+from algosdk import account
+
+from contracts.build import build_contract
+from contracts.teal_evaluator import (
+    MAX_APP_ACCOUNTS, OPT_IN, GroupResult, Ledger, Transaction, app_address, app_call, payment,
+)
+
+
+def _setup(holders: int, claim_mode: bool) -> Tuple[Ledger, str, int, List[str]]:
+    ledger = Ledger()
+    owner = account.generate_account()[1]
+    ledger.fund(owner, 10 ** 12)
+    artifact = build_contract('umis_engine')
+    create = Transaction(
+        sender=owner, type='appl', app_args=[b'claim'] if claim_mode else [],
+        approval_program=artifact.approval_teal, clear_program=artifact.clear_teal,
+        global_schema=(4, 2), local_schema=(2, 1),
+    )
+    app_id = ledger.execute([create]).app_id
+    ledger.fund(app_address(app_id), 100_000)
+    users = []
+    for _ in range(holders):
+        user = account.generate_account()[1]
+        ledger.fund(user, 1_000_000)
+        ledger.execute([app_call(user, app_id, on_complete=OPT_IN)])
+        users.append(user)
+    return ledger, owner, app_id, users
+
+
+def _row(label: str, result: GroupResult) -> str:
+    top = max(result.branch_costs.items(), key=lambda item: item[1])
+    return (f'{label:<34} cost={result.cost:>5} budget={result.budget:>5} '
+            f'inner={result.inner_txn_count:>2} hottest={top[0]}:{top[1]}')
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--holders', type=int, default=1000, help='opted-in accounts for claim mode')
+    args = parser.parse_args()
+
+    ledger, owner, app_id, users = _setup(MAX_APP_ACCOUNTS, claim_mode=False)
+    print(_row('set_weight', ledger.execute([app_call(users[0], app_id, [b'set_weight', (7).to_bytes(8, 'big')])])))
+    costs = []
+    for count in range(1, MAX_APP_ACCOUNTS + 1):
+        result = ledger.execute([
+            payment(owner, app_address(app_id), 1_000_000),
+            app_call(owner, app_id, [b'distribute'], users[:count], fee=1000 * (2 + count)),
+        ])
+        costs.append(result.cost)
+        print(_row(f'push distribute, {count} recipient(s)', result))
+    print(f'push distribute marginal cost: {(costs[-1] - costs[0]) / (len(costs) - 1):.1f} opcodes per recipient')
+
+    ledger, owner, app_id, users = _setup(args.holders, claim_mode=True)
+    fund = [payment(owner, app_address(app_id), 1_000_000), app_call(owner, app_id, [b'distribute'])]
+    print(_row(f'claim distribute, {args.holders} holder(s)', ledger.execute(fund)))
+    print(_row('claim', ledger.execute([app_call(users[0], app_id, [b'claim'], fee=2000)])))
+
+
+if __name__ == '__main__':
+    main()
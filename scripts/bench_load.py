@@ -0,0 +1,310 @@
+"""
+Module: bench_load.py
+Description: Load test for the backend against the local fake algod, reporting throughput and latency percentiles.
+
+Starts scripts/fake_algod.py and backend/app.py under uvicorn on free ports,
+or uses --backend-url for a backend that is already running. Each scenario
+runs on its own at a fixed concurrency, after a warm-up. Payloads come from
+--seed, so repeated runs send the same requests. Results are written as
+JSON. With --compare, a baseline run is checked and the script exits
+non-zero when throughput drops, or p95/p99 latency rises, by more than
+--tolerance.
+
+Usage: python -m scripts.bench_load [--scenarios register,verify,broadcast,config] [--concurrency 16]
+                                    [--requests 2000] [--output run.json] [--compare baseline.json]
+"""
+
+import argparse
+import asyncio
+from base64 import b64decode, b64encode
+from contextlib import contextmanager
+import hashlib
+import json
+import os
+from pathlib import Path
+import platform
+import socket
+import subprocess
+import sys
+import time
+from typing import Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+from scripts.fake_algod import add_arguments as add_fake_algod_arguments
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+ZERO_ADDRESS = 'AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAY5HFKQ'
+BENCH_APP_ID = 1001
+SCENARIOS = ('register', 'verify', 'broadcast', 'broadcast_msgpack', 'broadcast_confirmed', 'config')
+DEFAULT_SCENARIOS = ('register', 'verify', 'broadcast', 'config')
+MSGPACK_HEADERS = {'Content-Type': 'application/msgpack', 'Accept': 'application/msgpack'}
+# Latency changes smaller than this are noise, whatever the relative change.
+MIN_LATENCY_DELTA_MS = 1.0
+
+# A bytes body is sent as application/msgpack; a dict as JSON.
+RequestFactory = Callable[[int], Tuple[str, str, Union[dict, bytes, None]]]
+
+
+def percentile(sorted_values: List[float], q: float) -> float:
+    """Nearest-rank percentile of an ascending list."""
+    if not sorted_values:
+        return 0.0
+    rank = max(1, -(-len(sorted_values) * q // 100))
+    return sorted_values[int(rank) - 1]
+
+
+def summarize(latencies: List[float], errors: int, elapsed: float) -> dict:
+    ordered = sorted(latencies)
+    count = len(ordered) + errors
+    return {
+        'requests': count,
+        'errors': errors,
+        'rps': round(count / elapsed, 1) if elapsed else 0.0,
+        'mean_ms': round(sum(ordered) / len(ordered) * 1000, 3) if ordered else 0.0,
+        'p50_ms': round(percentile(ordered, 50) * 1000, 3),
+        'p95_ms': round(percentile(ordered, 95) * 1000, 3),
+        'p99_ms': round(percentile(ordered, 99) * 1000, 3),
+        'max_ms': round(ordered[-1] * 1000, 3) if ordered else 0.0,
+    }
+
+
+def compare(baseline: dict, current: dict, tolerance: float) -> List[str]:
+    """Regressions of ``current`` against ``baseline``, one message per metric."""
+    regressions = []
+    for name, result in current['scenarios'].items():
+        before = baseline.get('scenarios', {}).get(name)
+        if before is None:
+            continue
+        if before['rps'] and result['rps'] < before['rps'] * (1 - tolerance):
+            regressions.append(f'{name}: rps {result["rps"]} < {before["rps"]} (-{tolerance:.0%})')
+        for key in ('p95_ms', 'p99_ms'):
+            if (result[key] > before[key] * (1 + tolerance)
+                    and result[key] - before[key] > MIN_LATENCY_DELTA_MS):
+                regressions.append(f'{name}: {key} {result[key]} > {before[key]} (+{tolerance:.0%})')
+        if result['errors'] > before['errors'] and result['errors'] > result['requests'] * 0.001:
+            regressions.append(f'{name}: errors {result["errors"]} > {before["errors"]}')
+    return regressions
+
+
+def signed_payments(count: int, seed: int, params: dict) -> List[str]:
+    """``count`` distinct signed zero-amount payments from a seed-derived account, base64 encoded."""
+    from algosdk import encoding, transaction
+    from algosdk.atomic_transaction_composer import AccountTransactionSigner
+    from nacl.signing import SigningKey
+
+    key = SigningKey(hashlib.sha256(b'lucid-bench-%d' % seed).digest())
+    signer = AccountTransactionSigner(b64encode(bytes(key) + bytes(key.verify_key)).decode())
+    sender = encoding.encode_address(bytes(key.verify_key))
+    suggested = transaction.SuggestedParams(
+        params['fee'], params['last-round'], params['last-round'] + 1000, params['genesis-hash'],
+        params['genesis-id'], False, params['consensus-version'], params['min-fee'],
+    )
+    blobs = []
+    for n in range(count):
+        txn = transaction.PaymentTxn(sender, suggested, sender, 0, note=b'bench-%d-%d' % (seed, n))
+        blobs.append(encoding.msgpack_encode(signer.sign_transactions([txn], [0])[0]))
+    return blobs
+
+
+def scenario_factories(seed: int, signed: Optional[List[str]] = None) -> Dict[str, RequestFactory]:
+    """Map scenario names to ``n -> (method, path, body)`` request builders."""
+    def media_hash(n: int) -> str:
+        return b64encode(hashlib.sha256(b'bench-media-%d-%d' % (seed, n)).digest()).decode()
+
+    metadata = b64encode(b'{"bench":true}').decode()
+    cid = b64encode(b'QmT78zSuBmuS4z925WZfrqQ1qHaJ56DQaTfyMUF7F8ff5o').decode()
+    factories: Dict[str, RequestFactory] = {
+        'register': lambda n: ('POST', '/api/unsigned/media/register', {
+            'app_id': BENCH_APP_ID, 'sender': ZERO_ADDRESS, 'media_hash': media_hash(n), 'metadata': metadata}),
+        'verify': lambda n: ('POST', '/api/unsigned/media/verify', {
+            'app_id': BENCH_APP_ID, 'sender': ZERO_ADDRESS, 'content_hash': media_hash(n), 'ipfs_cid': cid}),
+        'config': lambda n: ('GET', '/api/config', None),
+    }
+    if signed is not None:
+        import msgpack
+
+        factories['broadcast'] = lambda n: ('POST', '/api/broadcast', {'signed': [signed[n]], 'wait': 'submitted'})
+        factories['broadcast_msgpack'] = lambda n: ('POST', '/api/broadcast', msgpack.packb(
+            {'signed': [b64decode(signed[n])], 'wait': 'submitted'}))
+        factories['broadcast_confirmed'] = lambda n: ('POST', '/api/broadcast',
+                                                      {'signed': [signed[n]], 'wait': 'confirmed'})
+    return factories
+
+
+async def run_scenario(client, factory: RequestFactory, requests: int, concurrency: int,
+                       offset: int = 0) -> dict:
+    """Issue ``requests`` requests from ``concurrency`` workers and summarize them."""
+    latencies: List[float] = []
+    errors = 0
+    counter = iter(range(offset, offset + requests))
+
+    async def worker():
+        nonlocal errors
+        for n in counter:
+            method, path, body = factory(n)
+            start = time.perf_counter()
+            try:
+                if isinstance(body, bytes):
+                    response = await client.request(method, path, content=body, headers=MSGPACK_HEADERS)
+                else:
+                    response = await client.request(method, path, json=body)
+                ok = response.status_code < 400
+            except Exception:
+                ok = False
+            if ok:
+                latencies.append(time.perf_counter() - start)
+            else:
+                errors += 1
+
+    started = time.perf_counter()
+    await asyncio.gather(*(worker() for _ in range(concurrency)))
+    return summarize(latencies, errors, time.perf_counter() - started)
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(('127.0.0.1', 0))
+        return sock.getsockname()[1]
+
+
+def wait_ready(url: str, timeout: float = 30.0) -> None:
+    import httpx
+
+    deadline = time.monotonic() + timeout
+    while True:
+        try:
+            if httpx.get(url, timeout=1.0).status_code < 500:
+                return
+        except httpx.HTTPError:
+            pass
+        if time.monotonic() > deadline:
+            raise RuntimeError(f'{url} did not come up within {timeout:.0f}s')
+        time.sleep(0.1)
+
+
+@contextmanager
+def servers(args: argparse.Namespace) -> Iterator[Tuple[str, str]]:
+    """Start the fake algod and the backend; yields their base URLs."""
+    algod_port, backend_port = free_port(), free_port()
+    algod_url = f'http://127.0.0.1:{algod_port}'
+    fake_args = ['--port', str(algod_port), '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+                 '--fail-rate', str(args.fail_rate), '--round-time', str(args.round_time), '--seed', str(args.seed)]
+    for value in args.endpoint_latency:
+        fake_args += ['--endpoint-latency', value]
+    for value in args.endpoint_fail_rate:
+        fake_args += ['--endpoint-fail-rate', value]
+    # A missing dotenv path keeps a developer's backend/.env out of the measurement. Every scenario sends
+    # from one address, so the admission token buckets are off; lanes and singleflight still apply.
+    env = {**os.environ, 'ALGOD_ADDRESS': algod_url, 'DOTENV_PATH': str(REPO_ROOT / '.build' / 'bench.env'),
+           'APP_ID': str(BENCH_APP_ID), 'ADMISSION_RATE': '0', 'ADMISSION_SENDER_RATE': '0'}
+    processes = [subprocess.Popen([sys.executable, '-m', 'scripts.fake_algod', *fake_args], cwd=REPO_ROOT)]
+    try:
+        wait_ready(f'{algod_url}/v2/status')
+        processes.append(subprocess.Popen(
+            [sys.executable, '-m', 'uvicorn', 'backend.app:app', '--port', str(backend_port),
+             '--log-level', 'warning', '--no-access-log'], cwd=REPO_ROOT, env=env))
+        backend_url = f'http://127.0.0.1:{backend_port}'
+        wait_ready(f'{backend_url}/api/config')
+        yield backend_url, algod_url
+    finally:
+        for process in reversed(processes):
+            process.terminate()
+        for process in processes:
+            try:
+                process.wait(timeout=10)
+            except subprocess.TimeoutExpired:
+                process.kill()
+
+
+def git_revision() -> Optional[str]:
+    try:
+        return subprocess.run(['git', 'rev-parse', '--short', 'HEAD'], cwd=REPO_ROOT, capture_output=True,
+                              text=True, check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+async def run_all(args: argparse.Namespace, backend_url: str, algod_url: Optional[str]) -> dict:
+    import httpx
+
+    scenarios = [name.strip() for name in args.scenarios.split(',') if name.strip()]
+    signed = None
+    if any(name.startswith('broadcast') for name in scenarios):
+        async with httpx.AsyncClient(base_url=algod_url or backend_url) as algod:
+            params = (await algod.get('/v2/transactions/params')).json()
+        # Every request needs its own transaction, or the backend would deduplicate it.
+        signed = signed_payments((args.warmup + args.requests) * len(scenarios), args.seed, params)
+    factories = scenario_factories(args.seed, signed)
+
+    limits = httpx.Limits(max_connections=args.concurrency, max_keepalive_connections=args.concurrency)
+    results = {}
+    async with httpx.AsyncClient(base_url=backend_url, limits=limits, timeout=args.timeout) as client:
+        offset = 0
+        for name in scenarios:
+            if args.warmup:
+                await run_scenario(client, factories[name], args.warmup, args.concurrency, offset)
+                offset += args.warmup
+            results[name] = await run_scenario(client, factories[name], args.requests, args.concurrency, offset)
+            offset += args.requests
+            print(f'{name:<20} {results[name]["rps"]:>9.1f} req/s  p50={results[name]["p50_ms"]:.2f}ms '
+                  f'p95={results[name]["p95_ms"]:.2f}ms p99={results[name]["p99_ms"]:.2f}ms '
+                  f'errors={results[name]["errors"]}')
+    return {
+        'meta': {
+            'revision': git_revision(),
+            'timestamp': time.strftime('%Y-%m-%dT%H:%M:%SZ', time.gmtime()),
+            'python': platform.python_version(),
+            'machine': platform.machine(),
+            'cpus': os.cpu_count(),
+            'concurrency': args.concurrency,
+            'requests': args.requests,
+            'warmup': args.warmup,
+            'seed': args.seed,
+            'fake_algod': None if args.backend_url else {
+                'latency_ms': args.latency_ms, 'jitter_ms': args.jitter_ms, 'fail_rate': args.fail_rate,
+                'endpoint_latency': args.endpoint_latency, 'endpoint_fail_rate': args.endpoint_fail_rate,
+                'round_time': args.round_time,
+            },
+        },
+        'scenarios': results,
+    }
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--scenarios', default=','.join(DEFAULT_SCENARIOS),
+                        help=f'comma-separated subset of {", ".join(SCENARIOS)}')
+    parser.add_argument('--concurrency', type=int, default=16)
+    parser.add_argument('--requests', type=int, default=2000, help='measured requests per scenario')
+    parser.add_argument('--warmup', type=int, default=100, help='unmeasured requests per scenario')
+    parser.add_argument('--timeout', type=float, default=30.0)
+    parser.add_argument('--backend-url', help='benchmark a running backend instead of starting one')
+    parser.add_argument('--output', type=Path, help='write the JSON report here (default: stdout)')
+    parser.add_argument('--compare', type=Path, help='baseline JSON report to check for regressions')
+    parser.add_argument('--tolerance', type=float, default=0.10, help='allowed relative regression')
+    add_fake_algod_arguments(parser)
+    args = parser.parse_args()
+    unknown = set(args.scenarios.split(',')) - set(SCENARIOS)
+    if unknown:
+        parser.error(f'unknown scenarios: {", ".join(sorted(unknown))}')
+
+    if args.backend_url:
+        report = asyncio.run(run_all(args, args.backend_url, None))
+    else:
+        with servers(args) as (backend_url, algod_url):
+            report = asyncio.run(run_all(args, backend_url, algod_url))
+
+    text = json.dumps(report, indent=2)
+    if args.output:
+        args.output.parent.mkdir(parents=True, exist_ok=True)
+        args.output.write_text(text + '\n')
+    else:
+        print(text)
+    if args.compare:
+        regressions = compare(json.loads(args.compare.read_text()), report, args.tolerance)
+        if regressions:
+            sys.exit('regression: ' + '; '.join(regressions))
+        print(f'no regressions against {args.compare} (tolerance {args.tolerance:.0%})')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,88 @@
+"""
+Module: bench_startup.py
+Description: Cold-start benchmark for the backend: import time, startup time and the first response.
+
+Each run uses a fresh interpreter, as a newly scaled worker would. With
+--max-import-ms / --max-startup-ms the script exits non-zero on a regression.
+
+Usage: python -m scripts.bench_startup [--runs 5] [--max-import-ms 800] [--max-startup-ms 1500]
+"""
+
+import argparse
+import json
+import os
+import statistics
+import subprocess
+import sys
+from pathlib import Path
+from typing import Dict, List
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+# Modules the app must not import until a request (or startup hook) needs them.
+DEFERRED_MODULES = ('algosdk', 'httpx', 'msgpack', 'dotenv')
+
+_PROBE = r'''
+import asyncio, json, sys, time
+start = time.perf_counter()
+import backend.app
+imported = time.perf_counter()
+loaded = sorted({name.split('.')[0] for name in sys.modules} & set(sys.argv[1].split(',')))
+
+async def first_response():
+    app = backend.app.create_app({'ALGOD_ADDRESS': 'http://localhost:4001'})
+    messages = []
+
+    async def receive():
+        return {'type': 'http.request', 'body': b'', 'more_body': False}
+
+    async def send(message):
+        messages.append(message)
+
+    scope = {'type': 'http', 'method': 'GET', 'path': '/api/config', 'raw_path': b'/api/config',
+             'query_string': b'', 'headers': [], 'scheme': 'http', 'http_version': '1.1',
+             'server': ('bench', 80), 'client': ('bench', 1), 'root_path': '', 'app': app}
+    async with app.router.lifespan_context(app):
+        started = time.perf_counter()
+        await app(scope, receive, send)
+        return started, messages[0]['status']
+
+started, status = asyncio.run(first_response())
+done = time.perf_counter()
+print(json.dumps({'import_ms': (imported - start) * 1000, 'startup_ms': (started - start) * 1000,
+                  'first_response_ms': (done - start) * 1000, 'status': status, 'loaded': loaded}))
+'''
+
+
+def probe() -> Dict:
+    """Run one cold start in a fresh interpreter, without ALGOD_ADDRESS in its environment."""
+    env = {key: value for key, value in os.environ.items() if key != 'ALGOD_ADDRESS'}
+    result = subprocess.run([sys.executable, '-c', _PROBE, ','.join(DEFERRED_MODULES)], cwd=REPO_ROOT,
+                            env=env, capture_output=True, text=True, check=True)
+    return json.loads(result.stdout.strip().splitlines()[-1])
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--runs', type=int, default=5)
+    parser.add_argument('--max-import-ms', type=float, default=None)
+    parser.add_argument('--max-startup-ms', type=float, default=None)
+    args = parser.parse_args()
+
+    runs: List[Dict] = [probe() for _ in range(args.runs)]
+    failures = []
+    for key, limit in (('import_ms', args.max_import_ms), ('startup_ms', args.max_startup_ms),
+                       ('first_response_ms', None)):
+        median = statistics.median(run[key] for run in runs)
+        print(f'{key:<18} median={median:7.1f} min={min(run[key] for run in runs):7.1f}')
+        if limit is not None and median > limit:
+            failures.append(f'{key} {median:.1f} > {limit:.1f}')
+    loaded = sorted({name for run in runs for name in run['loaded']})
+    print(f'deferred modules loaded at import: {", ".join(loaded) or "none"}')
+    if loaded:
+        failures.append(f'eagerly imported: {", ".join(loaded)}')
+    if failures:
+        sys.exit('regression: ' + '; '.join(failures))
+
+
+if __name__ == '__main__':
+    main()
@@ -3,14 +3,13 @@ Module: compile.py
 Description: Implementation of compile.py for Lucid project.
 """
 
-from pyteal import compileTeal, Mode
-from contracts.donation_pool import approval_program, clear_state_program
+from pathlib import Path
 
-if __name__ == "__main__":
-    with open("contracts/donation_pool_approval.teal", "w") as f:
-        f.write(compileTeal(approval_program(), mode=Mode.Application, version=6))
-
-    with open("contracts/donation_pool_clear.teal", "w") as f:
-        f.write(compileTeal(clear_state_program(), mode=Mode.Application, version=6))
+from contracts.build import build_contracts, export_teal
 
-    print("Compiled donation_pool to TEAL files in contracts/")
\ No newline at end of file
+if __name__ == "__main__":
+    # Unchanged contracts come straight from the build cache (see contracts/build.py).
+    for artifact in build_contracts().values():
+        export_teal(artifact, Path("contracts"))
+        state = "cached" if artifact.cached else "compiled"
+        print(f"{artifact.name}: {state}, TEAL written to contracts/{artifact.name}_{{approval,clear}}.teal")
@@ -3,7 +3,6 @@ Module: deploy.py
 Description: Implementation of deploy.py for Lucid project.
 """
 
-import base64
 import json
 import os
 import time
@@ -15,6 +14,9 @@ from algosdk.transaction import ApplicationCreateTxn, OnComplete, StateSchema
 from algosdk.v2client.algod import AlgodClient
 from dotenv import load_dotenv
 
+from backend.algod_pool import best_algod_client
+from contracts.build import Artifact, algod_assembler, build_contract
+
 
 @dataclass
 class ContractSpec:
@@ -37,24 +39,8 @@ def load_environment(dotenv_path: Path) -> None:
 
 
 def get_algod_client() -> AlgodClient:
-    address = os.environ.get("ALGOD_ADDRESS")
-    token = os.environ.get("ALGOD_TOKEN", "")
-    if not address:
-        raise RuntimeError("ALGOD_ADDRESS must be set in the environment")
-    headers = {}
-    header_kv = os.environ.get("ALGOD_HEADER_KV", "")
-    if header_kv:
-        for pair in header_kv.split(";"):
-            if not pair.strip():
-                continue
-            if "=" in pair:
-                key, value = pair.split("=", 1)
-            elif ":" in pair:
-                key, value = pair.split(":", 1)
-            else:
-                continue
-            headers[key.strip()] = value.strip()
-    return AlgodClient(token, address, headers=headers or None)
+    """Client for the most current of the configured algod endpoints (see ``ALGOD_ENDPOINTS``)."""
+    return best_algod_client(os.environ)
 
 
 def build_app_schema(contract: ContractSpec) -> tuple[StateSchema, StateSchema]:
@@ -63,25 +49,31 @@ def build_app_schema(contract: ContractSpec) -> tuple[StateSchema, StateSchema]:
     return global_schema, local_schema
 
 
-def compile_teal(client: AlgodClient, path: Path) -> bytes:
-    text = path.read_text()
-    response = client.compile(text)
-    return base64.b64decode(response["result"])
+def compile_teal(client: AlgodClient, spec: ContractSpec) -> Artifact:
+    # Build cache: PyTeal only runs when the contract changed. Bytecode comes from the
+    # node (cached by TEAL hash); TEAL_ASSEMBLER=offline opts into the offline assembler.
+    if os.environ.get("TEAL_ASSEMBLER") == "offline":
+        return build_contract(spec.name)
+    return build_contract(spec.name, assembler=algod_assembler(client))
 
 
 def wait_for_confirmation(client: AlgodClient, txid: str, timeout: int = 10) -> dict:
+    # Block on the next round instead of sleeping so each check lines up with a new block.
     start = time.time()
+    last_round = client.status().get("last-round", 0)
     while time.time() - start <= timeout:
         result = client.pending_transaction_info(txid)
         if result.get("confirmed-round", 0) > 0:
             return result
-        time.sleep(1)
+        if result.get("pool-error"):
+            raise RuntimeError(f"Transaction rejected: {result['pool-error']}")
+        last_round = client.status_after_block(last_round).get("last-round", last_round + 1)
     raise TimeoutError("Transaction not confirmed within timeout")
 
 
 def deploy_contract(client: AlgodClient, deployer_sk: str, deployer_address: str, spec: ContractSpec) -> int:
-    approval = compile_teal(client, Path(f"contracts/{spec.name}_approval.teal"))
-    clear = compile_teal(client, Path(f"contracts/{spec.name}_clear.teal"))
+    artifact = compile_teal(client, spec)
+    approval, clear = artifact.approval_bytes, artifact.clear_bytes
     global_schema, local_schema = build_app_schema(spec)
     params = client.suggested_params()
     txn = ApplicationCreateTxn(
@@ -95,8 +87,7 @@ def deploy_contract(client: AlgodClient, deployer_sk: str, deployer_address: str
     )
     signed = txn.sign(deployer_sk)
     txid = client.send_transaction(signed)
-    wait_for_confirmation(client, txid)
-    info = client.pending_transaction_info(txid)
+    info = wait_for_confirmation(client, txid)
     app_id = info.get("application-index")
     print(f"Deployed {spec.name} -> App ID {app_id}")
     return app_id
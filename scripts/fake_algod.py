@@ -0,0 +1,242 @@
+"""
+Module: fake_algod.py
+Description: Local algod stand-in for load tests, with configurable latency and failure injection.
+
+Serves the algod v2 routes the backend uses: params, compile (through the
+offline assembler), raw transaction submission, pending info, status and
+wait-for-block, blocks and block txids. Rounds advance on a fixed timer.
+A submitted transaction confirms in the next round. Latency and failures
+come from a seeded RNG, so runs with the same settings are comparable.
+
+Usage: python -m scripts.fake_algod [--port 4001] [--latency-ms 2] [--jitter-ms 1] [--fail-rate 0]
+                                    [--endpoint-latency params=20] [--round-time 1.0] [--seed 1]
+"""
+
+import argparse
+import asyncio
+from base64 import b64encode
+from dataclasses import dataclass, field
+import hashlib
+import random
+import time
+from typing import Dict, List, Optional
+
+import msgpack
+from starlette.applications import Starlette
+from starlette.requests import Request
+from starlette.responses import JSONResponse, Response
+from starlette.routing import Route
+
+GENESIS_ID = 'lucid-bench-v1'
+GENESIS_HASH = b64encode(hashlib.sha256(GENESIS_ID.encode()).digest()).decode()
+CONSENSUS_VERSION = 'future'
+# Endpoint names accepted by --endpoint-latency / --endpoint-fail-rate.
+ENDPOINTS = ('status', 'wait', 'params', 'compile', 'send', 'pending', 'block', 'txids', 'application')
+
+
+@dataclass
+class FakeAlgodConfig:
+    latency_ms: float = 2.0
+    jitter_ms: float = 1.0
+    fail_rate: float = 0.0
+    round_time: float = 1.0
+    start_round: int = 1000
+    seed: int = 1
+    endpoint_latency_ms: Dict[str, float] = field(default_factory=dict)
+    endpoint_fail_rate: Dict[str, float] = field(default_factory=dict)
+
+
+class FakeAlgod:
+    """Chain state and fault injection behind the fake routes."""
+
+    def __init__(self, config: FakeAlgodConfig, clock=time.monotonic):
+        self.config = config
+        self._clock = clock
+        self._started = clock()
+        self._random = random.Random(config.seed)
+        self.submitted: Dict[str, int] = {}
+        self.confirmed: Dict[int, List[str]] = {}
+        self.calls: Dict[str, int] = {name: 0 for name in ENDPOINTS}
+        self.failures: Dict[str, int] = {name: 0 for name in ENDPOINTS}
+
+    @property
+    def round(self) -> int:
+        return self.config.start_round + int((self._clock() - self._started) / self.config.round_time)
+
+    def confirmed_round(self, txid: str) -> int:
+        submitted = self.submitted.get(txid)
+        if submitted is None or self.round <= submitted:
+            return 0
+        return submitted + 1
+
+    async def inject(self, endpoint: str) -> Optional[Response]:
+        """Sleep for the configured latency; return an error response when a failure is drawn."""
+        self.calls[endpoint] += 1
+        latency = self.config.endpoint_latency_ms.get(endpoint, self.config.latency_ms)
+        latency += self._random.uniform(-self.config.jitter_ms, self.config.jitter_ms)
+        if latency > 0:
+            await asyncio.sleep(latency / 1000)
+        fail_rate = self.config.endpoint_fail_rate.get(endpoint, self.config.fail_rate)
+        if fail_rate and self._random.random() < fail_rate:
+            self.failures[endpoint] += 1
+            return JSONResponse({'message': f'injected {endpoint} failure'}, status_code=503)
+        return None
+
+    def status(self) -> dict:
+        current = self.round
+        return {'last-round': current, 'time-since-last-round': 0, 'catchup-time': 0,
+                'last-version': CONSENSUS_VERSION}
+
+    def submit(self, blobs: bytes) -> str:
+        from backend.broadcast import preflight
+
+        # Rejects what algod would reject up front (bad encoding, mismatched group).
+        txids = preflight([blobs])
+        current = self.round
+        for txid in txids:
+            self.submitted[txid] = current
+            self.confirmed.setdefault(current + 1, []).append(txid)
+        return txids[0]
+
+
+def create_app(config: Optional[FakeAlgodConfig] = None, clock=time.monotonic) -> Starlette:
+    algod = FakeAlgod(config or FakeAlgodConfig(), clock)
+
+    def endpoint(name):
+        def decorate(handler):
+            async def wrapped(request: Request):
+                failure = await algod.inject(name)
+                if failure is not None:
+                    return failure
+                return await handler(request)
+            return wrapped
+        return decorate
+
+    @endpoint('status')
+    async def status(request: Request):
+        return JSONResponse(algod.status())
+
+    @endpoint('wait')
+    async def wait_for_block(request: Request):
+        target = int(request.path_params['round']) + 1
+        deadline = time.monotonic() + 5 * algod.config.round_time
+        while algod.round < target and time.monotonic() < deadline:
+            await asyncio.sleep(min(0.05, algod.config.round_time / 4))
+        return JSONResponse(algod.status())
+
+    @endpoint('params')
+    async def params(request: Request):
+        return JSONResponse({'fee': 0, 'min-fee': 1000, 'last-round': algod.round, 'genesis-id': GENESIS_ID,
+                             'genesis-hash': GENESIS_HASH, 'consensus-version': CONSENSUS_VERSION})
+
+    @endpoint('compile')
+    async def compile_teal(request: Request):
+        from contracts.assembler import AssemblyError, assemble
+
+        try:
+            result = assemble((await request.body()).decode())
+        except AssemblyError as exc:
+            return JSONResponse({'message': str(exc)}, status_code=400)
+        return JSONResponse(result.compile_response())
+
+    @endpoint('send')
+    async def send(request: Request):
+        try:
+            txid = algod.submit(await request.body())
+        except Exception as exc:
+            return JSONResponse({'message': f'cannot decode transactions: {exc}'}, status_code=400)
+        return JSONResponse({'txId': txid})
+
+    @endpoint('pending')
+    async def pending(request: Request):
+        txid = request.path_params['txid']
+        if txid not in algod.submitted:
+            return JSONResponse({'message': 'txn does not exist'}, status_code=404)
+        return JSONResponse({'confirmed-round': algod.confirmed_round(txid), 'pool-error': ''})
+
+    @endpoint('block')
+    async def block(request: Request):
+        round_number = int(request.path_params['round'])
+        if round_number > algod.round:
+            return JSONResponse({'message': 'ledger does not have entry'}, status_code=404)
+        body = {'block': {'rnd': round_number, 'gen': GENESIS_ID, 'txns': []}}
+        return Response(msgpack.packb(body, use_bin_type=True), media_type='application/msgpack')
+
+    @endpoint('txids')
+    async def block_txids(request: Request):
+        round_number = int(request.path_params['round'])
+        if round_number > algod.round:
+            return JSONResponse({'message': 'ledger does not have entry'}, status_code=404)
+        return JSONResponse({'blockTxids': algod.confirmed.get(round_number, [])})
+
+    @endpoint('application')
+    async def application(request: Request):
+        app_id = int(request.path_params['app_id'])
+        return JSONResponse({'id': app_id, 'params': {'global-state': [], 'creator': ''}})
+
+    async def stats(request: Request):
+        return JSONResponse({'round': algod.round, 'calls': algod.calls, 'failures': algod.failures,
+                             'submitted': len(algod.submitted)})
+
+    app = Starlette(routes=[
+        Route('/v2/status', status),
+        Route('/v2/status/wait-for-block-after/{round:int}', wait_for_block),
+        Route('/v2/transactions/params', params),
+        Route('/v2/teal/compile', compile_teal, methods=['POST']),
+        Route('/v2/transactions', send, methods=['POST']),
+        Route('/v2/transactions/pending/{txid}', pending),
+        Route('/v2/blocks/{round:int}', block),
+        Route('/v2/blocks/{round:int}/txids', block_txids),
+        Route('/v2/applications/{app_id:int}', application),
+        Route('/fake/stats', stats),
+    ])
+    app.state.algod = algod
+    return app
+
+
+def parse_overrides(values: List[str]) -> Dict[str, float]:
+    """``['params=20', 'send=5']`` -> ``{'params': 20.0, 'send': 5.0}``."""
+    overrides = {}
+    for value in values:
+        name, _, number = value.partition('=')
+        if name not in ENDPOINTS:
+            raise argparse.ArgumentTypeError(f'unknown endpoint {name!r}; expected one of {", ".join(ENDPOINTS)}')
+        overrides[name] = float(number)
+    return overrides
+
+
+def add_arguments(parser: argparse.ArgumentParser) -> None:
+    parser.add_argument('--latency-ms', type=float, default=2.0)
+    parser.add_argument('--jitter-ms', type=float, default=1.0)
+    parser.add_argument('--fail-rate', type=float, default=0.0)
+    parser.add_argument('--endpoint-latency', action='append', default=[], metavar='NAME=MS')
+    parser.add_argument('--endpoint-fail-rate', action='append', default=[], metavar='NAME=RATE')
+    parser.add_argument('--round-time', type=float, default=1.0)
+    parser.add_argument('--seed', type=int, default=1)
+
+
+def config_from_args(args: argparse.Namespace) -> FakeAlgodConfig:
+    return FakeAlgodConfig(
+        latency_ms=args.latency_ms,
+        jitter_ms=args.jitter_ms,
+        fail_rate=args.fail_rate,
+        round_time=args.round_time,
+        seed=args.seed,
+        endpoint_latency_ms=parse_overrides(args.endpoint_latency),
+        endpoint_fail_rate=parse_overrides(args.endpoint_fail_rate),
+    )
+
+
+def main() -> None:
+    parser = argparse.ArgumentParser(description=__doc__.strip().splitlines()[1])
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=4001)
+    add_arguments(parser)
+    args = parser.parse_args()
+    import uvicorn
+
+    uvicorn.run(create_app(config_from_args(args)), host=args.host, port=args.port, log_level='warning')
+
+
+if __name__ == '__main__':
+    main()
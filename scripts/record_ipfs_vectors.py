@@ -0,0 +1,54 @@
+"""
+Module: record_ipfs_vectors.py
+Description: Record `ipfs add` CIDs for the multi-chunk vectors in tests/test_ipfs_cid.py.
+
+Each vector is ``size`` bytes of ``generate(seed, size)``. They are sized so the
+default 256 KiB chunker gives a full first layer (174 leaves) and a tree with a
+second layer, which the small hand-checked CIDs in the tests never reach. The
+bytes are piped through a local ``ipfs add --only-hash`` for CIDv0 and CIDv1 and
+the results written to tests/fixtures/ipfs_add/vectors.json.
+
+Usage: python -m scripts.record_ipfs_vectors  (needs the ipfs binary on PATH)
+"""
+
+import hashlib
+import json
+from pathlib import Path
+import subprocess
+
+FIXTURE = Path(__file__).resolve().parent.parent / 'tests' / 'fixtures' / 'ipfs_add' / 'vectors.json'
+
+CHUNK = 262144
+VECTORS = [
+    ('one_full_layer', b'lucid-1', 174 * CHUNK),
+    ('two_layers', b'lucid-2', 174 * CHUNK + 1),
+    ('two_layers_ragged', b'lucid-3', 400 * CHUNK + 12345),
+]
+
+
+def generate(seed: bytes, size: int) -> bytes:
+    """SHA-256 in counter mode: incompressible, and cheap to rebuild in the tests."""
+    blocks = (hashlib.sha256(seed + counter.to_bytes(8, 'big')).digest() for counter in range(-(-size // 32)))
+    return b''.join(blocks)[:size]
+
+
+def ipfs_add(data: bytes, version: int) -> str:
+    result = subprocess.run(['ipfs', 'add', '--only-hash', '-Q', f'--cid-version={version}'], input=data,
+                            capture_output=True, check=True)
+    return result.stdout.decode().strip()
+
+
+def main() -> None:
+    version = subprocess.run(['ipfs', 'version', '--number'], capture_output=True, check=True).stdout.decode()
+    entries = []
+    for name, seed, size in VECTORS:
+        data = generate(seed, size)
+        entries.append({'name': name, 'seed': seed.decode(), 'size': size,
+                        'cid_v0': ipfs_add(data, 0), 'cid_v1': ipfs_add(data, 1)})
+        print(f'{name}: {entries[-1]["cid_v0"]}')
+    FIXTURE.parent.mkdir(parents=True, exist_ok=True)
+    FIXTURE.write_text(json.dumps({'ipfs_version': version.strip(), 'vectors': entries}, indent=2) + '\n')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,41 @@
+"""
+Module: record_teal_fixtures.py
+Description: Record algod /v2/teal/compile output for the offline assembler's regression fixtures.
+
+Every program already listed in tests/fixtures/algod_compile/*.json is recompiled
+and each built contract is written to <name>_approval.json / <name>_clear.json, so
+tests/test_teal_assembler.py can compare the offline bytes against the node's.
+
+Usage: ALGOD_ADDRESS=... python -m scripts.record_teal_fixtures
+"""
+
+import json
+from pathlib import Path
+
+from contracts.build import CONTRACTS, build_contracts
+from scripts.deploy import get_algod_client
+
+FIXTURES = Path(__file__).resolve().parent.parent / 'tests' / 'fixtures' / 'algod_compile'
+
+
+def record(client, name: str, source: str) -> dict:
+    response = client.compile(source, source_map=True)
+    return {'name': name, 'source': source, 'result': response['result'], 'hash': response['hash'],
+            'sourcemap': response.get('sourcemap')}
+
+
+def main() -> None:
+    client = get_algod_client()
+    for path in sorted(FIXTURES.glob('*.json')):
+        entries = [record(client, e['name'], e['source']) for e in json.loads(path.read_text())]
+        path.write_text(json.dumps(entries, indent=2) + '\n')
+        print(f'{path.name}: {len(entries)} program(s)')
+    for artifact in build_contracts(CONTRACTS, assembler=None).values():
+        for suffix, source in (('approval', artifact.approval_teal), ('clear', artifact.clear_teal)):
+            name = f'{artifact.name}_{suffix}'
+            (FIXTURES / f'{name}.json').write_text(json.dumps([record(client, name, source)], indent=2) + '\n')
+            print(f'{name}.json')
+
+
+if __name__ == '__main__':
+    main()
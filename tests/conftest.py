@@ -1,7 +1,31 @@
+import os
+
 import pytest
+from algosdk.transaction import SuggestedParams
 from fastapi.testclient import TestClient
-from backend.app import app
+from backend.app import create_app
+
+ZERO_ADDRESS = 'AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAY5HFKQ'
+
 
 @pytest.fixture
 def client():
-    return TestClient(app)
+    env = {'ALGOD_ADDRESS': 'http://localhost:4001', **os.environ}
+    with TestClient(create_app(env)) as test_client:
+        yield test_client
+
+
+@pytest.fixture
+def params_fetches(client, monkeypatch):
+    """Swap the backend params cache for one backed by a fake algod; returns the fetch log."""
+    from backend.params_cache import SuggestedParamsCache
+
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return SuggestedParams(fee=0, first=10, last=1010, gh='SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=',
+                               gen='testnet-v1.0', min_fee=1000)
+
+    monkeypatch.setattr(client.app.state.services, 'params_cache', SuggestedParamsCache(fetch, ttl=60))
+    return calls
@@ -0,0 +1,133 @@
+import asyncio
+from base64 import b64encode
+
+import pytest
+
+from backend.admission import (AdmissionController, OverloadedError, PriorityLimiter, RateLimitedError, SingleFlight,
+                               TooManySendersError)
+from tests.conftest import ZERO_ADDRESS
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_buckets_charge_global_and_each_sender_only_when_all_can_pay():
+    clock = Clock()
+    admission = AdmissionController(rate=10, burst=3, sender_rate=1, sender_burst=2, clock=clock)
+    admission.check(['A'])
+    admission.check(['A', 'A', 'B'])
+    with pytest.raises(RateLimitedError, match='Sender A') as excinfo:
+        admission.check(['A'])
+    assert excinfo.value.retry_after == pytest.approx(1.0) and excinfo.value.retry_after_header == '1'
+    # The rejected request took nothing, so the global bucket still has one token.
+    admission.check(['C'])
+    with pytest.raises(RateLimitedError, match='Server'):
+        admission.check(['D'])
+    clock.now = 1.0
+    admission.check(['A'])
+    assert admission.stats()['rate_limited'] == 2 and admission.stats()['senders'] == 4
+
+    unlimited = AdmissionController(rate=0, sender_rate=0)
+    for _ in range(5000):
+        unlimited.check(['A'])
+
+
+def test_new_senders_cannot_evict_active_senders_buckets():
+    clock = Clock()
+    admission = AdmissionController(rate=0, sender_rate=1, sender_burst=2, max_senders=3, max_request_senders=4,
+                                    clock=clock)
+    admission.check(['A'])
+    admission.check(['B'])
+    with pytest.raises(TooManySendersError):
+        admission.check([f'new{i}' for i in range(5)])
+    assert admission.stats()['senders'] == 2
+    # One slot is free; the next new sender finds only still-refilling buckets.
+    with pytest.raises(RateLimitedError, match='too many active senders') as excinfo:
+        admission.check(['C', 'D'])
+    assert excinfo.value.retry_after == pytest.approx(1.0)
+    admission.check(['A'])
+    with pytest.raises(RateLimitedError, match='Sender A'):
+        admission.check(['A'])
+    # Once B has refilled, dropping its bucket loses nothing.
+    clock.now = 1.0
+    admission.check(['D'])
+    assert 'B' not in admission.senders._buckets and admission.stats()['senders'] == 3
+
+def test_limiter_serves_broadcast_first_and_rejects_overflow():
+    order = []
+
+    async def run():
+        limiter = PriorityLimiter(1, max_waiting=1, max_wait=1.0)
+        await limiter.acquire('unsigned')
+
+        async def waiter(lane):
+            await limiter.acquire(lane)
+            order.append(lane)
+            limiter.release()
+
+        tasks = [asyncio.ensure_future(waiter('unsigned'))]
+        await asyncio.sleep(0)
+        with pytest.raises(OverloadedError, match='unsigned'):
+            await limiter.acquire('unsigned')
+        tasks.append(asyncio.ensure_future(waiter('broadcast')))
+        await asyncio.sleep(0)
+        limiter.release()
+        await asyncio.gather(*tasks)
+
+        limiter.max_wait = 0.01
+        await limiter.acquire('unsigned')
+        with pytest.raises(OverloadedError, match='within'):
+            await limiter.acquire('broadcast')
+        limiter.release()
+        return limiter.active, limiter.waiting
+
+    active, waiting = asyncio.run(run())
+    assert order == ['broadcast', 'unsigned']
+    assert active == 0 and waiting == {'broadcast': 0, 'unsigned': 0}
+
+
+def test_singleflight_shares_one_call():
+    calls = []
+
+    async def build():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return {'unsigned': ['x']}
+
+    async def run():
+        flight = SingleFlight()
+        results = await asyncio.gather(*(flight.run('key', build) for _ in range(5)), flight.run('other', build))
+        return results, flight.coalesced, len(flight)
+
+    results, coalesced, in_flight = asyncio.run(run())
+    assert len(calls) == 2 and coalesced == 4 and in_flight == 0
+    assert all(result == {'unsigned': ['x']} for result in results)
+
+
+def test_register_is_rate_limited_per_sender(client, params_fetches, monkeypatch):
+    services = client.app.state.services
+    monkeypatch.setattr(services, 'admission', AdmissionController(sender_rate=0.1, sender_burst=1))
+    payload = {'app_id': 1, 'sender': ZERO_ADDRESS, 'media_hash': b64encode(b'h' * 32).decode(),
+               'metadata': b64encode(b'm').decode()}
+    assert client.post('/api/unsigned/media/register', json=payload).status_code == 200
+    response = client.post('/api/unsigned/media/register', json=payload)
+    assert response.status_code == 429
+    assert response.headers['Retry-After'] == '10'
+    assert 'lucid_admission_rate_limited 1' in client.get('/metrics').text
+
+
+def test_invalid_senders_are_rejected_before_any_bucket(client, params_fetches):
+    admission = client.app.state.services.admission
+    payload = {'app_id': 1, 'sender': 'not-an-address', 'media_hash': b64encode(b'h' * 32).decode(),
+               'metadata': b64encode(b'm').decode()}
+    tokens = admission.global_bucket.tokens
+    assert client.post('/api/unsigned/media/register', json=payload).status_code == 400
+    response = client.post('/api/broadcast', json={'signed': [b64encode(b'blob').decode()]})
+    assert response.status_code == 400
+    assert admission.global_bucket.tokens == tokens
+    assert admission.stats()['senders'] == 0
@@ -0,0 +1,66 @@
+import asyncio
+
+import httpx
+import pytest
+from algosdk import error
+
+from backend.algod_async import AsyncAlgodClient
+
+
+def make_client(handler):
+    return AsyncAlgodClient('token', 'http://algod.test', headers={'X-API-Key': 'k'},
+                            transport=httpx.MockTransport(handler))
+
+
+def test_suggested_params_maps_algod_fields():
+    def handler(request):
+        assert request.url.path == '/v2/transactions/params'
+        assert request.headers['X-Algo-API-Token'] == 'token'
+        assert request.headers['X-API-Key'] == 'k'
+        return httpx.Response(200, json={
+            'consensus-version': 'v1', 'fee': 0, 'genesis-hash': 'gh', 'genesis-id': 'testnet-v1.0',
+            'last-round': 50, 'min-fee': 1000,
+        })
+
+    async def run():
+        client = make_client(handler)
+        try:
+            return await client.suggested_params()
+        finally:
+            await client.aclose()
+
+    params = asyncio.run(run())
+    assert (params.first, params.last, params.min_fee) == (50, 1050, 1000)
+
+
+def test_send_raw_transactions_concatenates_blobs():
+    def handler(request):
+        assert request.headers['Content-Type'] == 'application/x-binary'
+        assert request.content == b'abcdef'
+        return httpx.Response(200, json={'txId': 'TX1'})
+
+    async def run():
+        client = make_client(handler)
+        try:
+            return await client.send_raw_transactions([b'abc', b'def'])
+        finally:
+            await client.aclose()
+
+    assert asyncio.run(run()) == 'TX1'
+
+
+def test_http_errors_raise_algod_http_error():
+    def handler(request):
+        return httpx.Response(400, json={'message': 'overspend'})
+
+    async def run():
+        client = make_client(handler)
+        try:
+            await client.status()
+        finally:
+            await client.aclose()
+
+    with pytest.raises(error.AlgodHTTPError) as excinfo:
+        asyncio.run(run())
+    assert excinfo.value.code == 400
+    assert 'overspend' in str(excinfo.value)
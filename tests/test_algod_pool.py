@@ -0,0 +1,193 @@
+import asyncio
+import json
+
+import httpx
+import pytest
+from algosdk import error
+
+from backend.algod_async import AsyncAlgodClient
+from backend.algod_pool import AlgodEndpoint, AlgodPool, RoundNotReachedError, endpoints_from_env
+
+PARAMS = {'consensus-version': 'v1', 'fee': 0, 'genesis-hash': 'gh', 'genesis-id': 'testnet-v1.0',
+          'last-round': 50, 'min-fee': 1000}
+
+
+def make_pool(handlers, **kwargs):
+    """One mock node per handler, named ``a``, ``b``, ..."""
+    endpoints = [AlgodEndpoint(f'http://{name}.test', name=name) for name in handlers]
+
+    def factory(endpoint):
+        return AsyncAlgodClient('', endpoint.address, transport=httpx.MockTransport(handlers[endpoint.name]))
+
+    return AlgodPool(endpoints, probe_interval=3600, client_factory=factory, **kwargs)
+
+
+def node(last_round=50, delay=0.0, status_code=200, calls=None):
+    async def handler(request):
+        if calls is not None:
+            calls.append(request.url.path)
+        await asyncio.sleep(delay)
+        if status_code != 200:
+            return httpx.Response(status_code, json={'message': 'nope'})
+        if request.url.path == '/v2/status':
+            return httpx.Response(200, json={'last-round': last_round})
+        if request.url.path == '/v2/transactions':
+            return httpx.Response(200, json={'txId': 'TX1'})
+        return httpx.Response(200, json={**PARAMS, 'last-round': last_round})
+    return handler
+
+
+def test_endpoints_from_env():
+    endpoints = endpoints_from_env({'ALGOD_ENDPOINTS': json.dumps([
+        {'address': 'http://a', 'headers': {'X-API-Key': 'k'}, 'name': 'a'},
+        {'address': 'http://b', 'token': 't'},
+    ]), 'ALGOD_ADDRESS': 'http://ignored'})
+    assert [(e.address, e.token, e.headers, e.label) for e in endpoints] == [
+        ('http://a', '', {'X-API-Key': 'k'}, 'a'), ('http://b', 't', {}, 'http://b')]
+    single = endpoints_from_env({'ALGOD_ADDRESS': 'http://node', 'ALGOD_HEADER_KV': 'X-API-Key=abc'})
+    assert single == [AlgodEndpoint('http://node', '', {'X-API-Key': 'abc'})]
+    assert endpoints_from_env({}) == []
+    with pytest.raises(RuntimeError, match='ALGOD_ENDPOINTS'):
+        endpoints_from_env({'ALGOD_ENDPOINTS': '[{"token": "t"}]'})
+
+
+def test_slow_read_is_hedged_to_the_next_node():
+    slow_calls, fast_calls = [], []
+
+    async def run():
+        pool = make_pool({'a': node(delay=0.5, calls=slow_calls), 'b': node(last_round=51, calls=fast_calls)},
+                         hedge_default=0.02)
+        # Make ``a`` look fastest so it is picked first.
+        pool.states[0].ewma, pool.states[1].ewma = 0.001, 0.002
+        try:
+            params = await pool.suggested_params()
+            return params, pool.stats()
+        finally:
+            await pool.aclose()
+
+    params, stats = asyncio.run(run())
+    assert params.first == 51
+    assert slow_calls and fast_calls
+    assert (stats['hedges'], stats['hedge_wins']) == (1, 1)
+    assert [state['in_flight'] for state in stats['endpoints']] == [0, 0]
+
+
+def test_round_reads_skip_a_fast_node_that_has_not_reached_the_round():
+    calls = {'a': [], 'b': []}
+
+    def chain(name, last_round, at_round=None):
+        # ``at_round`` is where the node really is; its probe may say otherwise.
+        async def handler(request):
+            calls[name].append(request.url.path)
+            if request.url.path == '/v2/status':
+                return httpx.Response(200, json={'last-round': last_round})
+            round_number = int(request.url.path.split('/')[3])
+            if round_number > (last_round if at_round is None else at_round):
+                return httpx.Response(404, json={'message': 'failed to retrieve information from the ledger'})
+            return httpx.Response(200, json={'blockTxids': [f'{name}{round_number}']})
+        return handler
+
+    async def run(handlers, round_number):
+        pool = make_pool(handlers, max_lag=5)
+        await pool.probe_once()
+        # ``a`` is the fastest node, and within ``max_lag``.
+        pool.states[0].ewma, pool.states[1].ewma = 0.001, 0.002
+        try:
+            return await pool.request('GET', f'/blocks/{round_number}/txids'), pool.stats()
+        finally:
+            await pool.aclose()
+
+    block, stats = asyncio.run(run({'a': chain('a', 98), 'b': chain('b', 100)}, 100))
+    assert block == {'blockTxids': ['b100']}
+    assert set(calls['a']) == {'/v2/status'} and stats['failovers'] == 0
+
+    # A node that moved on since its probe is still asked first; its 404 fails over.
+    block, stats = asyncio.run(run({'a': chain('a', 100, at_round=99), 'b': chain('b', 100)}, 100))
+    assert block == {'blockTxids': ['b100']} and stats['failovers'] == 1
+
+    # No node has reached the round: the 404 is not the route's answer.
+    with pytest.raises(RoundNotReachedError):
+        asyncio.run(run({'a': chain('a', 98), 'b': chain('b', 99)}, 100))
+
+def test_submissions_fail_over_on_5xx_but_not_on_4xx():
+    calls = []
+
+    async def run(first_status):
+        pool = make_pool({'a': node(status_code=first_status, calls=calls), 'b': node(calls=calls)})
+        pool.states[0].ewma, pool.states[1].ewma = 0.001, 0.002
+        try:
+            return await pool.send_raw_transactions([b'blob']), pool.stats()
+        finally:
+            await pool.aclose()
+
+    txid, stats = asyncio.run(run(503))
+    assert txid == 'TX1' and stats['failovers'] == 1 and stats['hedges'] == 0
+    # One 5xx is a blip, not an outage.
+    assert stats['endpoints'][0]['healthy'] is True
+
+    calls.clear()
+    with pytest.raises(error.AlgodHTTPError):
+        asyncio.run(run(400))
+    assert calls == ['/v2/transactions']
+
+
+def test_probe_takes_lagging_and_failing_nodes_out_of_rotation():
+    async def run():
+        pool = make_pool({'a': node(last_round=40), 'b': node(last_round=50), 'c': node(status_code=500)},
+                         max_lag=2)
+        try:
+            await pool.probe_once()
+            ranked = [state.endpoint.name for state in pool.ranked()]
+            health = {state.endpoint.name: (state.healthy, state.lag) for state in pool.states}
+            await pool.status()
+            return ranked, health, pool.stats()
+        finally:
+            await pool.aclose()
+
+    ranked, health, stats = asyncio.run(run())
+    assert ranked[0] == 'b'
+    assert health['a'] == (False, 10) and health['b'] == (True, 0) and health['c'][0] is False
+    assert stats['healthy'] == 1
+    assert stats['endpoints'][1]['requests'] == 1
+
+
+def test_nodes_leave_rotation_after_consecutive_failures_but_not_long_poll_timeouts():
+    failing = {'status': 503}
+
+    async def flaky(request):
+        if request.url.path.startswith('/v2/status/wait-for-block-after'):
+            raise httpx.ReadTimeout('no new block yet', request=request)
+        if request.url.path == '/v2/transactions' and failing['status'] != 200:
+            return httpx.Response(failing['status'], json={'message': 'nope'})
+        return await node()(request)
+
+    async def run():
+        pool = make_pool({'a': flaky, 'b': node()}, max_failures=3)
+        a = pool.states[0]
+
+        async def submit():
+            return await pool._failover(lambda client: client.send_raw_transactions([b'blob']), [a])
+
+        try:
+            for _ in range(2):
+                with pytest.raises(error.AlgodHTTPError):
+                    await submit()
+            failing['status'] = 200
+            await submit()
+            # A success resets the streak.
+            assert (a.healthy, a.consecutive_failures) == (True, 0)
+
+            for _ in range(5):
+                with pytest.raises(httpx.ReadTimeout):
+                    await pool._failover(lambda client: client.status_after_block(50), [a], long_poll=True)
+            assert (a.healthy, a.consecutive_failures, a.errors) == (True, 0, 2)
+
+            failing['status'] = 503
+            for _ in range(3):
+                with pytest.raises(error.AlgodHTTPError):
+                    await submit()
+            return a.healthy
+        finally:
+            await pool.aclose()
+
+    assert asyncio.run(run()) is False
@@ -1,3 +1,20 @@
+from base64 import b64decode, b64encode
+
+from algosdk import account, encoding, transaction
+from algosdk.transaction import SuggestedParams
+
+from tests.conftest import ZERO_ADDRESS
+
+
+def register_body(media=b'hash'):
+    return {
+        'app_id': 1,
+        'sender': ZERO_ADDRESS,
+        'media_hash': b64encode(media).decode(),
+        'metadata': b64encode(b'meta').decode(),
+    }
+
+
 def test_read_config(client):
     response = client.get("/api/config")
     assert response.status_code == 200
@@ -5,3 +22,145 @@ def test_read_config(client):
     assert "app_id" in data
     assert "algod_url" in data
     assert "genesis_id" in data
+
+
+def test_register_payload_uses_cached_params(client, params_fetches):
+    for _ in range(3):
+        response = client.post('/api/unsigned/media/register', json=register_body())
+        assert response.status_code == 200
+        assert len(response.json()['unsigned']) == 1
+    assert len(params_fetches) == 1
+
+
+def test_register_batch_assigns_group_ids(client, params_fetches):
+    items = [register_body(bytes([i])) for i in range(20)]
+    response = client.post('/api/unsigned/media/register/batch', json={'items': items, 'group_size': 16})
+    assert response.status_code == 200
+    data = response.json()
+    assert len(data['unsigned']) == 20
+    assert [len(group['indexes']) for group in data['groups']] == [16, 4]
+    first = encoding.msgpack_decode(data['unsigned'][0])
+    assert first.group == b64decode(data['groups'][0]['group_id'])
+    assert len(params_fetches) == 1
+
+
+def test_batch_rejects_oversized_groups(client, params_fetches):
+    response = client.post('/api/unsigned/media/register/batch',
+                           json={'items': [register_body()], 'group_size': 17})
+    assert response.status_code == 400
+
+
+def test_config_supports_etag_revalidation(client):
+    first = client.get('/api/config')
+    etag = first.headers['etag']
+    second = client.get('/api/config', headers={'If-None-Match': etag})
+    assert second.status_code == 304
+    assert client.get('/api/config', headers={'If-None-Match': f'"other", W/{etag}'}).status_code == 304
+    assert client.get('/api/config', headers={'If-None-Match': '"other"'}).status_code == 200
+
+
+def test_broadcast_submits_through_queue(client, monkeypatch):
+    submitted = []
+
+    async def submit(blobs):
+        submitted.append(blobs)
+        return 'TXID'
+
+    monkeypatch.setattr(client.app.state.services.broadcast_queue, '_submit', submit)
+    key, sender = account.generate_account()
+    params = SuggestedParams(fee=1000, first=1, last=1001, gh='SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=',
+                             flat_fee=True)
+    signed = transaction.PaymentTxn(sender, params, sender, 1).sign(key)
+    blob = encoding.msgpack_encode(signed)
+    for _ in range(2):
+        response = client.post('/api/broadcast', json={'signed': [blob]})
+        assert response.status_code == 200
+        assert response.json() == {'txid': 'TXID'}
+    # The retry is answered from the recent-submission cache.
+    assert submitted == [[b64decode(blob)]]
+
+    response = client.post('/api/broadcast', json={'signed': [b64encode(b'blob').decode()]})
+    assert response.status_code == 400
+
+
+def test_broadcast_wait_confirmed_resolves_a_txn_already_confirmed(client, monkeypatch):
+    import asyncio
+
+    from backend.tracker import ConfirmationTracker
+
+    services = client.app.state.services
+
+    class Algod:
+        async def status(self):
+            return {'last-round': 100}
+
+        async def status_after_block(self, round_number, timeout=None):
+            await asyncio.Event().wait()  # no new block within the test
+
+        async def pending_transaction_info(self, txid):
+            return {'confirmed-round': 100}
+
+    async def submit(blobs):
+        return 'TXID'
+
+    monkeypatch.setattr(services.broadcast_queue, '_submit', submit)
+    services.tracker = ConfirmationTracker(Algod())
+    key, sender = account.generate_account()
+    params = SuggestedParams(fee=1000, first=1, last=1001, gh='SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=',
+                             flat_fee=True)
+    blob = encoding.msgpack_encode(transaction.PaymentTxn(sender, params, sender, 1).sign(key))
+    response = client.post('/api/broadcast', json={'signed': [blob], 'wait': 'confirmed'})
+    assert response.json() == {'txid': 'TXID', 'confirmed_round': 100}
+
+
+def test_broadcast_rejects_unknown_wait_mode(client):
+    response = client.post('/api/broadcast', json={'signed': ['AA=='], 'wait': 'eventually'})
+    assert response.status_code == 400
+
+
+def test_msgpack_is_only_sent_when_accepted_with_positive_q(client, params_fetches):
+    from backend.app import accepts_msgpack, is_msgpack
+
+    response = client.post('/api/unsigned/media/register', json=register_body(),
+                           headers={'Accept': 'application/msgpack;q=0, application/json'})
+    assert response.headers['content-type'] == 'application/json'
+    assert accepts_msgpack('application/msgpack, */*;q=0.1')
+    assert not accepts_msgpack('application/json, application/msgpack;q=0.5')
+    assert not accepts_msgpack('application/msgpack;q=0')
+    assert not accepts_msgpack('application/msgpack-ish')
+    assert is_msgpack('application/msgpack; charset=binary') and not is_msgpack('text/application/msgpack')
+
+
+def test_unsigned_and_broadcast_speak_msgpack(client, params_fetches, monkeypatch):
+    import msgpack
+
+    json_body = client.post('/api/unsigned/media/register', json=register_body()).json()
+    response = client.post('/api/unsigned/media/register', json=register_body(),
+                           headers={'Accept': 'application/msgpack'})
+    assert response.headers['content-type'] == 'application/msgpack'
+    raw = msgpack.unpackb(response.content)['unsigned'][0]
+    assert raw == b64decode(json_body['unsigned'][0])
+    assert encoding.msgpack_decode(b64encode(raw).decode()).index == 1
+
+    submitted = []
+
+    async def submit(blobs):
+        submitted.append(blobs)
+        return 'TXID'
+
+    monkeypatch.setattr(client.app.state.services.broadcast_queue, '_submit', submit)
+    key, sender = account.generate_account()
+    params = SuggestedParams(fee=1000, first=1, last=1001, gh='SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=',
+                             flat_fee=True)
+    signed = transaction.PaymentTxn(sender, params, sender, 1).sign(key)
+    blob = b64decode(encoding.msgpack_encode(signed))
+    response = client.post('/api/broadcast', content=msgpack.packb({'signed': [blob]}),
+                           headers={'Content-Type': 'application/msgpack', 'Accept': 'application/msgpack'})
+    assert response.status_code == 200
+    assert msgpack.unpackb(response.content) == {'txid': 'TXID'}
+    assert submitted == [[blob]]
+
+    response = client.post('/api/broadcast', content=msgpack.packb({'signed': ['not bytes']}),
+                           headers={'Content-Type': 'application/msgpack'})
+    assert response.status_code == 400
+    assert client.post('/api/broadcast', json={'wait': 'queued'}).status_code == 422
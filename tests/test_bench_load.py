@@ -0,0 +1,55 @@
+from base64 import b64decode
+
+from starlette.testclient import TestClient
+
+from scripts.bench_load import compare, percentile, scenario_factories, signed_payments, summarize
+from scripts.fake_algod import FakeAlgodConfig, create_app
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def test_fake_algod_serves_params_compile_send_and_pending():
+    clock = Clock()
+    client = TestClient(create_app(FakeAlgodConfig(latency_ms=0, jitter_ms=0), clock))
+
+    params = client.get('/v2/transactions/params').json()
+    assert params['last-round'] == 1000 and params['min-fee'] == 1000
+    assert client.post('/v2/teal/compile', content=b'#pragma version 8\nint 1').json()['result'] == 'CIEB'
+
+    blob = b64decode(signed_payments(1, 7, params)[0])
+    txid = client.post('/v2/transactions', content=blob).json()['txId']
+    assert client.get(f'/v2/transactions/pending/{txid}').json()['confirmed-round'] == 0
+    clock.now = 1.0
+    assert client.get(f'/v2/transactions/pending/{txid}').json()['confirmed-round'] == 1001
+    assert client.get('/v2/blocks/1001/txids').json()['blockTxids'] == [txid]
+    assert client.get('/v2/transactions/pending/UNKNOWN').status_code == 404
+
+
+def test_fake_algod_injects_failures_per_endpoint():
+    client = TestClient(create_app(FakeAlgodConfig(latency_ms=0, jitter_ms=0, endpoint_fail_rate={'params': 1.0})))
+    assert client.get('/v2/transactions/params').status_code == 503
+    assert client.get('/v2/status').status_code == 200
+    assert client.get('/fake/stats').json()['failures']['params'] == 1
+
+
+def test_summary_and_regression_check():
+    assert percentile([1, 2, 3, 4], 50) == 2 and percentile([1, 2, 3, 4], 99) == 4
+    baseline = {'scenarios': {'register': summarize([0.010] * 99 + [0.050], 0, 1.0)}}
+    assert baseline['scenarios']['register']['p99_ms'] == 10.0 and baseline['scenarios']['register']['rps'] == 100
+    assert compare(baseline, baseline, 0.1) == []
+    slower = {'scenarios': {'register': summarize([0.020] * 100, 0, 2.0)}}
+    messages = compare(baseline, slower, 0.1)
+    assert any('rps' in message for message in messages) and any('p95_ms' in message for message in messages)
+
+
+def test_scenarios_build_distinct_deterministic_requests():
+    factories = scenario_factories(seed=3)
+    assert factories['register'](1) == scenario_factories(seed=3)['register'](1)
+    assert factories['register'](1)[2]['media_hash'] != factories['register'](2)[2]['media_hash']
+    assert 'broadcast' not in factories
@@ -0,0 +1,171 @@
+import asyncio
+from base64 import b64decode
+
+from algosdk import account, encoding
+from algosdk.transaction import ApplicationCallTxn, OnComplete, PaymentTxn, SuggestedParams, assign_group_id
+import msgpack
+import pytest
+
+from backend.broadcast import (
+    BroadcastQueue, PreflightError, QueueClosedError, QueueFullError, RecentResults, preflight,
+)
+
+
+def test_queue_limits_in_flight_submissions():
+    active = []
+    peak = []
+
+    async def submit(blobs):
+        active.append(1)
+        peak.append(len(active))
+        await asyncio.sleep(0.01)
+        active.pop()
+        return blobs[0].decode()
+
+    async def run():
+        queue = BroadcastQueue(submit, max_queue=16, concurrency=2)
+        await queue.start()
+        futures = [queue.enqueue([str(i).encode()]) for i in range(6)]
+        results = await asyncio.gather(*futures)
+        await queue.stop()
+        return results
+
+    assert asyncio.run(run()) == [str(i) for i in range(6)]
+    assert max(peak) == 2
+
+
+def test_full_queue_rejects_and_duplicates_coalesce():
+    async def run():
+        gate = asyncio.Event()
+
+        async def submit(blobs):
+            await gate.wait()
+            return 'TX'
+
+        queue = BroadcastQueue(submit, max_queue=1, concurrency=1)
+        await queue.start()
+        first = queue.enqueue([b'a'])
+        await asyncio.sleep(0)  # let the worker pick up the first group
+        second = queue.enqueue([b'b'])
+        assert queue.enqueue([b'b']) is second
+        with pytest.raises(QueueFullError):
+            queue.enqueue([b'c'])
+        gate.set()
+        await asyncio.gather(first, second)
+        stats = queue.stats()
+        await queue.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert stats['coalesced'] == 1
+    assert stats['rejected'] == 1
+    assert stats['submitted'] == 2
+
+
+def test_enqueue_requires_running_queue():
+    async def run():
+        queue = BroadcastQueue(None)
+        with pytest.raises(QueueClosedError):
+            queue.enqueue([b'a'])
+
+    asyncio.run(run())
+
+
+def signed_group(count=2, last=1000, group=True):
+    key, sender = account.generate_account()
+    params = SuggestedParams(fee=1000, first=1, last=last, gh='SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=',
+                             flat_fee=True)
+    txns = [PaymentTxn(sender, params, sender, amount) for amount in range(count)]
+    if group:
+        txns = assign_group_id(txns)
+    return [txn.sign(key) for txn in txns]
+
+
+def blobs(signed):
+    return [b64decode(encoding.msgpack_encode(stxn)) for stxn in signed]
+
+
+def test_preflight_returns_txids_and_rejects_bad_groups():
+    group = signed_group()
+    assert preflight(blobs(group), current_round=500) == [stxn.get_txid() for stxn in group]
+    # A single blob holding the whole concatenated group is accepted too.
+    assert preflight([b''.join(blobs(group))]) == [stxn.get_txid() for stxn in group]
+
+    with pytest.raises(PreflightError, match='Invalid signed transaction'):
+        preflight([b'blob'])
+    with pytest.raises(PreflightError, match='share one group'):
+        preflight(blobs(signed_group(group=False)))
+    with pytest.raises(PreflightError, match='does not match'):
+        preflight(blobs(group[:1]))
+    with pytest.raises(PreflightError, match='expired'):
+        preflight(blobs(signed_group(last=100)), current_round=101)
+    with pytest.raises(PreflightError, match='not a signed transaction'):
+        preflight([msgpack.packb({'txn': {'type': 'pay'}})])
+
+
+@pytest.mark.parametrize('lease', [None, b'l' * 32])
+def test_preflight_matches_algosdk_for_wide_app_calls(lease):
+    # 15 or 16 fields before the group ID: dropping ``grp`` crosses or stays in the map16 header.
+    key, sender = account.generate_account()
+    params = SuggestedParams(fee=1000, first=1, last=1000, gh='SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=',
+                             gen='testnet-v1.0', flat_fee=True)
+    txns = assign_group_id([
+        ApplicationCallTxn(sender, params, 5, OnComplete.NoOpOC, app_args=[b'a', bytes([n])], accounts=[sender],
+                           foreign_apps=[7], foreign_assets=[9], boxes=[(5, b'k')], note=b'n', lease=lease,
+                           rekey_to=sender)
+        for n in range(2)])
+    group = [txn.sign(key) for txn in txns]
+    assert preflight(blobs(group), current_round=500) == [stxn.get_txid() for stxn in group]
+
+
+def test_recent_results_expire_and_stay_bounded():
+    now = [0.0]
+    recent = RecentResults(ttl=10, max_entries=2, clock=lambda: now[0])
+    for key in 'abc':
+        recent.put(key, key.upper())
+    assert (recent.get('a'), recent.get('c'), len(recent)) == (None, 'C', 2)
+    now[0] = 10
+    assert recent.get('b') is None
+
+
+def test_submitted_groups_are_deduplicated_until_ttl():
+    calls = []
+    now = [0.0]
+
+    async def submit(blobs):
+        calls.append(blobs)
+        return 'TX'
+
+    async def run():
+        queue = BroadcastQueue(submit, recent_ttl=60, clock=lambda: now[0])
+        await queue.start()
+        assert await queue.enqueue([b'a'], key='TX') == 'TX'
+        assert await queue.enqueue([b'a'], key='TX') == 'TX'
+        now[0] = 61
+        assert await queue.enqueue([b'a'], key='TX') == 'TX'
+        stats = queue.stats()
+        await queue.stop()
+        return stats
+
+    stats = asyncio.run(run())
+    assert len(calls) == 2
+    assert stats['deduplicated'] == 1
+
+
+@pytest.mark.parametrize('ttl, max_entries', [(0, 10), (60, 0)])
+def test_disabled_dedupe_still_resolves_submissions(ttl, max_entries):
+    calls = []
+
+    async def submit(blobs):
+        calls.append(blobs)
+        return 'TX'
+
+    async def run():
+        queue = BroadcastQueue(submit, recent_ttl=ttl, recent_max=max_entries)
+        await queue.start()
+        results = [await asyncio.wait_for(queue.enqueue([b'a'], key='TX'), 1) for _ in range(2)]
+        await queue.stop()
+        return results, len(queue.recent)
+
+    assert asyncio.run(run()) == (['TX', 'TX'], 0)
+    assert len(calls) == 2
@@ -0,0 +1,39 @@
+from contracts.build import BuildCache, build_contracts, build_key, export_teal, source_files
+
+
+def counting_assembler(calls):
+    def assemble(source):
+        calls.append(source)
+        return source.encode()[:16]
+    return assemble
+
+
+def test_second_build_hits_cache_for_teal_and_bytecode(tmp_path):
+    cache = BuildCache(tmp_path)
+    calls = []
+    first = build_contracts(assembler=counting_assembler(calls), cache=cache)
+    assert not any(artifact.cached for artifact in first.values())
+    # donation_pool's approval and clear programs are identical TEAL, assembled once.
+    assert len(calls) == 3
+
+    second = build_contracts(assembler=counting_assembler(calls), cache=cache)
+    assert all(artifact.cached for artifact in second.values())
+    assert len(calls) == 3
+    assert second['umis_engine'].approval_bytes == first['umis_engine'].approval_bytes
+
+    forced = build_contracts(['donation_pool'], assembler=counting_assembler(calls), cache=cache, force=True)
+    assert not forced['donation_pool'].cached
+    assert len(calls) == 5
+
+
+def test_build_key_covers_imports_and_options():
+    assert [path.name for path in source_files('umis_engine')] == ['umis_engine.py', 'utils.py']
+    assert build_key('umis_engine') != build_key('umis_engine', assemble_constants=True)
+    assert build_key('umis_engine') != build_key('umis_engine', version=7)
+
+
+def test_export_teal_writes_contract_files(tmp_path):
+    artifact = build_contracts(['donation_pool'], cache=BuildCache(tmp_path / 'cache'))['donation_pool']
+    paths = export_teal(artifact, tmp_path)
+    assert [path.name for path in paths] == ['donation_pool_approval.teal', 'donation_pool_clear.teal']
+    assert paths[0].read_text().startswith('#pragma version 6')
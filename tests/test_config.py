@@ -0,0 +1,71 @@
+import json
+import os
+
+from backend.config import ConfigStore, etag_matches
+
+
+def test_snapshot_reloads_when_app_config_changes(tmp_path):
+    dotenv_path = tmp_path / '.env'
+    dotenv_path.write_text('APP_ID=5\nWALLETCONNECT_PROJECT_ID=wc\n')
+    app_config = tmp_path / 'app_config.json'
+    store = ConfigStore(dotenv_path, app_config)
+
+    first = store.current()
+    assert first.app_id == 5
+    assert json.loads(first.body)['walletconnect_project_id'] == 'wc'
+    assert store.refresh() is False
+
+    app_config.write_text(json.dumps({'app_id': '42'}))
+    assert store.refresh() is True
+    second = store.current()
+    assert second.app_id == 42
+    assert second.etag != first.etag
+
+
+def test_dotenv_values_override_environment(tmp_path, monkeypatch):
+    monkeypatch.setenv('APP_ID', '1')
+    dotenv_path = tmp_path / '.env'
+    dotenv_path.write_text('APP_ID=2\n')
+    store = ConfigStore(dotenv_path, tmp_path / 'missing.json')
+    assert store.current().app_id == 2
+
+    os.remove(dotenv_path)
+    store.refresh()
+    assert store.current().app_id == 1
+
+
+def test_store_reads_the_given_env_instead_of_the_process(tmp_path, monkeypatch):
+    monkeypatch.setenv('APP_ID', '1')
+    store = ConfigStore(tmp_path / 'missing.env', tmp_path / 'missing.json', env={'APP_ID': '7'})
+    assert store.current().app_id == 7
+
+
+def test_etag_matches_lists_weak_tags_and_wildcard():
+    etag = '"abc"'
+    assert etag_matches('"abc"', etag)
+    assert etag_matches('"x", "abc"', etag)
+    assert etag_matches('W/"abc"', etag)
+    assert etag_matches('*', etag)
+    assert not etag_matches('"abcd", "x"', etag)
+    assert not etag_matches('', etag) and not etag_matches(None, etag)
+
+
+def test_app_reads_dotenv_without_copying_it_into_the_process(tmp_path, monkeypatch):
+    from starlette.testclient import TestClient
+
+    from backend.app import create_app
+
+    dotenv_path = tmp_path / '.env'
+    dotenv_path.write_text('ALGOD_ADDRESS=http://localhost:4001\nAPP_ID=5\n')
+    monkeypatch.setenv('DOTENV_PATH', str(dotenv_path))
+    monkeypatch.delenv('APP_ID', raising=False)
+    with TestClient(create_app()) as client:
+        services = client.app.state.services
+        assert services.algod_address == 'http://localhost:4001'
+        assert services.config_store.current().app_id == 5
+        assert 'APP_ID' not in os.environ
+
+        # A key deleted from .env is gone after the reload.
+        dotenv_path.write_text('ALGOD_ADDRESS=http://localhost:4001\n')
+        services.config_store.refresh(force=True)
+        assert services.config_store.current().app_id == 0
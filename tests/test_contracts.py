@@ -1,3 +1,4 @@
+from contracts import umis_engine
 from contracts.donation_pool import approval_program, clear_state_program
 from pyteal import compileTeal, Mode, TealType
 
@@ -7,3 +8,22 @@ def test_donation_pool_compilation():
     
     assert compileTeal(approval, mode=Mode.Application, version=6)
     assert compileTeal(clear, mode=Mode.Application, version=6)
+
+
+def test_umis_engine_tracks_total_weight():
+    approval = compileTeal(umis_engine.approval_program(), mode=Mode.Application, version=6)
+    clear = compileTeal(umis_engine.clear_state_program(), mode=Mode.Application, version=6)
+
+    assert 'byte "total_weight"' in approval
+    # Clearing state must release the account's weight from the pool too.
+    assert 'byte "total_weight"' in clear
+    assert 'app_global_put' in clear
+
+
+def test_umis_engine_claim_mode_uses_byte_math_accumulator():
+    approval = compileTeal(umis_engine.approval_program(), mode=Mode.Application, version=6)
+
+    assert 'byte "claim"' in approval
+    assert 'byte "reward_per_weight"' in approval
+    # The accumulator is a byte string, so it cannot wrap at 2**64.
+    assert 'b+' in approval and 'b/' in approval
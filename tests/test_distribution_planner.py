@@ -0,0 +1,52 @@
+import random
+
+import numpy as np
+import pytest
+
+from contracts.distribution_planner import plan_distribution, wide_ratio
+
+
+def test_wide_ratio_matches_python_integers_beyond_64_bits():
+    rng = random.Random(7)
+    amounts = [rng.randrange(1, 2 ** 64) for _ in range(500)]
+    weights = [rng.randrange(1, 1_000_001) for _ in range(500)]
+    totals = [w + rng.randrange(0, 4_000_000) for w in weights]
+    shares, remainders = wide_ratio(amounts, weights, totals)
+    assert [int(x) for x in shares] == [a * w // t for a, w, t in zip(amounts, weights, totals)]
+    assert [int(x) for x in remainders] == [a * w % t for a, w, t in zip(amounts, weights, totals)]
+
+
+def test_wide_ratio_rejects_overflowing_quotient():
+    with pytest.raises(OverflowError):
+        wide_ratio([2 ** 64 - 1], [3], [2])
+
+
+def test_plan_reproduces_contract_payouts():
+    rng = random.Random(1)
+    weights = [rng.randrange(1, 1_000_001) for _ in range(1003)]
+    total = 987_654_321_123
+    plan = plan_distribution(weights, total)
+
+    pool_weight = sum(weights)
+    assert plan.group_count == 251
+    assert plan.app_args() == [b'distribute', total.to_bytes(8, 'big')]
+    assert int(plan.group_amounts.sum(dtype=object)) == plan.distributed_total
+    assert 0 <= plan.remainder_total < len(weights)
+    for amount, members in plan.groups():
+        expected = [total * weights[i] // pool_weight for i in members]
+        assert [int(plan.shares[i]) for i in members] == expected
+        assert amount == sum(expected)
+    assert plan.fee_total == 1000 * (2 * plan.group_count + len(weights))
+
+
+def test_plan_pays_subset_against_pool_weight():
+    plan = plan_distribution([10, 30], 1_000, pool_weight=100)
+    assert [int(x) for x in plan.shares] == [100, 300]
+    assert [amount for amount, _members in plan.groups()] == [400]
+    with pytest.raises(ValueError):
+        plan_distribution([10, 30], 1_000, pool_weight=20)
+
+
+def test_plan_rejects_invalid_weights():
+    with pytest.raises(ValueError):
+        plan_distribution(np.array([0, 5]), 100)
@@ -0,0 +1,90 @@
+from base64 import b64encode, urlsafe_b64encode
+import hashlib
+
+from algosdk import encoding
+
+from backend.media_index import BloomFilter, MediaIndex, MediaIndexer
+from tests.conftest import ZERO_ADDRESS
+
+APP_ID = 7
+
+
+def media(n):
+    return hashlib.sha256(b'media-%d' % n).digest()
+
+
+def call(sender, *args):
+    return {'txn': {'type': 'appl', 'apid': APP_ID, 'snd': sender, 'apaa': list(args)}}
+
+
+def blocks():
+    sender = bytes(32)
+    return [
+        (1, {'block': {'rnd': 1, 'txns': [call(sender, b'register', media(1), b'meta'),
+                                          call(sender, b'opt_in'),
+                                          call(sender, b'register', media(2), b'meta')]}}),
+        (2, {'block': {'rnd': 2, 'txns': [call(sender, b'verify', media(1), b'Qm...')]}}),
+    ]
+
+
+def test_bloom_filter_has_no_false_negatives_and_bounded_false_positives():
+    bloom = BloomFilter(10_000, 0.01)
+    for n in range(10_000):
+        bloom.add(media(n))
+    assert all(media(n) in bloom for n in range(10_000))
+    false_positives = sum(media(n) in bloom for n in range(10_000, 30_000))
+    assert false_positives < 20_000 * 0.02
+
+
+def test_index_records_calls_and_skips_disk_for_unknown_hashes(tmp_path):
+    path = str(tmp_path / 'media.db')
+    index = MediaIndex(path, APP_ID, bloom_capacity=1)
+    assert index.apply_blocks(blocks()) == 3
+    assert index.checkpoint() == 2
+
+    calls = index.get(media(1))
+    assert [c['round'] for c in calls['register']] == [1] and [c['round'] for c in calls['verify']] == [2]
+    assert calls['register'][0]['sender'] == ZERO_ADDRESS and len(calls['register'][0]['txid']) == 52
+    assert index.registration(media(2))['intra'] == 2
+    assert index.get(media(3)) is None
+    assert index.stats['bloom_negatives'] >= 1
+    # Outgrowing the filter triggers a rebuild at a larger size.
+    assert index.bloom.capacity >= 4
+    index.close()
+
+    # The filter is rebuilt from disk on reopen, and replays are idempotent.
+    reopened = MediaIndex(path, APP_ID)
+    assert media(1) in reopened.bloom and media(2) in reopened.bloom
+    reopened.apply_blocks(blocks()[:1])
+    assert len(reopened.get(media(1))['register']) == 1
+    reopened.close()
+
+
+def test_media_lookup_and_duplicate_registration(client, params_fetches, tmp_path):
+    index = MediaIndex(str(tmp_path / 'media.db'), APP_ID)
+    index.apply_blocks(blocks())
+    services = client.app.state.services
+    services.media_indexer = MediaIndexer(index, None)
+    try:
+        response = client.get(f'/api/media/{media(1).hex()}')
+        assert response.status_code == 200
+        assert response.json()['media_hash'] == b64encode(media(1)).decode()
+        assert len(response.json()['verify']) == 1
+        encoded = urlsafe_b64encode(media(2)).decode().rstrip('=')
+        assert client.get(f'/api/media/{encoded}').json()['register'][0]['round'] == 1
+        assert client.get(f'/api/media/{media(3).hex()}').status_code == 404
+        assert client.get('/api/media').json()['hashes'] == 2
+
+        payload = {'app_id': APP_ID, 'sender': ZERO_ADDRESS, 'metadata': b64encode(b'meta').decode()}
+        duplicate = client.post('/api/unsigned/media/register',
+                                json={**payload, 'media_hash': b64encode(media(1)).decode()})
+        assert duplicate.status_code == 409
+        assert duplicate.json()['detail']['registration']['round'] == 1
+        fresh = client.post('/api/unsigned/media/register',
+                            json={**payload, 'media_hash': b64encode(media(3)).decode()})
+        assert fresh.status_code == 200
+        txn = encoding.msgpack_decode(fresh.json()['unsigned'][0])
+        assert txn.app_args[1] == media(3)
+    finally:
+        services.media_indexer = None
+        index.close()
@@ -0,0 +1,103 @@
+import asyncio
+import threading
+
+import pytest
+
+from backend.metrics import Registry, algod_call
+
+
+def sample(text, line_prefix):
+    for line in text.splitlines():
+        if line.startswith(line_prefix):
+            return float(line.rsplit(' ', 1)[1])
+    raise AssertionError(f'{line_prefix} not in metrics output')
+
+
+def test_histogram_sums_per_thread_shards_and_renders_cumulative_buckets():
+    registry = Registry()
+    histogram = registry.histogram('latency_seconds', 'Latency.', ('route',), buckets=(0.1, 1.0))
+    child = histogram.labels('/x')
+
+    def work():
+        for _ in range(1000):
+            child.observe(0.05)
+            child.observe(0.5)
+
+    threads = [threading.Thread(target=work) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+    child.observe(5)
+
+    text = registry.render()
+    assert '# TYPE latency_seconds histogram' in text
+    assert sample(text, 'latency_seconds_bucket{route="/x",le="0.1"}') == 4000
+    assert sample(text, 'latency_seconds_bucket{route="/x",le="1.0"}') == 8000
+    assert sample(text, 'latency_seconds_bucket{route="/x",le="+Inf"}') == 8001
+    assert sample(text, 'latency_seconds_count{route="/x"}') == 8001
+    assert sample(text, 'latency_seconds_sum{route="/x"}') == pytest.approx(4000 * 0.55 + 5)
+    with pytest.raises(ValueError):
+        registry.counter('latency_seconds', 'Clash.')
+
+
+def test_algod_call_records_latency_and_errors():
+    from backend.metrics import ALGOD_DURATION, ALGOD_ERRORS, ALGOD_IN_FLIGHT
+
+    @algod_call('test_method')
+    async def flaky(fail):
+        if fail:
+            raise TimeoutError('slow node')
+        return 'ok'
+
+    before = ALGOD_DURATION.labels('test_method').snapshot()[0][-1:]
+    assert asyncio.run(flaky(False)) == 'ok'
+    with pytest.raises(TimeoutError):
+        asyncio.run(flaky(True))
+    counts, _total = ALGOD_DURATION.labels('test_method').snapshot()
+    assert sum(counts) - sum(before) >= 2
+    assert ALGOD_ERRORS.labels('test_method', 'TimeoutError').value == 1
+    assert ALGOD_IN_FLIGHT.labels('test_method').value == 0
+
+
+def test_algod_call_does_not_count_cancelled_calls_as_errors():
+    from backend.metrics import ALGOD_ERRORS, ALGOD_IN_FLIGHT
+
+    @algod_call('test_cancelled')
+    async def slow():
+        await asyncio.sleep(10)
+
+    async def run():
+        # What the pool does to a hedge loser.
+        task = asyncio.ensure_future(slow())
+        await asyncio.sleep(0)
+        task.cancel()
+        with pytest.raises(asyncio.CancelledError):
+            await task
+
+    asyncio.run(run())
+    assert ALGOD_ERRORS.labels('test_cancelled', 'CancelledError').value == 0
+    assert ALGOD_IN_FLIGHT.labels('test_cancelled').value == 0
+
+
+def test_metrics_endpoint_reports_routes_phases_and_components(client, params_fetches):
+    from base64 import b64encode
+
+    from tests.conftest import ZERO_ADDRESS
+
+    payload = {'app_id': 1, 'sender': ZERO_ADDRESS, 'media_hash': b64encode(b'h' * 32).decode(),
+               'metadata': b64encode(b'm').decode()}
+    assert client.post('/api/unsigned/media/register', json=payload).status_code == 200
+    client.get('/api/weights/5')
+
+    response = client.get('/metrics')
+    assert response.status_code == 200
+    assert response.headers['content-type'].startswith('text/plain; version=0.0.4')
+    text = response.text
+    route = 'lucid_http_request_duration_seconds_count{method="POST",route="/api/unsigned/media/register",status="200"}'
+    assert sample(text, route) >= 1
+    # Templates, not raw paths, keep the label set bounded.
+    assert 'route="/api/weights/{app_id}",status="404"' in text
+    for name in ('suggested_params', 'build_app_call', 'encode'):
+        assert sample(text, f'lucid_request_phase_seconds_count{{phase="{name}"}}') >= 1
+    assert sample(text, 'lucid_params_cache_misses') >= 1
@@ -0,0 +1,97 @@
+import asyncio
+import threading
+import time
+
+import pytest
+from algosdk.transaction import SuggestedParams
+
+from backend.params_cache import SuggestedParamsCache
+
+
+def make_params(first=100):
+    return SuggestedParams(fee=0, first=first, last=first + 1000, gh='SGO1GKSzyE7IEPItTxCByw9x8FmnrCDexi9/cOUJOiI=',
+                           gen='testnet-v1.0', flat_fee=False, min_fee=1000)
+
+
+def test_cache_hits_until_ttl_expires():
+    now = [0.0]
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return make_params(100 + len(calls))
+
+    cache = SuggestedParamsCache(fetch, ttl=5, clock=lambda: now[0])
+    assert cache.get().first == 101
+    assert cache.get().first == 101
+    now[0] = 6
+    assert cache.get().first == 102
+    assert cache.stats()['hits'] == 1
+    assert cache.stats()['misses'] == 2
+
+
+def test_observe_round_invalidates_older_params():
+    calls = []
+
+    def fetch():
+        calls.append(1)
+        return make_params(100 + len(calls))
+
+    cache = SuggestedParamsCache(fetch, ttl=60)
+    cache.get()
+    cache.observe_round(101)
+    cache.get()
+    assert len(calls) == 1
+    cache.observe_round(102)
+    assert cache.get().first == 102
+
+
+def test_concurrent_misses_share_one_fetch():
+    calls = []
+    release = threading.Event()
+
+    def fetch():
+        calls.append(1)
+        release.wait(1)
+        return make_params()
+
+    cache = SuggestedParamsCache(fetch, ttl=60)
+    results = []
+    threads = [threading.Thread(target=lambda: results.append(cache.get())) for _ in range(8)]
+    for thread in threads:
+        thread.start()
+    time.sleep(0.05)
+    release.set()
+    for thread in threads:
+        thread.join()
+    assert len(calls) == 1
+    assert len(results) == 8
+
+
+def test_fetch_errors_propagate_and_are_not_cached():
+    def fetch():
+        raise ConnectionError('algod down')
+
+    cache = SuggestedParamsCache(fetch, ttl=60)
+    with pytest.raises(ConnectionError):
+        cache.get()
+    with pytest.raises(ConnectionError):
+        cache.get()
+
+
+def test_async_misses_share_one_fetch():
+    calls = []
+
+    async def afetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return make_params()
+
+    cache = SuggestedParamsCache(lambda: pytest.fail('sync fetch used'), ttl=60, afetch=afetch)
+
+    async def run():
+        return await asyncio.gather(*(cache.aget() for _ in range(8)))
+
+    results = asyncio.run(run())
+    assert len(calls) == 1
+    assert all(params.first == 100 for params in results)
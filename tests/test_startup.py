@@ -0,0 +1,30 @@
+import asyncio
+
+import pytest
+
+from backend.app import Services, create_app
+from scripts.bench_startup import probe
+
+
+def test_cold_import_defers_clients_and_heavy_modules():
+    run = probe()
+    assert run['loaded'] == []
+    assert run['status'] == 200
+
+
+def test_startup_builds_no_algod_clients_and_validates_settings():
+    async def start(env):
+        app = create_app(env)
+        async with app.router.lifespan_context(app):
+            services = app.state.services
+            return [name for name in ('algod_client', 'async_algod_client', 'tracker', 'indexer_http')
+                    if services.created(name)]
+
+    assert asyncio.run(start({'ALGOD_ADDRESS': 'http://localhost:4001'})) == []
+    with pytest.raises(RuntimeError, match='ALGOD_ADDRESS'):
+        asyncio.run(start({}))
+
+
+def test_services_parse_algod_headers():
+    services = Services({'ALGOD_ADDRESS': 'http://node', 'ALGOD_HEADER_KV': 'X-API-Key=abc; X-Other:1;junk'})
+    assert services.algod_headers == {'X-API-Key': 'abc', 'X-Other': '1'}
@@ -0,0 +1,82 @@
+import gzip
+import hashlib
+from pathlib import Path
+
+from starlette.applications import Starlette
+from starlette.routing import Mount
+from starlette.testclient import TestClient
+
+from backend.static_assets import CompressedStaticFiles, cache_control, choose_encoding
+
+BUNDLE = ('export const answer = 42;\n' * 200).encode()
+HASHED = f'app-{hashlib.sha256(BUNDLE).hexdigest()[:8]}.js'
+
+
+def make_client(tmp_path):
+    root = tmp_path / 'site'
+    root.mkdir()
+    (root / 'bundle.js').write_bytes(BUNDLE)
+    (root / HASHED).write_bytes(BUNDLE)
+    (root / 'app-3f9a1c2b.js').write_bytes(BUNDLE)
+    (root / 'tiny.css').write_text('body{}')
+    static = CompressedStaticFiles(directory=root, cache_dir=tmp_path / 'cache')
+    return TestClient(Starlette(routes=[Mount('/', static)])), root
+
+
+def test_serves_gzip_variant_with_per_encoding_etags(tmp_path):
+    client, _ = make_client(tmp_path)
+    compressed = client.get('/bundle.js', headers={'Accept-Encoding': 'gzip'})
+    assert compressed.headers['content-encoding'] == 'gzip'
+    assert compressed.headers['vary'] == 'Accept-Encoding'
+    assert int(compressed.headers['content-length']) < len(BUNDLE) // 10
+    assert compressed.content == BUNDLE  # the test client transparently decodes
+
+    plain = client.get('/bundle.js', headers={'Accept-Encoding': 'identity'})
+    assert 'content-encoding' not in plain.headers
+    assert plain.content == BUNDLE
+    assert plain.headers['etag'] != compressed.headers['etag']
+    assert plain.headers['cache-control'] == 'no-cache'
+    assert list((tmp_path / 'cache').rglob('*.gz'))[0].read_bytes() == gzip.compress(BUNDLE, 9, mtime=0)
+
+
+def test_if_none_match_returns_304(tmp_path):
+    client, _ = make_client(tmp_path)
+    first = client.get(f'/{HASHED}', headers={'Accept-Encoding': 'gzip'})
+    assert first.headers['cache-control'] == 'public, max-age=31536000, immutable'
+    again = client.get(f'/{HASHED}', headers={'Accept-Encoding': 'gzip', 'If-None-Match': first.headers['etag']})
+    assert again.status_code == 304
+    assert again.headers['etag'] == first.headers['etag']
+    assert again.content == b''
+
+
+def test_small_files_and_edits(tmp_path):
+    client, root = make_client(tmp_path)
+    tiny = client.get('/tiny.css', headers={'Accept-Encoding': 'gzip'})
+    assert 'content-encoding' not in tiny.headers
+    assert 'vary' not in tiny.headers
+
+    etag = client.get('/bundle.js').headers['etag']
+    (root / 'bundle.js').write_bytes(BUNDLE + b'// changed\n')
+    edited = client.get('/bundle.js', headers={'If-None-Match': etag})
+    assert edited.status_code == 200
+    assert edited.content.endswith(b'// changed\n')
+
+
+def test_encoding_negotiation_and_hashed_names():
+    assert choose_encoding('gzip, deflate, br', {'gzip', 'br'}) == 'br'
+    assert choose_encoding('br;q=0, gzip;q=0.5', {'gzip', 'br'}) == 'gzip'
+    assert choose_encoding('*;q=0.1', {'gzip'}) == 'gzip'
+    assert choose_encoding('identity', {'gzip'}) is None
+    digest = hashlib.sha256(b'x').hexdigest()
+    assert cache_control(Path(f'index-{digest[:10]}.js'), digest) == 'public, max-age=31536000, immutable'
+    assert cache_control(Path(f'index.{digest}.js'), digest) == 'public, max-age=31536000, immutable'
+    assert cache_control(Path('index.umd-standalone.js'), digest) == 'no-cache'
+    assert cache_control(Path('walletconnect.min.js'), digest) == 'no-cache'
+
+
+def test_names_that_only_look_hashed_are_revalidated(tmp_path):
+    client, _ = make_client(tmp_path)
+    # Matches the hash pattern, but is not this file's content hash.
+    response = client.get('/app-3f9a1c2b.js')
+    assert response.headers['cache-control'] == 'no-cache'
+    assert cache_control(Path('release-20240101.js'), hashlib.sha256(b'x').hexdigest()) == 'no-cache'
@@ -0,0 +1,98 @@
+import asyncio
+
+from algosdk import encoding
+
+from backend.stats import UmisStatsView
+
+APP_ID = 77
+OWNER = bytes([1]) * 32
+ALICE = bytes([2]) * 32
+BOB = bytes([3]) * 32
+
+
+def app_call(sender, args=(), on_complete=0, accounts=(), gd=None, ld=None, itx=None):
+    return {
+        'txn': {'type': 'appl', 'apid': APP_ID, 'snd': sender, 'apan': on_complete,
+                'apaa': list(args), 'apat': list(accounts)},
+        'dt': {'gd': gd or {}, 'ld': ld or {}, 'itx': itx or []},
+    }
+
+
+def block(round_number, *txns):
+    return {'block': {'rnd': round_number, 'txns': list(txns)}}
+
+
+def pay(receiver, amount):
+    return {'txn': {'type': 'pay', 'rcv': receiver, 'amt': amount}}
+
+
+def test_view_follows_opt_in_weight_and_distribute():
+    view = UmisStatsView(APP_ID)
+    view.seed({'Owner': OWNER, 'opt_in_count': 0}, {}, 10)
+
+    blocks = [
+        block(11,
+              app_call(ALICE, on_complete=1, gd={'opt_in_count': {'at': 2, 'ui': 1}},
+                       ld={0: {'weight': {'at': 2, 'ui': 1}}}),
+              app_call(BOB, on_complete=1, gd={'opt_in_count': {'at': 2, 'ui': 2}},
+                       ld={0: {'weight': {'at': 2, 'ui': 1}}})),
+        block(12, app_call(BOB, args=[b'set_weight', (30).to_bytes(8, 'big')],
+                           ld={0: {'weight': {'at': 2, 'ui': 30}}})),
+        block(13, app_call(OWNER, args=[b'distribute'], accounts=[ALICE, BOB],
+                           itx=[pay(ALICE, 32), pay(BOB, 967), pay(OWNER, 1)])),
+        block(14, app_call(ALICE, on_complete=2)),
+    ]
+    for item in blocks:
+        asyncio.run(view.on_block(item['block']['rnd'], item))
+
+    stats = view.snapshot()
+    assert stats['opt_in_count'] == 2
+    assert stats['total_weight'] == 30
+    assert stats['weight_distribution'] == {'10-99': 1}
+    assert stats['distributed_total'] == 999
+    assert stats['remainder_total'] == 1
+    assert stats['round'] == 14
+    assert encoding.encode_address(BOB) in view.weights
+
+
+def test_view_uses_on_chain_total_weight_without_indexer():
+    view = UmisStatsView(APP_ID)
+    view.seed({'Owner': OWNER, 'opt_in_count': 3, 'total_weight': 120}, None, 10)
+
+    closing = block(11, app_call(ALICE, on_complete=2, gd={'opt_in_count': {'at': 2, 'ui': 2},
+                                                           'total_weight': {'at': 2, 'ui': 100}}))
+    asyncio.run(view.on_block(11, closing))
+
+    stats = view.snapshot()
+    assert stats['opt_in_count'] == 2
+    assert stats['total_weight'] == 100
+    assert stats['weights_complete'] is False
+
+
+def test_view_counts_claims_and_close_out_payouts():
+    view = UmisStatsView(APP_ID)
+    view.seed({'Owner': OWNER}, None, 10)
+
+    asyncio.run(view.on_block(11, block(11, app_call(OWNER, args=[b'distribute']))))
+    asyncio.run(view.on_block(12, block(12, app_call(ALICE, args=[b'claim'], itx=[pay(ALICE, 40)]))))
+    asyncio.run(view.on_block(13, block(13, app_call(BOB, on_complete=2, itx=[pay(BOB, 60)]))))
+
+    stats = view.snapshot()
+    assert stats['distribute_calls'] == 1
+    assert stats['distributed_total'] == 0
+    assert stats['claimed_total'] == 100
+
+
+def test_view_ignores_rounds_already_in_its_seed():
+    view = UmisStatsView(APP_ID)
+    view.seed({'Owner': OWNER}, None, 10)
+    distribute = block(10, app_call(OWNER, args=[b'distribute'], accounts=[ALICE], itx=[pay(ALICE, 5)]))
+
+    later = block(11, app_call(OWNER, args=[b'distribute'], accounts=[ALICE], itx=[pay(ALICE, 7)]))
+
+    asyncio.run(view.on_block(10, distribute))
+    asyncio.run(view.on_block(11, later))
+    asyncio.run(view.on_block(11, later))
+
+    stats = view.snapshot()
+    assert (stats['distribute_calls'], stats['distributed_total'], stats['round']) == (1, 7, 11)
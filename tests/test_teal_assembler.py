@@ -0,0 +1,82 @@
+import base64
+import json
+from pathlib import Path
+
+import pytest
+from algosdk import logic
+from algosdk.source_map import SourceMap
+
+from contracts.assembler import AssemblyError, assemble
+from contracts.build import CONTRACTS, build_contract
+
+FIXTURE_DIR = Path(__file__).parent / 'fixtures' / 'algod_compile'
+FIXTURES = sorted(FIXTURE_DIR.glob('*.json'))
+RECORDED = [entry for path in FIXTURES for entry in json.loads(path.read_text())]
+SHIPPED = [(name, suffix) for name in CONTRACTS for suffix in ('approval', 'clear')]
+
+
+@pytest.mark.parametrize('entry', RECORDED, ids=[entry['name'] for entry in RECORDED])
+def test_matches_recorded_algod_output(entry):
+    program = assemble(entry['source'])
+    assert base64.b64encode(program.program).decode() == entry['result']
+    if entry.get('hash'):
+        assert program.hash == entry['hash']
+    if entry.get('sourcemap'):
+        assert program.source_map()['mappings'] == entry['sourcemap']['mappings']
+
+
+def test_v4_constants_ranked_by_use_and_single_use_pushed():
+    source = '#pragma version 6\nint 7\nint 5\nint 5\nint 7\nint 5\nint 9\nbyte "a"\nbyte "a"'
+    assert assemble(source).program.hex() == '062002050726010161232222232281092828'
+
+
+def test_pre_v4_constants_keep_first_use_order():
+    assert assemble('#pragma version 2\nint 9\nint 5\nint 5').program.hex() == '0220020905222323'
+    ints = '\n'.join(f'int {value}' for value in (1, 2, 3, 4, 5) for _ in range(2))
+    assert assemble(f'#pragma version 6\n{ints}').program.endswith(bytes([0x21, 4, 0x21, 4]))
+
+
+def test_branch_offsets_and_source_map():
+    source = '#pragma version 6\nb end\nloop:\npushint 1\nbnz loop\nend:\npushint 1\nreturn'
+    program = assemble(source)
+    assert program.program.hex() == '06420005810140fffb810143'
+    assert program.pc_to_line == {1: 1, 4: 3, 6: 4, 9: 6, 11: 7}
+    decoded = SourceMap(program.source_map())
+    assert [decoded.get_line_for_pc(pc) for pc in (1, 4, 6, 7, 9, 11)] == [1, 3, 4, 4, 6, 7]
+
+
+def test_pseudo_ops():
+    selector = assemble('#pragma version 6\nmethod "add(uint64,uint64)uint128"').program
+    assert selector.hex() == '06' + '8004' + '8aa3b61f'
+    zero = 'AAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAAY5HFKQ'
+    assert assemble(f'#pragma version 6\naddr {zero}').program == bytes([6, 0x80, 32]) + bytes(32)
+    assert assemble('#pragma version 6\ntxn Accounts 1\ngtxn 0 Amount').program.hex() == '06361c01330008'
+
+
+@pytest.mark.parametrize('name, suffix', SHIPPED, ids=[f'{name}_{suffix}' for name, suffix in SHIPPED])
+def test_shipped_contracts_match_recorded_algod_output(name, suffix):
+    # Deployments only use the offline assembler with TEAL_ASSEMBLER=offline; this is what vouches for it.
+    path = FIXTURE_DIR / f'{name}_{suffix}.json'
+    if not path.exists():
+        pytest.skip(f'no algod recording for {path.name}; run scripts.record_teal_fixtures against a node')
+    artifact = build_contract(name)
+    recorded = json.loads(path.read_text())[0]
+    source = artifact.approval_teal if suffix == 'approval' else artifact.clear_teal
+    assert recorded['source'] == source, f'{path.name} was recorded for older TEAL; re-run scripts.record_teal_fixtures'
+    program = artifact.approval_bytes if suffix == 'approval' else artifact.clear_bytes
+    assert base64.b64encode(program).decode() == recorded['result']
+
+
+def test_contract_hashes_are_logic_addresses():
+    program = assemble(build_contract('umis_engine').approval_teal)
+    assert program.hash == logic.address(program.program)
+    assert program.program[0] == 6
+
+
+def test_errors_report_the_line():
+    with pytest.raises(AssemblyError, match='line 2: unknown label nowhere'):
+        assemble('#pragma version 6\nb nowhere')
+    with pytest.raises(AssemblyError, match='line 3: unknown opcode frobnicate'):
+        assemble('#pragma version 6\nint 1\nfrobnicate')
+    with pytest.raises(AssemblyError, match='constant not in constant block'):
+        assemble('#pragma version 2\nintcblock 1\nint 2')
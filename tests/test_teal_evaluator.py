@@ -0,0 +1,186 @@
+import pytest
+from algosdk import account
+
+from contracts.build import build_contract
+from contracts.distribution_planner import plan_distribution
+from contracts.teal_evaluator import (
+    CLEAR_STATE, CLOSE_OUT, OPT_IN, Ledger, TealError, Transaction, app_address, app_call, payment,
+)
+
+UMIS = build_contract('umis_engine')
+APPROVAL, CLEAR = UMIS.approval_teal, UMIS.clear_teal
+
+
+def new_account(ledger, amount=10_000_000):
+    address = account.generate_account()[1]
+    ledger.fund(address, amount)
+    return address
+
+
+def deploy(ledger, owner, program=APPROVAL, clear=CLEAR, args=()):
+    create = Transaction(sender=owner, type='appl', app_args=list(args), approval_program=program,
+                         clear_program=clear, global_schema=(4, 2), local_schema=(2, 1))
+    app_id = ledger.execute([create]).app_id
+    ledger.fund(app_address(app_id), 100_000)
+    return app_id
+
+
+def run(program, ledger=None):
+    ledger = ledger or Ledger()
+    owner = new_account(ledger)
+    return ledger.execute([Transaction(sender=owner, type='appl', approval_program=program,
+                                       clear_program='#pragma version 6\nint 1')]).results[0]
+
+
+def test_wide_arithmetic_and_byte_math():
+    result = run('''#pragma version 6
+int 18446744073709551615
+int 3
+mulw
+int 0
+int 7
+divmodw
+pop
+pop
+swap
+!
+assert
+int 7905747460161236406
+==
+assert
+byte 0xffffffffffffffffff
+byte 0x01
+b+
+byte 0x01000000000000000000
+b==
+''')
+    assert result.approved
+    # 17 single-cost opcodes plus divmodw (20) and b+ (10)
+    assert result.cost == 17 + 20 + 10
+
+
+def test_failures_and_budget():
+    with pytest.raises(TealError, match='integer underflow'):
+        run('#pragma version 6\nint 1\nint 2\n-')
+    with pytest.raises(TealError, match='budget exceeded'):
+        run('#pragma version 6\nloop:\nint 1\nbnz loop')
+    with pytest.raises(TealError, match='rejected'):
+        run('#pragma version 6\nint 0\nreturn')
+
+
+def test_branch_costs_follow_labels():
+    result = run('#pragma version 6\nint 1\nbnz skip\nerr\nskip:\nint 1\nint 1\n+\nreturn')
+    assert result.branch_costs == {'main': 2, 'skip': 4}
+
+
+def test_push_distribute_matches_planner_and_tracks_totals():
+    ledger = Ledger()
+    owner = new_account(ledger)
+    app_id = deploy(ledger, owner)
+    users = [new_account(ledger) for _ in range(4)]
+    for user in users:
+        ledger.execute([app_call(user, app_id, on_complete=OPT_IN)])
+    ledger.execute([app_call(users[0], app_id, [b'set_weight', (5).to_bytes(8, 'big')])])
+    assert ledger.global_state(app_id)['total_weight'] == 8
+
+    plan = plan_distribution([5, 1, 1], 800_000, pool_weight=8)
+    amount, members = next(plan.groups())
+    recipients = [users[int(i)] for i in members]
+    before = [ledger.balance(user) for user in recipients]
+    result = ledger.execute([
+        payment(owner, app_address(app_id), amount),
+        app_call(owner, app_id, plan.app_args(), recipients, fee=1000 * (1 + len(recipients))),
+    ])
+    paid = [ledger.balance(user) - start for user, start in zip(recipients, before)]
+    assert paid == [int(plan.shares[i]) for i in members]
+    assert result.inner_txn_count == len(recipients)
+
+    ledger.execute([app_call(users[0], app_id, on_complete=CLOSE_OUT)])
+    ledger.execute([app_call(users[1], app_id, on_complete=CLEAR_STATE)])
+    state = ledger.global_state(app_id)
+    assert (state['opt_in_count'], state['total_weight']) == (2, 2)
+
+
+def test_push_distribute_refunds_the_remainder_to_the_payer():
+    ledger = Ledger()
+    owner = new_account(ledger)
+    app_id = deploy(ledger, owner)
+    users = [new_account(ledger) for _ in range(3)]
+    for user in users:
+        ledger.execute([app_call(user, app_id, on_complete=OPT_IN)])
+
+    # The owner is not an available account here; only the paying caller is.
+    funder = users[2]
+    start, owner_start = ledger.balance(funder), ledger.balance(owner)
+    result = ledger.execute([
+        payment(funder, app_address(app_id), 900),
+        app_call(funder, app_id, [b'distribute'], users[:2], fee=4000),
+    ])
+    assert [ledger.balance(user) - 10_000_000 for user in users[:2]] == [300 - 1000, 300 - 1000]
+    # 900 paid in, 300 refunded, plus both fees
+    assert start - ledger.balance(funder) == 900 - 300 + 1000 + 4000
+    assert ledger.balance(owner) == owner_start
+    assert result.inner_txn_count == 3
+
+
+def test_claim_mode_distribute_cost_is_independent_of_holders():
+    costs = []
+    for holders in (2, 40):
+        ledger = Ledger()
+        owner = new_account(ledger)
+        app_id = deploy(ledger, owner, args=[b'claim'])
+        users = [new_account(ledger) for _ in range(holders)]
+        for user in users:
+            ledger.execute([app_call(user, app_id, on_complete=OPT_IN)])
+        result = ledger.execute([payment(owner, app_address(app_id), 1_000_000),
+                                 app_call(owner, app_id, [b'distribute'])])
+        assert result.inner_txn_count == 0
+        costs.append(result.cost)
+    assert costs[0] == costs[1]
+
+
+def test_claim_mode_settles_weight_changes_and_protects_reserve():
+    ledger = Ledger()
+    owner = new_account(ledger)
+    app_id = deploy(ledger, owner, args=[b'claim'])
+    alice, bob = new_account(ledger), new_account(ledger)
+    for user in (alice, bob):
+        ledger.execute([app_call(user, app_id, on_complete=OPT_IN)])
+
+    fund = [payment(owner, app_address(app_id), 1_000_000), app_call(owner, app_id, [b'distribute'])]
+    ledger.execute(fund)
+    ledger.execute([app_call(alice, app_id, [b'set_weight', (3).to_bytes(8, 'big')])])
+    ledger.execute(fund)
+
+    with pytest.raises(TealError):
+        ledger.execute([app_call(owner, app_id, [b'withdraw', (500_000).to_bytes(8, 'big')])])
+
+    start = ledger.balance(alice)
+    ledger.execute([app_call(alice, app_id, [b'claim'], fee=2000)])
+    assert ledger.balance(alice) - start + 2000 == 500_000 + 750_000
+    with pytest.raises(TealError):
+        ledger.execute([app_call(alice, app_id, [b'claim'], fee=2000)])
+
+    ledger.execute([app_call(bob, app_id, on_complete=CLEAR_STATE)])
+    assert ledger.global_state(app_id)['claim_reserved'] == 0
+
+
+def test_claim_reserve_covers_payments_smaller_than_total_weight():
+    ledger = Ledger()
+    owner = new_account(ledger)
+    app_id = deploy(ledger, owner, args=[b'claim'])
+    users = [new_account(ledger) for _ in range(3)]
+    for user in users:
+        ledger.execute([app_call(user, app_id, on_complete=OPT_IN)])
+
+    # 2 microAlgos across a weight of 3: no holder can claim anything yet.
+    for _ in range(2):
+        ledger.execute([payment(owner, app_address(app_id), 2), app_call(owner, app_id, [b'distribute'])])
+    # Flooring each payment's share would reserve 1 + 1, less than the 3 the accumulator now pays out.
+    assert ledger.global_state(app_id)['claim_reserved'] == 4
+
+    for user in users:
+        start = ledger.balance(user)
+        ledger.execute([app_call(user, app_id, [b'claim'], fee=2000)])
+        assert ledger.balance(user) - start + 2000 == 1
+    assert ledger.global_state(app_id)['claim_reserved'] == 1
@@ -0,0 +1,141 @@
+import asyncio
+
+import pytest
+
+from backend.broadcast import TransactionRejectedError
+from backend.tracker import ConfirmationTracker
+
+
+class FakeAlgod:
+    def __init__(self, blocks, pending=None):
+        self.blocks = blocks
+        self.pending = pending or {}
+        self.round = 100
+        self.block_lookups = 0
+
+    async def status(self):
+        return {'last-round': self.round}
+
+    async def status_after_block(self, round_number, timeout=None):
+        await asyncio.sleep(0)
+        self.round = round_number + 1
+        return {'last-round': self.round}
+
+    async def request(self, method, path):
+        self.block_lookups += 1
+        round_number = int(path.split('/')[2])
+        return {'blockTxids': self.blocks.get(round_number, [])}
+
+    async def pending_transaction_info(self, txid):
+        return self.pending.get(txid, {})
+
+
+def test_watches_resolve_from_one_lookup_per_round():
+    algod = FakeAlgod({102: ['A', 'B', 'other']})
+    seen_rounds = []
+
+    async def run():
+        tracker = ConfirmationTracker(algod)
+        tracker.on_round(seen_rounds.append)
+        events = tracker.subscribe()
+        results = await asyncio.gather(tracker.watch('A'), tracker.watch('B'))
+        tracker.unsubscribe(events)
+        await tracker.stop()
+        drained = []
+        while not events.empty():
+            drained.append(events.get_nowait())
+        return results, drained
+
+    results, events = asyncio.run(run())
+    assert results == [102, 102]
+    assert algod.block_lookups == 2
+    assert seen_rounds[:2] == [101, 102]
+    assert ('confirmed', {'txid': 'A', 'round': 102}) in events
+
+
+def test_watch_resolves_a_txid_confirmed_before_the_first_round():
+    class StalledAlgod(FakeAlgod):
+        async def status_after_block(self, round_number, timeout=None):
+            await asyncio.Event().wait()
+
+    algod = StalledAlgod({}, pending={'A': {'confirmed-round': 99}})
+
+    async def run():
+        tracker = ConfirmationTracker(algod)
+        try:
+            return await asyncio.wait_for(tracker.watch('A'), 1)
+        finally:
+            await tracker.stop()
+
+    assert asyncio.run(run()) == 99
+
+
+def test_lagging_node_does_not_turn_off_block_txids():
+    from backend.algod_pool import RoundNotReachedError
+
+    class LaggingAlgod(FakeAlgod):
+        async def request(self, method, path):
+            round_number = int(path.split('/')[2])
+            if self.block_lookups == 0:
+                self.block_lookups += 1
+                raise RoundNotReachedError(round_number)
+            return await super().request(method, path)
+
+    algod = LaggingAlgod({101: ['A']})
+
+    async def run():
+        tracker = ConfirmationTracker(algod, retry_delay=0)
+        try:
+            return await asyncio.wait_for(tracker.watch('A'), 1), tracker._block_txids_supported
+        finally:
+            await tracker.stop()
+
+    assert asyncio.run(run()) == (101, True)
+
+def test_expired_watch_reports_pool_error():
+    algod = FakeAlgod({}, pending={'X': {'pool-error': 'overspend'}})
+
+    async def run():
+        tracker = ConfirmationTracker(algod)
+        try:
+            return await tracker.watch('X', max_rounds=2)
+        finally:
+            await tracker.stop()
+
+    with pytest.raises(TransactionRejectedError):
+        asyncio.run(run())
+
+
+def test_block_listeners_start_at_their_own_round():
+    class BlockAlgod(FakeAlgod):
+        def __init__(self, blocks):
+            super().__init__(blocks)
+            self.fetched = []
+
+        async def block(self, round_number, timeout=None):
+            self.fetched.append(round_number)
+            return {'block': {'rnd': round_number}}
+
+    algod = BlockAlgod({})
+    early, late = [], []
+
+    async def run():
+        tracker = ConfirmationTracker(algod)
+
+        async def follow_early(round_number, block):
+            early.append(round_number)
+
+        async def follow_late(round_number, block):
+            late.append(round_number)
+            if round_number >= 104:
+                task.cancel()
+
+        tracker.on_block(follow_early, from_round=98)
+        tracker.on_block(follow_late, from_round=103)
+        task = tracker._task
+        await asyncio.gather(task, return_exceptions=True)
+
+    asyncio.run(run())
+    assert early[:5] == [98, 99, 100, 101, 102]
+    assert late == [103, 104]
+    assert algod.fetched.count(101) == 1 and algod.fetched.count(103) == 1
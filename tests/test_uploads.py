@@ -0,0 +1,49 @@
+import asyncio
+from base64 import b64decode, b64encode
+import hashlib
+
+from algosdk import encoding
+import pytest
+
+from backend.uploads import UploadTooLargeError, hash_stream
+from tests.conftest import ZERO_ADDRESS
+
+
+async def chunks(data, size):
+    for start in range(0, len(data), size):
+        yield data[start:start + size]
+
+
+def test_hash_stream_matches_hashlib_across_buffer_boundaries():
+    data = bytes(range(256)) * 4099
+    for chunk_size in (1, 1000, 4096, len(data)):
+        digest, size = asyncio.run(hash_stream(chunks(data, chunk_size), buffer_size=4096))
+        assert (digest, size) == (hashlib.sha256(data).digest(), len(data))
+    with pytest.raises(UploadTooLargeError):
+        asyncio.run(hash_stream(chunks(data, 1000), buffer_size=4096, max_bytes=len(data) - 1))
+
+
+def test_upload_returns_register_call_for_streamed_body(client, params_fetches):
+    data = b'frame' * 300_000
+
+    def body():
+        for start in range(0, len(data), 65536):
+            yield data[start:start + 65536]
+
+    response = client.post('/api/unsigned/media/register/upload',
+                           params={'app_id': 7, 'sender': ZERO_ADDRESS, 'metadata': b64encode(b'meta').decode()},
+                           content=body())
+    assert response.status_code == 200
+    result = response.json()
+    digest = hashlib.sha256(data).digest()
+    assert (b64decode(result['media_hash']), result['size']) == (digest, len(data))
+    txn = encoding.msgpack_decode(result['unsigned'][0])
+    assert txn.app_args == [b'register', digest, b'meta']
+
+
+def test_upload_rejects_bad_sender_and_oversized_bodies(client, params_fetches):
+    params = {'app_id': 7, 'sender': 'nope', 'metadata': ''}
+    assert client.post('/api/unsigned/media/register/upload', params=params, content=b'x').status_code == 400
+    client.app.state.services.max_upload_bytes = 10
+    params['sender'] = ZERO_ADDRESS
+    assert client.post('/api/unsigned/media/register/upload', params=params, content=b'x' * 11).status_code == 413